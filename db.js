@@ -20,6 +20,22 @@ class Database {
         logger.info(`Database operation: Initialized Database instance with Prisma ORM. Max users set to ${this.maxUsers}.`);
     }
 
+    /**
+     * Notifies listening RFID readers that the set of valid tags changed, so they can update their allowlist cache.
+     * A failed notification is only logged; readers periodically resynchronise their cache anyway.
+     *
+     * @param {string} operation - Either 'insert' or 'delete'.
+     * @param {string} hash - The SHA-256 hash of the affected RFID tag.
+     */
+    async notifyValidTagChange(operation, hash) {
+        try {
+            const payload = JSON.stringify({operation, tag: hash, sentAt: Date.now()});
+            await prisma.$executeRaw`SELECT pg_notify('valid_tag_changed', ${payload})`;
+        } catch (err) {
+            logger.warn(`Database operation warning: Failed to notify readers about RFID tag ${operation}. Error: ${err.message}`);
+        }
+    }
+
     async insertRfidTag(tagUid, username) {
         try {
             // Hash the RFID tag UID with SHA-256
@@ -30,6 +46,7 @@ class Database {
                     username: username
                 }
             });
+            await this.notifyValidTagChange('insert', hash);
             return newTag;
         } catch (err) {
             logger.error(`Database operation error: Failed to insert RFID tag for user '${username}'. Error: ${err.message}`);
@@ -46,13 +63,17 @@ class Database {
     async removeRfidTag(tagUid) {
         try {
             logger.info(`Database operation: Attempting to remove RFID tag with UID '${tagUid}'.`)
-            const tags = await prisma.validTag.findMany();
-            const tagToDelete = tags.find(async t => await argon2.verify(t.tag, tagUid));
+            // Tags are stored as SHA-256 hashes, see insertRfidTag
+            const hash = crypto.createHash('sha256').update(tagUid).digest('hex');
+            const tagToDelete = await prisma.validTag.findUnique({
+                where: {tag: hash}
+            });
 
             if (tagToDelete) {
                 await prisma.validTag.delete({
                     where: {id: tagToDelete.id} // Assuming 'id' is the primary key of the tag record
                 });
+                await this.notifyValidTagChange('delete', hash);
             } else {
                 throw new Error('RFID tag not found');
             }
@@ -0,0 +1,5 @@
+-- AlterTable
+ALTER TABLE "RfidLog" ADD COLUMN     "eventId" TEXT;
+
+-- CreateIndex
+CREATE UNIQUE INDEX "RfidLog_eventId_key" ON "RfidLog"("eventId");
@@ -0,0 +1,25 @@
+-- AlterTable
+ALTER TABLE "RfidLog" ADD COLUMN     "username" TEXT;
+
+-- CreateFunction
+-- Checks a SHA-256 tag digest against "ValidTag", logs the attempt in "RfidLog"
+-- and returns the decision, all in a single statement. The insert is skipped if
+-- a row with the same event ID was already logged, so callers can retry safely.
+CREATE OR REPLACE FUNCTION "authorize_and_log"(
+    p_rfid_id BIGINT,
+    p_tag TEXT,
+    p_event_id TEXT,
+    p_timestamp TIMESTAMP(3)
+)
+RETURNS TABLE ("isValid" BOOLEAN, "username" TEXT)
+LANGUAGE sql
+AS $$
+    WITH matched AS (
+        SELECT "username" FROM "ValidTag" WHERE "tag" = p_tag
+    ), logged AS (
+        INSERT INTO "RfidLog" ("eventId", "rfidId", "isValid", "username", "timestamp")
+        SELECT p_event_id, p_rfid_id, EXISTS(SELECT 1 FROM matched), (SELECT "username" FROM matched), p_timestamp
+        ON CONFLICT ("eventId") DO NOTHING
+    )
+    SELECT EXISTS(SELECT 1 FROM matched), (SELECT "username" FROM matched);
+$$;
@@ -1,16 +1,37 @@
 import os
 import sys
+import asyncio
 import time
 import signal
+import sqlite3
+import uuid
+import mmap
+import struct
+import json
+import select
 import hashlib
+import atexit
+import copy
 import logging
-from logging.handlers import RotatingFileHandler
+import queue
+import heapq
+import math
+import bisect
+import threading
+import socketserver
+import weakref
+import contextvars
+from collections import Counter, OrderedDict, namedtuple
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from contextlib import asynccontextmanager, contextmanager, nullcontext
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 import psycopg2
+from psycopg2 import errors as pg_errors, pool
+from psycopg2.extras import execute_values
 from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from argon2 import PasswordHasher, exceptions
 from decouple import config
-import RPi.GPIO as GPIO
-from mfrc522 import SimpleMFRC522
 
 # Initialize Argon2 PasswordHasher with tuned parameters
 ph = PasswordHasher()
@@ -20,33 +41,462 @@ GREEN_LED_PIN = int(config('GREEN_LED_PIN', default='2'))
 RED_LED_PIN = int(config('RED_LED_PIN', default='3'))
 SERVO_PIN = int(config('SERVO_PIN', default='12'))
 
-# Initialize GPIO settings
-GPIO.setwarnings(False)
-GPIO.setmode(GPIO.BCM)
-GPIO.setup(SERVO_PIN, GPIO.OUT)
-GPIO.setup(GREEN_LED_PIN, GPIO.OUT)
-GPIO.setup(RED_LED_PIN, GPIO.OUT)
-GPIO.output(RED_LED_PIN, GPIO.HIGH)
+# Hardware Backends
+# GPIO is the active backend's RPi.GPIO-compatible module. Nothing touches
+# the hardware on import; init_hardware() picks the backend on first use.
+GPIO = None
+hardware = None
 
+class RpiHardware:
+    """The Raspberry Pi: RPi.GPIO and the mfrc522 library."""
+    name = 'rpi'
 
-# Initialize PWM for Servo Control
-servo = GPIO.PWM(SERVO_PIN, 50)  # 50Hz frequency
-servo.start(0)  # Initialization with 0 duty cycle
+    def __init__(self):
+        import RPi.GPIO
+        from mfrc522 import MFRC522, SimpleMFRC522
+        self.gpio = RPi.GPIO
+        self._chip_type = MFRC522
+        self._reader_type = SimpleMFRC522
+        self.gpio.setwarnings(False)
+        self.gpio.setmode(self.gpio.BCM)
+
+    # The BCM pin mfrc522 drives as RST when it is given pin_rst=-1
+    DEFAULT_RST_PIN = 15
+
+    def resolve_rst_pin(self, pin_rst):
+        """Returns the pin the chip's RST line is really driven on."""
+        return pin_rst if pin_rst >= 0 else self.DEFAULT_RST_PIN
+
+    def open_reader(self, bus=0, device=0, pin_rst=-1):
+        # SimpleMFRC522() always opens SPI 0.0, so attach the chip for this bus and chip select directly
+        reader = self._reader_type.__new__(self._reader_type)
+        reader.READER = self._chip_type(bus=bus, device=device, pin_rst=self.resolve_rst_pin(pin_rst))
+        return reader
+
+    def cleanup(self):
+        self.gpio.cleanup()
+
+class SimulatedPWM:
+    def __init__(self, gpio, pin, frequency):
+        self.gpio = gpio
+        self.pin = pin
+        self.frequency = frequency
+
+    def start(self, duty):
+        self.gpio.record(self.pin, 'pwm-start', duty)
+
+    def ChangeDutyCycle(self, duty):
+        self.gpio.record(self.pin, 'duty', duty)
+
+    def ChangeFrequency(self, frequency):
+        self.frequency = frequency
+        self.gpio.record(self.pin, 'frequency', frequency)
+
+    def stop(self):
+        self.gpio.record(self.pin, 'pwm-stop', None)
+
+class SimulatedGPIO:
+    """
+    Stands in for RPi.GPIO. Every call that changes a pin is recorded as
+    (monotonic time, pin, kind, value) in the timeline; trigger() fires the
+    edge callbacks registered on a pin.
+    """
+    BCM, BOARD = 11, 10
+    OUT, IN = 0, 1
+    LOW, HIGH = 0, 1
+    PUD_OFF, PUD_DOWN, PUD_UP = 20, 21, 22
+    RISING, FALLING, BOTH = 31, 32, 33
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._timeline = []
+        self._levels = {}
+        self._callbacks = {}
+        self.mode = None
+
+    def record(self, pin, kind, value):
+        with self._lock:
+            self._timeline.append((time.monotonic(), pin, kind, value))
+
+    def timeline(self, pin=None, kind=None):
+        with self._lock:
+            return [event for event in self._timeline
+                    if (pin is None or event[1] == pin) and (kind is None or event[2] == kind)]
+
+    def setwarnings(self, flag):
+        pass
+
+    def setmode(self, mode):
+        self.mode = mode
+
+    def getmode(self):
+        return self.mode
+
+    def setup(self, pin, direction, pull_up_down=None, initial=None):
+        self.record(pin, 'setup', direction)
+        if direction == self.IN:
+            self._levels[pin] = self.LOW if pull_up_down == self.PUD_DOWN else self.HIGH
+        elif initial is not None:
+            self.output(pin, initial)
+
+    def output(self, pin, value):
+        self._levels[pin] = 1 if value else 0
+        self.record(pin, 'output', self._levels[pin])
+
+    def input(self, pin):
+        return self._levels.get(pin, self.LOW)
+
+    def PWM(self, pin, frequency):
+        return SimulatedPWM(self, pin, frequency)
+
+    def add_event_detect(self, pin, edge, callback=None, bouncetime=None):
+        self._callbacks[pin] = callback
+
+    def remove_event_detect(self, pin):
+        self._callbacks.pop(pin, None)
+
+    def trigger(self, pin):
+        callback = self._callbacks.get(pin)
+        if callback is not None:
+            callback(pin)
+
+    def cleanup(self):
+        self._callbacks.clear()
+        self.record(None, 'cleanup', None)
+
+class SimulatedChip:
+    """
+    The subset of the mfrc522 library's MFRC522 that the reader uses:
+    REQA, anticollision and select for the UID-only read, register writes
+    (recorded, otherwise ignored) for IrqCardDetector, and the version and
+    error registers and re-initialisation for ReaderWatchdog.
+    """
+    MI_OK, MI_NOTAGERR, MI_ERR = 0, 1, 2
+    PICC_REQIDL = 0x26
+    PCD_TRANSCEIVE = 0x0C
+    CommandReg, CommIEnReg, CommIrqReg, FIFODataReg, BitFramingReg = 0x01, 0x02, 0x04, 0x09, 0x0D
+    ErrorReg, VersionReg = 0x06, 0x37
+    VERSION = 0x92
+
+    def __init__(self, reader):
+        self.reader = reader
+        self.writes = []
+        self.inits = 0
+        self._uid = None
+
+    def MFRC522_Request(self, mode):
+        self._uid = self.reader.take_card()
+        if self._uid is None:
+            return self.MI_ERR, None
+        return self.MI_OK, 0x10
+
+    def MFRC522_Anticoll(self):
+        if self._uid is None:
+            return self.MI_ERR, []
+        return self.MI_OK, list(self._uid.to_bytes(5, 'big'))
+
+    def MFRC522_SelectTag(self, uid):
+        return 0x08
+
+    def Write_MFRC522(self, address, value):
+        self.writes.append((address, value))
+
+    def Read_MFRC522(self, address):
+        if self.reader.is_hung():
+            return 0x00  # MISO stuck low
+        if address == self.VersionReg:
+            return self.VERSION
+        return self.reader.error_bits if address == self.ErrorReg else 0x00
+
+    def MFRC522_Init(self):
+        # A soft reset over SPI does not clear a latch-up, only RST does
+        self.inits += 1
+
+class SimulatedMFRC522:
+    """
+    Stands in for SimpleMFRC522. tap() presents a card (an int UID below
+    2**40): with hold=0 it is seen by exactly one read, otherwise by every
+    read for hold seconds. Each read takes read_latency seconds, and every
+    successful one is recorded as (monotonic time, uid) in reads.
+
+    hang() latches the chip up as EMI can: it stops answering until a low
+    pulse on pin_rst shows up in the GPIO timeline.
+    """
+
+    def __init__(self, read_latency=0.0, gpio=None, pin_rst=-1):
+        self.read_latency = read_latency
+        self.gpio = gpio
+        self.pin_rst = pin_rst
+        self.READER = SimulatedChip(self)
+        self.reads = []
+        self.error_bits = 0x00
+        self._hung_at = None
+        self._taps = queue.Queue()
+        self._present = None
+        self._lock = threading.Lock()
+
+    def tap(self, uid, hold=0.0):
+        self._taps.put((uid, hold))
+
+    def pending(self):
+        """Number of taps not yet seen by a read."""
+        return self._taps.qsize()
+
+    def hang(self):
+        self._hung_at = time.monotonic()
+
+    def is_hung(self):
+        if self._hung_at is not None and self.gpio is not None and self.pin_rst >= 0:
+            if any(t >= self._hung_at and value == 0 for t, _, _, value in self.gpio.timeline(self.pin_rst, 'output')):
+                self._hung_at = None
+        return self._hung_at is not None
+
+    def run_script(self, steps):
+        """Taps each (offset seconds, uid, hold) from a background thread, offsets counted from now."""
+        start = time.monotonic()
+
+        def play():
+            for offset, uid, hold in sorted(steps):
+                time.sleep(max(0.0, start + offset - time.monotonic()))
+                self.tap(uid, hold)
+
+        thread = threading.Thread(target=play, name="sim-reader-script", daemon=True)
+        thread.start()
+        return thread
+
+    def take_card(self):
+        if self.read_latency:
+            time.sleep(self.read_latency)
+        if self.is_hung():
+            return None
+        now = time.monotonic()
+        with self._lock:
+            if self._present is not None and now < self._present[1]:
+                uid = self._present[0]
+            else:
+                self._present = None
+                try:
+                    uid, hold = self._taps.get_nowait()
+                except queue.Empty:
+                    return None
+                if hold > 0:
+                    self._present = (uid, now + hold)
+            self.reads.append((now, uid))
+            return uid
+
+    def read_no_block(self):
+        uid = self.take_card()
+        return (uid, '') if uid is not None else (None, None)
+
+    def read_id_no_block(self):
+        return self.take_card()
+
+    def uid_to_num(self, uid):
+        n = 0
+        for i in range(0, 5):
+            n = n * 256 + uid[i]
+        return n
+
+def load_reader_script(path):
+    """
+    Reads a simulated scan script: one scan per line as
+    "<offset seconds> <uid> [hold seconds] [bus.device]", '#' starts a
+    comment. Returns {(bus, device): [(offset, uid, hold), ...]}.
+    """
+    steps = {}
+    with open(path) as f:
+        for line in f:
+            fields = line.split('#', 1)[0].split()
+            if not fields:
+                continue
+            offset, uid = float(fields[0]), int(fields[1])
+            hold = float(fields[2]) if len(fields) > 2 else 0.0
+            bus, device = (int(part) for part in fields[3].split('.')) if len(fields) > 3 else (0, 0)
+            steps.setdefault((bus, device), []).append((offset, uid, hold))
+    return steps
+
+class SimulatedHardware:
+    """Simulated GPIO, PWM and MFRC522 readers, for running without a Raspberry Pi."""
+    name = 'sim'
+
+    def __init__(self, read_latency=None, script_path=None):
+        self.gpio = SimulatedGPIO()
+        self.gpio.setmode(self.gpio.BCM)
+        self.read_latency = read_latency if read_latency is not None else \
+            config('SIM_READ_LATENCY_MS', cast=float, default=5.0) / 1000
+        script_path = script_path if script_path is not None else config('SIM_READER_SCRIPT', default='')
+        self.script = load_reader_script(script_path) if script_path else {}
+        self.readers = {}
+
+    def resolve_rst_pin(self, pin_rst):
+        # A simulated chip has no default RST pin, so -1 stays "not wired" and that case can be checked too
+        return pin_rst
+
+    def open_reader(self, bus=0, device=0, pin_rst=-1):
+        reader = SimulatedMFRC522(self.read_latency, self.gpio, pin_rst)
+        self.readers[(bus, device)] = reader
+        if (bus, device) in self.script:
+            reader.run_script(self.script[(bus, device)])
+        return reader
+
+    def cleanup(self):
+        self.gpio.cleanup()
+
+HARDWARE_BACKENDS = {'rpi': RpiHardware, 'sim': SimulatedHardware}
+
+def init_hardware(backend=None):
+    """Selects the hardware backend (HARDWARE_BACKEND, rpi by default) on first call and returns it."""
+    global hardware, GPIO
+    if hardware is None:
+        backend = backend or config('HARDWARE_BACKEND', default='rpi')
+        if backend not in HARDWARE_BACKENDS:
+            raise ValueError(f"Unknown HARDWARE_BACKEND {backend!r}, expected one of {sorted(HARDWARE_BACKENDS)}")
+        hardware = HARDWARE_BACKENDS[backend]()
+        GPIO = hardware.gpio
+    return hardware
+
+# Door timing and servo angles
+DOOR_LOCK_ANGLE = config('DOOR_LOCK_ANGLE', cast=float, default=0.0)
+DOOR_UNLOCK_ANGLE = config('DOOR_UNLOCK_ANGLE', cast=float, default=90.0)
+DOOR_HOLD_SECONDS = config('DOOR_HOLD_SECONDS', cast=float, default=5.0)
+SERVO_MOVE_SECONDS = config('SERVO_MOVE_SECONDS', cast=float, default=1.0)
+# With SERVO_SECONDS_PER_DEGREE set, a move takes |angle change| * that + SERVO_SETTLE_SECONDS instead of SERVO_MOVE_SECONDS
+SERVO_SECONDS_PER_DEGREE = config('SERVO_SECONDS_PER_DEGREE', cast=float, default=0.0)
+SERVO_SETTLE_SECONDS = config('SERVO_SETTLE_SECONDS', cast=float, default=0.1)
 
-def set_servo_angle(angle):
-    duty = angle / 18 + 2
-    servo.ChangeDutyCycle(duty)
-    time.sleep(1)  # Allow time for the servo to move
-    servo.ChangeDutyCycle(0)  # Stop sending a signal
+# Servo Classes
+class Servo:
+    """
+    RPi.GPIO software PWM. Simple, but the pulses are timed by a thread
+    that costs CPU and jitters under load; see SysfsPwmServo and
+    PigpioServo.
+    """
 
+    def __init__(self, pin, frequency=50):
+        self.pin = pin
+        self.frequency = frequency
+        self.angle = None  # Last commanded angle, unknown until the first move
+        init_hardware()
+        GPIO.setup(pin, GPIO.OUT)
+        # Initialize PWM for Servo Control
+        self.pwm = GPIO.PWM(pin, frequency)  # 50Hz frequency
+        self.pwm.start(0)  # Initialization with 0 duty cycle
 
-def lock_door():
-    set_servo_angle(0)  # Adjust this angle to securely lock
-    logger.info("Door locked.")
+    @staticmethod
+    def duty_for(angle):
+        """Duty cycle in percent of the period for angle."""
+        return angle / 18 + 2
 
-def unlock_door():
-    set_servo_angle(90)  # Adjust this angle to unlock
-    logger.info("Door unlocked.")
+    def move_time(self, angle):
+        """Seconds a move from the last commanded angle to angle takes."""
+        if SERVO_SECONDS_PER_DEGREE <= 0 or self.angle is None:
+            return SERVO_MOVE_SECONDS
+        return abs(angle - self.angle) * SERVO_SECONDS_PER_DEGREE + SERVO_SETTLE_SECONDS
+
+    def start_move(self, angle):
+        self._set_duty(self.duty_for(angle))
+        self.angle = angle
+
+    def stop_signal(self):
+        self._set_duty(0)  # Stop sending a signal
+
+    def set_angle(self, angle):
+        move_time = self.move_time(angle)
+        self.start_move(angle)
+        time.sleep(move_time)  # Allow time for the servo to move
+        self.stop_signal()
+
+    def stop(self):
+        self.pwm.stop()
+
+    def _set_duty(self, duty):
+        self.pwm.ChangeDutyCycle(duty)
+
+class SysfsPwmServo(Servo):
+    """
+    Kernel hardware PWM through /sys/class/pwm (dtoverlay=pwm or pwm-2chan).
+    The pulses come from the PWM peripheral, so they cost no CPU and do not
+    jitter. root can point at a fake sysfs tree.
+    """
+    # BCM pin -> channel of the Pi's PWM controller
+    CHANNELS = {12: 0, 18: 0, 13: 1, 19: 1}
+
+    def __init__(self, pin, frequency=50, chip=None, root=None):
+        if pin not in self.CHANNELS:
+            raise ValueError(f"GPIO {pin} has no hardware PWM, use one of {sorted(self.CHANNELS)}")
+        self.pin = pin
+        self.frequency = frequency
+        self.angle = None
+        chip = chip if chip is not None else config('SERVO_PWM_CHIP', cast=int, default=0)
+        root = root or config('SERVO_PWM_SYSFS_ROOT', default='/sys/class/pwm')
+        self.chip_path = os.path.join(root, f"pwmchip{chip}")
+        self.channel = self.CHANNELS[pin]
+        self.path = os.path.join(self.chip_path, f"pwm{self.channel}")
+        self.period_ns = round(1e9 / frequency)
+        if not os.path.isdir(self.path):
+            self._write_chip('export', self.channel)
+            # udev needs a moment to create the channel directory and fix its permissions
+            deadline = time.monotonic() + 1.0
+            while not os.path.isdir(self.path) and time.monotonic() < deadline:
+                time.sleep(0.01)
+        self._write('enable', 0)
+        self._write('duty_cycle', 0)  # Must never exceed the period, so clear it before changing the period
+        self._write('period', self.period_ns)
+        self._write('enable', 1)
+
+    def _write_chip(self, name, value):
+        with open(os.path.join(self.chip_path, name), 'w') as f:
+            f.write(str(value))
+
+    def _write(self, name, value):
+        with open(os.path.join(self.path, name), 'w') as f:
+            f.write(str(value))
+
+    def _set_duty(self, duty):
+        self._write('duty_cycle', round(self.period_ns * duty / 100))
+
+    def stop(self):
+        self._write('duty_cycle', 0)
+        self._write('enable', 0)
+        self._write_chip('unexport', self.channel)
+
+class PigpioServo(Servo):
+    """
+    PWM from the pigpio daemon (pigpiod), which times the pulses with DMA,
+    so any GPIO pin gets jitter-free pulses without a thread in this process.
+    """
+
+    def __init__(self, pin, frequency=50, pi=None):
+        self.pin = pin
+        self.frequency = frequency
+        self.angle = None
+        if pi is None:
+            import pigpio
+            pi = pigpio.pi()
+            if not pi.connected:
+                raise RuntimeError("Could not connect to pigpiod, is it running?")
+        self.pi = pi
+        self.period_us = round(1e6 / frequency)
+        self.pi.set_PWM_frequency(pin, frequency)
+        # One duty cycle step per microsecond of the period
+        self.pi.set_PWM_range(pin, self.period_us)
+        self.pi.set_PWM_dutycycle(pin, 0)
+
+    def _set_duty(self, duty):
+        self.pi.set_PWM_dutycycle(self.pin, round(self.period_us * duty / 100))
+
+    def stop(self):
+        self.pi.set_PWM_dutycycle(self.pin, 0)
+        self.pi.stop()
+
+SERVO_BACKENDS = {'gpio': Servo, 'sysfs': SysfsPwmServo, 'pigpio': PigpioServo}
+
+def create_servo(pin, backend=None):
+    """Builds the servo for pin on SERVO_BACKEND (gpio software PWM by default)."""
+    backend = backend or config('SERVO_BACKEND', default='gpio')
+    if backend not in SERVO_BACKENDS:
+        raise ValueError(f"Unknown SERVO_BACKEND {backend!r}, expected one of {sorted(SERVO_BACKENDS)}")
+    return SERVO_BACKENDS[backend](pin)
 
 # Configure logging
 class InfoWarningStreamHandler(logging.StreamHandler):
@@ -62,136 +512,3113 @@ class InfoWarningStreamHandler(logging.StreamHandler):
             self.stream = self._stdout
         super().emit(record)
 
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, for the log file."""
+
+    def format(self, record):
+        entry = {
+            'time': datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'thread': record.threadName,
+            'message': record.getMessage(),
+        }
+        suppressed = getattr(record, 'suppressed', 0)
+        if suppressed:
+            entry['suppressed'] = suppressed
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry['exception'] = record.exc_text
+        return json.dumps(entry)
+
+# Pass as extra= for messages logged on every idle poll, so RateLimitFilter can thin them out
+RATE_LIMITED = {'rate_limited': True}
+
+class RateLimitFilter(logging.Filter):
+    """
+    Lets through at most burst records per interval seconds from each call
+    site logged with extra=RATE_LIMITED; other records pass untouched. The
+    next record let through from a call site carries the number suppressed
+    since the last one.
+    """
+
+    def __init__(self, interval=None, burst=None):
+        super().__init__()
+        self.interval = interval if interval is not None else config('LOG_RATE_LIMIT_SECONDS', cast=float, default=60.0)
+        self.burst = burst if burst is not None else config('LOG_RATE_LIMIT_BURST', cast=int, default=1)
+        self._windows = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        if not getattr(record, 'rate_limited', False):
+            return True
+        key = (record.name, record.pathname, record.lineno)
+        now = time.monotonic()
+        with self._lock:
+            window_start, passed, suppressed = self._windows.get(key, (now, 0, 0))
+            if now - window_start >= self.interval:
+                window_start, passed = now, 0
+            if passed >= self.burst:
+                self._windows[key] = (window_start, passed, suppressed + 1)
+                return False
+            self._windows[key] = (window_start, passed + 1, 0)
+        record.suppressed = suppressed
+        if suppressed:
+            record.msg = f"{record.msg} ({suppressed} similar messages suppressed)"
+        return True
+
+class StructuredQueueHandler(QueueHandler):
+    """QueueHandler that keeps the traceback apart from the message, so JsonFormatter can put it in its own field."""
+
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+class AsyncLogPipeline:
+    """
+    Puts log records on a queue on the logging thread and writes them from
+    a QueueListener thread, so no scan waits for disk or console output.
+    """
+
+    def __init__(self, handlers):
+        self.queue = queue.SimpleQueue()
+        self.handler = StructuredQueueHandler(self.queue)
+        self.listener = QueueListener(self.queue, *handlers, respect_handler_level=True)
+        self.listener.start()
+        self._stopped = False
+        atexit.register(self.stop)
+
+    def stop(self):
+        """Writes out everything still queued."""
+        if not self._stopped:
+            self._stopped = True
+            self.listener.stop()
+
+LOG_LEVEL = config('LOG_LEVEL', default='INFO').upper()
+
+def set_log_level(level):
+    """Changes the level of all of the reader's logging at runtime. Returns the new level name."""
+    level = logging.getLevelName(level.upper()) if isinstance(level, str) else level
+    if not isinstance(level, int):
+        raise ValueError(f"Unknown log level {level!r}")
+    logging.getLogger().setLevel(level)
+    return logging.getLevelName(level)
+
+def toggle_debug_logging(sig=None, frame=None):
+    """SIGUSR1 handler: switches between DEBUG and LOG_LEVEL."""
+    level = LOG_LEVEL if logging.getLogger().level == logging.DEBUG else 'DEBUG'
+    logging.getLogger(__name__).warning(f"Log level changed to {set_log_level(level)}.")
+
 def configure_logging():
     log_directory = os.path.join(os.path.dirname(__file__), "logs")
     os.makedirs(log_directory, exist_ok=True)
     log_file = os.path.join(log_directory, "rfid_reader.log")
 
-    handlers = [RotatingFileHandler(log_file, maxBytes=5 * 1024 * 1024, backupCount=3)]
+    file_handler = RotatingFileHandler(log_file, maxBytes=5 * 1024 * 1024, backupCount=3)
+    text_formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    file_handler.setFormatter(JsonFormatter() if config('LOG_FORMAT', default='json') == 'json' else text_formatter)
+    handlers = [file_handler]
 
     if config('LOG_TO_CONSOLE', cast=bool, default=True):
-        handlers.append(InfoWarningStreamHandler())
+        console_handler = InfoWarningStreamHandler()
+        console_handler.setFormatter(text_formatter)
+        handlers.append(console_handler)
 
-    logging.basicConfig(level=logging.INFO,
-                        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-                        handlers=handlers)
+    pipeline = AsyncLogPipeline(handlers)
+    pipeline.handler.addFilter(RateLimitFilter())
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    root.addHandler(pipeline.handler)
+    set_log_level(LOG_LEVEL)
 
     return logging.getLogger(__name__)
 
 logger = configure_logging()
 
+def hash_rfid(rfid_id):
+    """Returns the SHA-256 hex digest stored in "ValidTag" for a raw RFID ID."""
+    return hashlib.sha256(str(rfid_id).encode()).hexdigest()
+
+# Outcome of an authorization. source is "cache", "db", "snapshot", "bloom" or "negative-cache" (rejected without
+# asking the database) or "none" (nothing could answer, denied).
+Decision = namedtuple('Decision', ['is_valid', 'source', 'logged', 'latency_ms'])
+
+# Scan Tracing
+class Trace:
+    """
+    Spans of one scan (or one relock), as (name, start, end) monotonic
+    times. The trace is written once every holder has called finish(): the
+    reader holds it while handling the scan, and the door holds it on top
+    until the servo has moved.
+    """
+
+    def __init__(self, tracer, kind, **fields):
+        self.tracer = tracer
+        self.kind = kind
+        self.fields = fields
+        self.start = time.monotonic()
+        self.wall_time = time.time()
+        self.spans = []
+        self._holds = 1
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def span(self, name):
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self.spans.append((name, start, time.monotonic()))
+
+    def add_span(self, name, start, end=None):
+        self.spans.append((name, start, end if end is not None else time.monotonic()))
+
+    def annotate(self, **fields):
+        self.fields.update(fields)
+
+    def hold(self):
+        with self._lock:
+            self._holds += 1
+
+    def finish(self, **fields):
+        with self._lock:
+            self.fields.update(fields)
+            self._holds -= 1
+            if self._holds != 0:
+                return
+        self.tracer.emit(self)
+
+    def record(self):
+        end = max([self.start] + [span_end for _, _, span_end in self.spans])
+        return {
+            'kind': self.kind,
+            'time': datetime.fromtimestamp(self.wall_time).isoformat(timespec='milliseconds'),
+            **self.fields,
+            'total_ms': round((end - self.start) * 1000, 3),
+            'spans': [{'name': name, 'start_ms': round((start - self.start) * 1000, 3),
+                       'ms': round((span_end - start) * 1000, 3)} for name, start, span_end in self.spans],
+        }
+
+class ScanTracer:
+    """
+    Writes one JSON line per finished Trace to TRACE_PATH (logs/traces.jsonl
+    by default, rotated like the main log) when TRACE_ENABLED is set.
+
+    The trace of the scan being handled is kept per thread (and per task in
+    the asyncio runtime), so span() can be used anywhere on the scan's path
+    without passing the trace around; with tracing off or no scan in
+    progress it does nothing.
+    """
+
+    def __init__(self, enabled=None, path=None):
+        self.enabled = enabled if enabled is not None else config('TRACE_ENABLED', cast=bool, default=False)
+        self.path = path or config('TRACE_PATH', default='') or \
+            os.path.join(os.path.dirname(__file__), "logs", "traces.jsonl")
+        self._current = contextvars.ContextVar('trace', default=None)
+        self._output = None
+        self._output_lock = threading.Lock()
+
+    def start(self, kind, attach=True, **fields):
+        """
+        Starts a trace and, with attach, makes it the current one of this
+        thread or task. Returns None when tracing is off.
+        """
+        if not self.enabled:
+            return None
+        trace = Trace(self, kind, **fields)
+        if attach:
+            self._current.set(trace)
+        return trace
+
+    def current(self):
+        return self._current.get()
+
+    def detach(self):
+        """Stops attributing spans on this thread or task to the current trace."""
+        self._current.set(None)
+
+    def span(self, name):
+        trace = self.current()
+        return trace.span(name) if trace is not None else nullcontext()
+
+    def annotate(self, **fields):
+        trace = self.current()
+        if trace is not None:
+            trace.annotate(**fields)
+
+    def emit(self, trace):
+        with self._output_lock:
+            if self._output is None:
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+                handler = RotatingFileHandler(self.path, maxBytes=5 * 1024 * 1024, backupCount=3)
+                handler.setFormatter(logging.Formatter('%(message)s'))
+                self._output = logging.getLogger(f"{__name__}.traces")
+                self._output.propagate = False
+                self._output.setLevel(logging.INFO)
+                self._output.addHandler(AsyncLogPipeline([handler]).handler)
+        self._output.info(json.dumps(trace.record()))
+
+tracer = ScanTracer()
+
+# Metrics
+class ShardedCounter:
+    """
+    Counter by one label, with one shard per thread. inc() only touches the
+    calling thread's own dict, so the hot path takes no lock; collect() adds
+    the shards up.
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+        self._shards = []
+        self._shards_lock = threading.Lock()
+
+    def _new_shard(self):
+        shard = self._local.shard = {}
+        with self._shards_lock:
+            self._shards.append(shard)
+        return shard
+
+    def inc(self, label='', amount=1):
+        try:
+            shard = self._local.shard
+        except AttributeError:
+            shard = self._new_shard()
+        shard[label] = shard.get(label, 0) + amount
+
+    def collect(self):
+        with self._shards_lock:
+            shards = list(self._shards)
+        totals = Counter()
+        for shard in shards:
+            totals.update(dict(shard))
+        return totals
+
+class ShardedHistogram:
+    """Histogram with fixed upper bounds (in seconds), sharded per thread like ShardedCounter."""
+
+    def __init__(self, buckets):
+        self.buckets = tuple(buckets)
+        self._local = threading.local()
+        self._shards = []
+        self._shards_lock = threading.Lock()
+
+    def _new_shard(self):
+        # Per bucket counts (the last one is +Inf), then the sum of all observations
+        shard = self._local.shard = [0] * (len(self.buckets) + 1) + [0.0]
+        with self._shards_lock:
+            self._shards.append(shard)
+        return shard
+
+    def observe(self, value):
+        try:
+            shard = self._local.shard
+        except AttributeError:
+            shard = self._new_shard()
+        shard[bisect.bisect_left(self.buckets, value)] += 1
+        shard[-1] += value
+
+    def collect(self):
+        """Returns (cumulative counts per bucket including +Inf, sum)."""
+        with self._shards_lock:
+            shards = [list(shard) for shard in self._shards]
+        counts = [sum(shard[i] for shard in shards) for i in range(len(self.buckets) + 1)]
+        cumulative, total = [], 0
+        for count in counts:
+            total += count
+            cumulative.append(total)
+        return cumulative, sum(shard[-1] for shard in shards)
+
+class Metrics:
+    """
+    The reader's metrics in the Prometheus text format. Hot-path counters
+    and histograms are sharded; everything else is read from the components
+    by the collectors added with add_collector() when /metrics is scraped.
+    """
+    PREFIX = 'portalwarden_'
+    LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+    def __init__(self):
+        self.scans = ShardedCounter()  # By outcome: granted, denied, suppressed, enrolled or error
+        self.reader_errors = ShardedCounter()
+        self.db_reconnects = ShardedCounter()  # By kind: pool, retry or listener
+        self.decision_seconds = ShardedHistogram(self.LATENCY_BUCKETS)
+        self.db_seconds = ShardedHistogram(self.LATENCY_BUCKETS)
+        self._collectors = []
+
+    def add_collector(self, name, kind, help_text, collect):
+        """collect() returns a number or a list of (labels dict, number)."""
+        self._collectors.append((name, kind, help_text, collect))
+
+    @staticmethod
+    def _escape(label_value):
+        # The exposition format only needs backslashes, double quotes and line breaks escaped in label values
+        return str(label_value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+    @staticmethod
+    def _sample(name, labels, value):
+        if labels:
+            label_text = ','.join(f'{key}="{Metrics._escape(label_value)}"' for key, label_value in labels.items())
+            return f"{name}{{{label_text}}} {value}"
+        return f"{name} {value}"
+
+    def _family(self, lines, name, kind, help_text, samples):
+        name = self.PREFIX + name
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        for labels, value in samples:
+            lines.append(self._sample(name, labels, value))
+
+    def _histogram(self, lines, name, help_text, histogram):
+        cumulative, total = histogram.collect()
+        bounds = [str(bound) for bound in histogram.buckets] + ['+Inf']
+        samples = [({'le': bound}, count) for bound, count in zip(bounds, cumulative)]
+        self._family(lines, name, 'histogram', help_text, [])
+        full_name = self.PREFIX + name
+        lines.extend(self._sample(f"{full_name}_bucket", labels, count) for labels, count in samples)
+        lines.append(f"{full_name}_sum {total}")
+        lines.append(f"{full_name}_count {cumulative[-1]}")
+
+    def render(self):
+        lines = []
+        self._family(lines, 'scans_total', 'counter', 'Scans by outcome.',
+                     [({'outcome': outcome}, count) for outcome, count in sorted(self.scans.collect().items())])
+        self._family(lines, 'reader_errors_total', 'counter', 'Errors while reading or handling a scan.',
+                     [({}, sum(self.reader_errors.collect().values()))])
+        self._family(lines, 'db_reconnects_total', 'counter', 'Database reconnects by kind.',
+                     [({'kind': kind}, count) for kind, count in sorted(self.db_reconnects.collect().items())])
+        self._histogram(lines, 'decision_seconds', 'Time to an authorization decision.', self.decision_seconds)
+        self._histogram(lines, 'db_seconds', 'Time of each database operation, including getting a connection.',
+                        self.db_seconds)
+        for name, kind, help_text, collect in self._collectors:
+            try:
+                value = collect()
+            except Exception as e:
+                logger.debug(f"Metrics collector {name} failed: {e}")
+                continue
+            samples = value if isinstance(value, list) else [({}, value)]
+            self._family(lines, name, kind, help_text, samples)
+        return '\n'.join(lines) + '\n'
+
+metrics = Metrics()
+
+class MetricsRequestHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?', 1)[0] != '/metrics':
+            self.send_error(404)
+            return
+        body = metrics.render().encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logger.debug(f"Metrics request from {self.address_string()}: {format % args}")
+
+class MetricsServer:
+    """Serves /metrics on METRICS_HOST:METRICS_PORT (localhost:9105 by default) from a background thread."""
+
+    def __init__(self, host=None, port=None):
+        self.host = host or config('METRICS_HOST', default='127.0.0.1')
+        self.port = port if port is not None else config('METRICS_PORT', cast=int, default=9105)
+        self._server = None
+
+    def start(self):
+        self._server = ThreadingHTTPServer((self.host, self.port), MetricsRequestHandler)
+        self._server.daemon_threads = True
+        self.port = self._server.server_address[1]  # The port actually bound when 0 was asked for
+        threading.Thread(target=self._server.serve_forever, name="metrics-server", daemon=True).start()
+        logger.info(f"Serving metrics on http://{self.host}:{self.port}/metrics")
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+
+# Real-time Scheduling
+class RealtimePolicy:
+    """
+    Keeps the reader and door threads responsive while the web server,
+    Prisma and Postgres load the other cores (REALTIME_ENABLED).
+
+    apply() moves the calling thread onto REALTIME_CPUS, raises it to
+    SCHED_FIFO at REALTIME_PRIORITY (or, with priority 0, only lowers its
+    nice value to REALTIME_NICE). lock_memory() locks the process's pages
+    with mlockall so a scan never waits for a page fault; thread stacks are
+    capped first, as every future stack gets locked in full. Each step
+    needs root or CAP_SYS_NICE/CAP_IPC_LOCK and is skipped with a warning
+    without it. For full isolation, also keep other tasks off the chosen
+    cores with isolcpus= on the kernel command line.
+    """
+    MCL_CURRENT, MCL_FUTURE = 1, 2
+
+    def __init__(self, enabled=None, cpus=None, priority=None, nice=None, mlock=None, stack_kb=None):
+        self.enabled = enabled if enabled is not None else config('REALTIME_ENABLED', cast=bool, default=False)
+        cpus = cpus if cpus is not None else config('REALTIME_CPUS', default='')
+        self.cpus = {int(cpu) for cpu in cpus.split(',') if cpu.strip()} if isinstance(cpus, str) else set(cpus)
+        self.priority = priority if priority is not None else config('REALTIME_PRIORITY', cast=int, default=50)
+        self.nice = nice if nice is not None else config('REALTIME_NICE', cast=int, default=-10)
+        self.mlock = mlock if mlock is not None else config('REALTIME_MLOCK', cast=bool, default=True)
+        self.stack_kb = stack_kb if stack_kb is not None else config('REALTIME_STACK_KB', cast=int, default=512)
+        self.applied = set()
+
+    def apply(self):
+        """Applies the policy to the calling thread. Does nothing unless enabled."""
+        if not self.enabled:
+            return
+        name = threading.current_thread().name
+        tid = threading.get_native_id()
+        try:
+            if self.cpus:
+                os.sched_setaffinity(tid, self.cpus)
+            if self.priority > 0:
+                os.sched_setscheduler(tid, os.SCHED_FIFO, os.sched_param(self.priority))
+            else:
+                os.setpriority(os.PRIO_PROCESS, tid, self.nice)  # Per thread on Linux
+        except (OSError, AttributeError, ValueError) as e:
+            logger.warning(f"Could not apply real-time scheduling to thread {name}: {e}")
+            return
+        self.applied.add(name)
+        policy = f"SCHED_FIFO {self.priority}" if self.priority > 0 else f"nice {self.nice}"
+        logger.info(f"Thread {name} runs with {policy}{f' on CPUs {sorted(self.cpus)}' if self.cpus else ''}.")
+
+    def lock_memory(self):
+        """Locks current and future pages in RAM. Call before starting threads."""
+        if not (self.enabled and self.mlock):
+            return
+        threading.stack_size(self.stack_kb * 1024)
+        try:
+            import ctypes
+            libc = ctypes.CDLL(None, use_errno=True)
+            if libc.mlockall(self.MCL_CURRENT | self.MCL_FUTURE) != 0:
+                raise OSError(ctypes.get_errno(), os.strerror(ctypes.get_errno()))
+        except (OSError, AttributeError) as e:
+            logger.warning(f"Could not lock memory: {e}")
+            return
+        logger.info(f"Memory locked, thread stacks limited to {self.stack_kb} KiB.")
+
+realtime_policy = RealtimePolicy()
+
+# Circuit Breaker Class
+class CircuitBreaker:
+    """
+    Stops sending authorizations to the database after failure_threshold
+    consecutive failures or missed deadlines. While open, a background thread
+    calls probe() every probe_interval seconds and closes the breaker again
+    on the first success.
+    """
+
+    def __init__(self, probe, failure_threshold=None, probe_interval=None):
+        self.probe = probe
+        self.failure_threshold = failure_threshold if failure_threshold is not None else \
+            config('DB_BREAKER_FAILURE_THRESHOLD', cast=int, default=3)
+        self.probe_interval = probe_interval if probe_interval is not None else \
+            config('DB_BREAKER_PROBE_SECONDS', cast=float, default=10.0)
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self.state = 'closed'
+        self.consecutive_failures = 0
+        self.open_count = 0
+        self.opened_at = None
+        self.on_change = None
+
+    def allow(self):
+        return self.state == 'closed'
+
+    def record_success(self):
+        self.consecutive_failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self.consecutive_failures += 1
+            if self.state != 'closed' or self.consecutive_failures < self.failure_threshold:
+                return
+            self.state = 'open'
+            self.open_count += 1
+            self.opened_at = time.monotonic()
+        logger.error(f"Database circuit breaker opened after {self.consecutive_failures} consecutive failures.")
+        self._notify()
+        threading.Thread(target=self._probe_loop, name="db-breaker-probe", daemon=True).start()
+
+    def stop(self):
+        self._stop.set()
+
+    def stats(self):
+        return {
+            'state': self.state,
+            'consecutive_failures': self.consecutive_failures,
+            'open_count': self.open_count,
+        }
+
+    def _probe_loop(self):
+        while not self._stop.wait(self.probe_interval):
+            try:
+                self.probe()
+            except Exception as e:
+                logger.debug(f"Database probe failed: {e}")
+                continue
+            with self._lock:
+                self.state = 'closed'
+                self.consecutive_failures = 0
+            logger.info(f"Database probe succeeded, circuit breaker closed after "
+                        f"{time.monotonic() - self.opened_at:.1f} s.")
+            self._notify()
+            return
+
+    def _notify(self):
+        if self.on_change is not None:
+            try:
+                self.on_change(self.state)
+            except Exception as e:
+                logger.error(f"Error in circuit breaker state callback: {e}")
+
+# Bloom Filter Class
+class BloomFilter:
+    """
+    Bloom filter over raw 32-byte tag digests. A miss means the tag is
+    certainly not in "ValidTag"; a hit may be a false positive. The digests
+    are already uniformly random, so the bit positions are derived from
+    them directly instead of hashing again.
+    """
+
+    def __init__(self, capacity, false_positive_rate=None):
+        false_positive_rate = false_positive_rate if false_positive_rate is not None else \
+            config('BLOOM_FALSE_POSITIVE_RATE', cast=float, default=0.01)
+        capacity = max(capacity, 1024)
+        self.size = int(math.ceil(-capacity * math.log(false_positive_rate) / math.log(2) ** 2))
+        self.hash_count = max(1, int(round(self.size / capacity * math.log(2))))
+        self._bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    @classmethod
+    def from_digests(cls, digests, capacity=None):
+        """Builds a filter from raw or hex digests. Leaves headroom for tags enrolled later."""
+        if capacity is None:
+            digests = list(digests)
+            capacity = 2 * len(digests)
+        bloom = cls(capacity)
+        for digest in digests:
+            bloom.add(digest)
+        return bloom
+
+    def _positions(self, digest):
+        raw = bytes.fromhex(digest) if isinstance(digest, str) else digest
+        h1 = int.from_bytes(raw[0:8], 'little')
+        h2 = int.from_bytes(raw[8:16], 'little') | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hash_count)]
+
+    def add(self, digest):
+        for position in self._positions(digest):
+            self._bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, digest):
+        bits = self._bits
+        return all(bits[position >> 3] & (1 << (position & 7)) for position in self._positions(digest))
+
+# Negative Cache Class
+class NegativeCache:
+    """Remembers digests the database rejected for ttl seconds, bounded to max_size entries (oldest evicted)."""
+
+    def __init__(self, ttl=None, max_size=None):
+        self.ttl = ttl if ttl is not None else config('NEGATIVE_CACHE_TTL_SECONDS', cast=float, default=60.0)
+        self.max_size = max_size if max_size is not None else config('NEGATIVE_CACHE_SIZE', cast=int, default=10000)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __contains__(self, digest):
+        expires = self._entries.get(digest)
+        if expires is None:
+            return False
+        if expires < time.monotonic():
+            self.discard(digest)
+            return False
+        return True
+
+    def __len__(self):
+        return len(self._entries)
+
+    def add(self, digest):
+        with self._lock:
+            self._entries[digest] = time.monotonic() + self.ttl
+            self._entries.move_to_end(digest)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def discard(self, digest):
+        with self._lock:
+            self._entries.pop(digest, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
 # Database Manager Class
 class DatabaseManager:
-    def __init__(self, dsn):
+    def __init__(self, dsn, min_connections=None, max_connections=None, health_check_interval=None, allowlist=None,
+                 snapshot=None):
         self.dsn = dsn
-        logger.info("DatabaseManager initialized with database connection string.")
+        self.allowlist = allowlist
+        self.snapshot = snapshot
+        # Built from the snapshot or the last full allowlist sync; None until then
+        self.bloom = None
+        self.negative_cache = NegativeCache() if config('NEGATIVE_CACHE_ENABLED', cast=bool, default=True) else None
+        self.max_connections = max_connections if max_connections is not None else config('DB_POOL_MAX', cast=int, default=4)
+        # ThreadedConnectionPool closes every returned connection beyond min_connections, so this is the number
+        # kept open between scans, not just the number opened up front
+        self.min_connections = min(self.max_connections, min_connections if min_connections is not None else
+                                   config('DB_POOL_MIN', cast=int, default=self.max_connections))
+        # getconn() fails instead of waiting once the pool is exhausted, so callers queue here first
+        self._slots = threading.BoundedSemaphore(self.max_connections)
+        self.pool_wait = config('DB_POOL_WAIT_SECONDS', cast=float, default=2.0)
+        # Connections idle for longer than this are pinged before being handed out again
+        self.health_check_interval = health_check_interval if health_check_interval is not None else \
+            config('DB_POOL_HEALTH_CHECK_SECONDS', cast=float, default=30.0)
+        self._pool = None
+        self._pool_lock = threading.Lock()
+        # Keyed by the connection itself: the pool closes connections on its own, and an id() can be reused
+        self._last_used = weakref.WeakKeyDictionary()
+        self._prepared = weakref.WeakSet()
+        # Without timeouts a hung Postgres would block the scan loop indefinitely
+        self._connect_kwargs = {
+            'connect_timeout': config('DB_CONNECT_TIMEOUT_SECONDS', cast=int, default=2),
+            'options': f"-c statement_timeout={config('DB_STATEMENT_TIMEOUT_MS', cast=int, default=1000)}",
+        }
+        # Latency budget for one authorization; past it the decision falls back to the local allowlist
+        self.budget = config('AUTH_BUDGET_MS', cast=float, default=150.0) / 1000
+        # One connection fewer than the pool, so authorizations can never starve the log writer
+        self._executor = ThreadPoolExecutor(max_workers=max(1, self.max_connections - 1), thread_name_prefix="db-auth")
+        self.breaker = CircuitBreaker(lambda: self.run(lambda cursor: cursor.execute("SELECT 1")))
+        self.decision_counts = ShardedCounter()  # By source, counted on every reader thread
+        self.db_queries = ShardedCounter()
+        logger.info(f"DatabaseManager initialized with database connection string "
+                    f"(pool size {self.min_connections}-{self.max_connections}).")
 
-    def insert_log(self, rfid_id, is_valid):
+    def _get_pool(self):
+        # The pool is created lazily so the reader can start while Postgres is still down
+        with self._pool_lock:
+            if self._pool is None:
+                self._pool = pool.ThreadedConnectionPool(self.min_connections, self.max_connections, self.dsn,
+                                                         **self._connect_kwargs)
+                logger.info("Database connection pool created.")
+            return self._pool
+
+    def _is_healthy(self, conn):
+        if conn.closed:
+            return False
+        last_used = self._last_used.get(conn)
+        if last_used is not None and time.monotonic() - last_used < self.health_check_interval:
+            return True
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def _acquire(self):
+        if not self._slots.acquire(timeout=self.pool_wait):
+            raise pool.PoolError(f"No database connection free within {self.pool_wait:.1f} s")
+        try:
+            db_pool = self._get_pool()
+            # Every pooled connection may be stale after a Postgres restart, so try each one at most once
+            for _ in range(self.max_connections + 1):
+                conn = db_pool.getconn()
+                if self._is_healthy(conn):
+                    return conn
+                logger.warning("Discarding unhealthy pooled database connection.")
+                metrics.db_reconnects.inc('pool')
+                self._put(conn, broken=True)
+        except BaseException:
+            self._slots.release()
+            raise
+        self._slots.release()
+        raise psycopg2.OperationalError("Could not obtain a healthy database connection from the pool")
+
+    def _release(self, conn, broken=False):
         try:
-            with psycopg2.connect(self.dsn) as conn:
+            self._put(conn, broken)
+        finally:
+            self._slots.release()
+
+    def _put(self, conn, broken):
+        if broken:
+            self._last_used.pop(conn, None)
+            self._prepared.discard(conn)
+        else:
+            self._last_used[conn] = time.monotonic()
+        try:
+            self._pool.putconn(conn, close=broken or bool(conn.closed))
+        except pool.PoolError as e:
+            logger.error(f"Error returning connection to the pool: {e}")
+
+    @contextmanager
+    def cursor(self):
+        """Yields a cursor on a pooled connection, committing on success and rolling back on error."""
+        conn = self._acquire()
+        broken = False
+        try:
+            with conn:
                 with conn.cursor() as cursor:
-                    cursor.execute(
-                        "INSERT INTO \"RfidLog\" (\"rfidId\", \"isvalid\", \"timestamp\") VALUES (%s, %s, %s)",
-                        (rfid_id, is_valid, datetime.now())
-                    )
-                    logger.info(f"RFID ID: {rfid_id} logged as {'valid' if is_valid else 'invalid'}.")
+                    yield cursor
+        except (psycopg2.OperationalError, psycopg2.InterfaceError):
+            broken = True
+            raise
+        finally:
+            self._release(conn, broken=broken)
+
+    def run(self, work):
+        """Runs work(cursor), reconnecting once if the pooled connection turns out to be dead."""
+        start = time.monotonic()
+        try:
+            with self.cursor() as cursor:
+                return work(cursor)
+        except (psycopg2.OperationalError, psycopg2.InterfaceError) as e:
+            logger.warning(f"Database connection lost ({e}). Reconnecting and retrying once.")
+            metrics.db_reconnects.inc('retry')
+            with self.cursor() as cursor:
+                return work(cursor)
+        finally:
+            metrics.db_seconds.observe(time.monotonic() - start)
+
+    def stats(self):
+        decisions = self.decision_counts.collect()
+        return {
+            'decisions': dict(decisions),
+            'db_queries': sum(self.db_queries.collect().values()),
+            'db_queries_avoided': decisions['bloom'] + decisions['negative-cache'],
+            'negative_cache_size': len(self.negative_cache) if self.negative_cache is not None else 0,
+            'breaker': self.breaker.stats(),
+        }
+
+    def connect(self):
+        """Opens a dedicated connection outside the pool, with the same timeouts."""
+        return psycopg2.connect(self.dsn, **self._connect_kwargs)
+
+    def close(self):
+        self.breaker.stop()
+        self._executor.shutdown(wait=False)
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.closeall()
+                self._pool = None
+                self._last_used.clear()
+                self._prepared.clear()
+                logger.info("Database connection pool closed.")
+
+    def insert_log(self, rfid_id, is_valid):
+        try:
+            with tracer.span('insert_log'):
+                self.run(lambda cursor: cursor.execute(
+                    "INSERT INTO \"RfidLog\" (\"rfidId\", \"isValid\", \"timestamp\") VALUES (%s, %s, %s)",
+                    (rfid_id, is_valid, datetime.now())
+                ))
+            logger.info(f"RFID ID: {rfid_id} logged as {'valid' if is_valid else 'invalid'}.")
         except psycopg2.Error as e:
             logger.error(f"Database error when inserting log entry: {e.pgcode}: {e.pgerror}", exc_info=True)
 
+    def insert_logs(self, rows):
+        """
+        Inserts (event_id, rfid_id, is_valid, timestamp) rows in one statement. Errors are left to the caller.
+        Rows whose event ID is already present are skipped, so a batch can safely be retried.
+        """
+        self.run(lambda cursor: execute_values(
+            cursor,
+            "INSERT INTO \"RfidLog\" (\"eventId\", \"rfidId\", \"isValid\", \"timestamp\") VALUES %s "
+            "ON CONFLICT (\"eventId\") DO NOTHING",
+            rows,
+            page_size=max(len(rows), 1)
+        ))
+
+    def authorize_and_log(self, rfid_id, event_id=None):
+        """
+        Checks the tag and logs the attempt in one round trip through the authorize_and_log database
+        function, using a statement prepared once per pooled connection. Returns (is_valid, username).
+        Errors are left to the caller.
+        """
+        event_id = event_id or uuid.uuid4().hex
+        params = (rfid_id, hash_rfid(rfid_id), event_id, datetime.now())
+
+        def prepare(cursor):
+            cursor.execute(
+                "PREPARE authorize_and_log_stmt (BIGINT, TEXT, TEXT, TIMESTAMP) AS "
+                "SELECT * FROM \"authorize_and_log\"($1, $2, $3, $4)"
+            )
+            self._prepared.add(cursor.connection)
+
+        def execute(cursor):
+            if cursor.connection not in self._prepared:
+                prepare(cursor)
+            try:
+                cursor.execute("EXECUTE authorize_and_log_stmt (%s, %s, %s, %s)", params)
+            except pg_errors.InvalidSqlStatementName:
+                # The session lost the statement (DISCARD ALL, a pooler in between), so prepare it again once
+                logger.warning("Prepared authorize_and_log statement missing on this connection, preparing it again.")
+                cursor.connection.rollback()
+                prepare(cursor)
+                cursor.execute("EXECUTE authorize_and_log_stmt (%s, %s, %s, %s)", params)
+            return cursor.fetchone()
+
+        is_valid, username = self.run(execute)
+        logger.info(f"RFID ID: {rfid_id} authorized and logged as {'valid' if is_valid else 'invalid'}"
+                    f"{f' for user {username}' if username else ''}.")
+        return is_valid, username
+
+    def authorize(self, rfid_id, event_id=None, log=False):
+        """
+        Decides whether a tag may enter and returns a Decision.
+
+        A live allowlist cache answers directly. Tags missing from the Bloom
+        filter or recently rejected by the database are denied without a
+        query. Otherwise the database is asked within the latency budget (through authorize_and_log when log is
+        set), and if it misses the budget, fails or the circuit breaker is
+        open, the decision falls back to the cache, then the snapshot.
+        """
+        start = time.monotonic()
+        with tracer.span('hash'):
+            hash_rfid_id = hash_rfid(rfid_id)
+        logger.debug(f"Hashed RFID ID: {hash_rfid_id}")
+
+        def decided(is_valid, source, logged=False):
+            latency_ms = (time.monotonic() - start) * 1000
+            self.decision_counts.inc(source)
+            metrics.decision_seconds.observe(latency_ms / 1000)
+            tracer.annotate(source=source)
+            logger.info(f"Tag exists: {is_valid} (source: {source}, {latency_ms:.1f} ms)")
+            return Decision(is_valid, source, logged, latency_ms)
+
+        allowlist = self.allowlist
+        if allowlist is not None and allowlist.is_live():
+            return decided(allowlist.contains(hash_rfid_id), 'cache')
+
+        # Cheap rejections so floods of unknown cards never reach the database
+        # The Bloom filter only misses tags the cache has seen; without a cache it would go stale
+        if allowlist is not None and self.bloom is not None and hash_rfid_id not in self.bloom:
+            return decided(False, 'bloom')
+        if self.negative_cache is not None and hash_rfid_id in self.negative_cache:
+            return decided(False, 'negative-cache')
+
+        if self.breaker.allow():
+            self.db_queries.inc()
+            if log:
+                future = self._executor.submit(lambda: self.authorize_and_log(rfid_id, event_id)[0])
+            else:
+                future = self._executor.submit(self.run, lambda cursor: self._query_validity(cursor, hash_rfid_id))
+            try:
+                with tracer.span('db'):
+                    is_valid = future.result(timeout=self.budget)
+                self.breaker.record_success()
+                if not is_valid and self.negative_cache is not None:
+                    self.negative_cache.add(hash_rfid_id)
+                return decided(is_valid, 'db', logged=log)
+            except FutureTimeout:
+                self.breaker.record_failure()
+                logger.warning(f"Database missed the {self.budget * 1000:.0f} ms authorization budget.")
+            except psycopg2.Error as e:
+                self.breaker.record_failure()
+                logger.error(f"Database error when checking RFID validity: {e.pgcode}: {e.pgerror}")
+        else:
+            logger.debug("Database circuit breaker is open, skipping the database.")
+
+        if allowlist is not None and allowlist.is_ready():
+            return decided(allowlist.contains(hash_rfid_id), 'cache')
+        if self.snapshot is not None and self.snapshot.is_loaded():
+            return decided(self.snapshot.contains(hash_rfid_id), 'snapshot')
+        logger.error("No database, allowlist cache or snapshot available, denying access.")
+        return decided(False, 'none')
+
+    @staticmethod
+    def _query_validity(cursor, hash_rfid_id):
+        cursor.execute('SELECT EXISTS(SELECT 1 FROM "ValidTag" WHERE "tag" = %s)', (hash_rfid_id,))
+        return cursor.fetchone()[0]
+
     def check_validity(self, rfid_id):
+        return self.authorize(rfid_id).is_valid
+
+# Allowlist Snapshot Class
+class AllowlistSnapshot:
+    """
+    On-disk copy of the "ValidTag" digests for offline authorization.
+
+    The base file is a 32-byte header (magic, format, version, count)
+    followed by the raw 32-byte digests in sorted order. It is memory-mapped
+    and searched with binary search, so loading it costs no parsing.
+    Individual changes are appended to a delta journal next to it (one
+    '+'/'-' byte plus the digest per record) and folded into a new base once
+    compact_threshold records have accumulated or on the next full sync.
+    """
+    MAGIC = b'PWAL'
+    FORMAT = 1
+    HEADER = struct.Struct('<4sHHQQ8x')
+    RECORD_SIZE = 32
+
+    def __init__(self, path=None, compact_threshold=None):
+        self.path = path or config('SNAPSHOT_PATH', default='') or \
+            os.path.join(os.path.dirname(__file__), "spool", "allowlist.snapshot")
+        self.delta_path = self.path + ".delta"
+        self.compact_threshold = compact_threshold if compact_threshold is not None else \
+            config('SNAPSHOT_COMPACT_THRESHOLD', cast=int, default=1000)
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._mm = None
+        self._count = 0
+        self._delta = {}
+        self._delta_records = 0
+        self.base_version = 0
+        self.version = 0
+
+    def is_loaded(self):
+        return self._mm is not None
+
+    def has_delta(self):
+        return self._delta_records > 0
+
+    def __len__(self):
+        return self._count + sum(1 if added else -1 for added in self._delta.values())
+
+    def load(self):
+        """Maps the snapshot and replays its delta journal. Returns False if there is no usable snapshot."""
+        try:
+            with open(self.path, 'rb') as f:
+                mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (FileNotFoundError, ValueError):
+            return False
+
+        magic, file_format, _, version, count = self.HEADER.unpack_from(mm, 0) if len(mm) >= self.HEADER.size \
+            else (None, None, None, None, None)
+        if magic != self.MAGIC or file_format != self.FORMAT or \
+                len(mm) != self.HEADER.size + count * self.RECORD_SIZE:
+            logger.error(f"Ignoring corrupt allowlist snapshot {self.path}.")
+            mm.close()
+            return False
+
+        delta = {}
+        records = 0
+        try:
+            with open(self.delta_path, 'rb') as f:
+                journal = f.read()
+            # A torn trailing record from a crash is ignored
+            for offset in range(0, len(journal) - len(journal) % (self.RECORD_SIZE + 1), self.RECORD_SIZE + 1):
+                delta[journal[offset + 1:offset + 1 + self.RECORD_SIZE]] = journal[offset:offset + 1] == b'+'
+                records += 1
+        except FileNotFoundError:
+            pass
+
+        with self._lock:
+            self._mm, self._count, self._delta, self._delta_records = mm, count, delta, records
+            self.base_version = version
+            self.version = version + records
+        logger.info(f"Allowlist snapshot v{self.version} loaded: {count} tags, {records} pending changes.")
+        return True
+
+    def contains(self, digest):
+        try:
+            raw = bytes.fromhex(digest)
+        except ValueError:
+            return False
+        added = self._delta.get(raw)
+        if added is not None:
+            return added
+
+        mm, size = self._mm, self.RECORD_SIZE
+        if mm is None:
+            return False
+        lo, hi = 0, self._count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            offset = self.HEADER.size + mid * size
+            record = mm[offset:offset + size]
+            if record < raw:
+                lo = mid + 1
+            elif record > raw:
+                hi = mid
+            else:
+                return True
+        return False
+
+    def write(self, digests):
+        """Atomically replaces the base snapshot with the given hex digests and clears the delta journal."""
+        records = sorted({bytes.fromhex(d) for d in digests if len(d) == 2 * self.RECORD_SIZE})
+        with self._lock:
+            version = self.version + 1
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(self.HEADER.pack(self.MAGIC, self.FORMAT, 0, version, len(records)))
+                f.write(b''.join(records))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+            with open(self.delta_path, 'wb') as f:
+                os.fsync(f.fileno())
+            self._delta, self._delta_records = {}, 0
+            self.version = version
+        self.load()
+
+    def apply(self, added, digest):
+        """Records a single insert or delete in the delta journal."""
+        try:
+            raw = bytes.fromhex(digest)
+        except ValueError:
+            return
+        if len(raw) != self.RECORD_SIZE:
+            return
+        with self._lock:
+            with open(self.delta_path, 'ab') as f:
+                f.write((b'+' if added else b'-') + raw)
+                f.flush()
+                os.fsync(f.fileno())
+            self._delta[raw] = added
+            self._delta_records += 1
+            self.version += 1
+            needs_compaction = self._delta_records >= self.compact_threshold
+
+        if needs_compaction:
+            self.compact()
+
+    def raw_digests(self):
+        """Yields every valid raw digest: the base records with the delta journal applied."""
+        with self._lock:
+            mm, count, delta = self._mm, self._count, dict(self._delta)
+        if mm is not None:
+            for i in range(count):
+                offset = self.HEADER.size + i * self.RECORD_SIZE
+                raw = mm[offset:offset + self.RECORD_SIZE]
+                if delta.get(raw, True):
+                    yield raw
+        for raw, added in delta.items():
+            if added:
+                yield raw
+
+    def compact(self):
+        """Folds the delta journal into a new base snapshot."""
+        self.write({raw.hex() for raw in self.raw_digests()})
+
+# Allowlist Cache Class
+class AllowlistCache:
+    """
+    In-memory copy of the "ValidTag" digests.
+
+    A background thread LISTENs on CHANNEL, which db.js notifies
+    whenever a tag is added or removed, and applies each change to the set.
+    A full resync runs after every (re)connect and every resync_interval
+    seconds in case a notification was missed. Every change is mirrored to
+    the optional AllowlistSnapshot. Syncs on request (request_resync) also
+    run on the listener, so no sync can overtake a later notification.
+    """
+    CHANNEL = 'valid_tag_changed'
+
+    def __init__(self, db_manager, resync_interval=None, snapshot=None):
+        self.db_manager = db_manager
+        self.snapshot = snapshot
+        self.resync_interval = resync_interval if resync_interval is not None else \
+            config('ALLOWLIST_RESYNC_SECONDS', cast=float, default=300.0)
+        self._digests = set()
+        self._ready = False
+        self._live = False
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._resync = threading.Event()
+        self._thread = None
+        self.last_sync_time = None
+        self.sync_count = 0
+        self.change_count = 0
+        # Time from the admin's change in db.js until it is applied here, in milliseconds
+        self.last_propagation_ms = None
+        self.last_revocation_ms = None
+        self.max_revocation_ms = None
+
+    def is_ready(self):
+        return self._ready
+
+    def is_live(self):
+        """True while the cache is loaded and its listener is connected, so no change can have been missed."""
+        return self._ready and self._live
+
+    def contains(self, digest):
+        return digest in self._digests
+
+    def __len__(self):
+        return len(self._digests)
+
+    def request_resync(self, timeout):
+        """
+        Has the listener run a full sync at its next wakeup, at most a second
+        away, and waits up to timeout seconds for it. Returns True once done.
+        """
+        count = self.sync_count
+        self._resync.set()
+        deadline = time.monotonic() + timeout
+        while self.sync_count == count:
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(0.05)
+        return True
+
+    def full_sync(self):
+        def query(cursor):
+            cursor.execute('SELECT "tag" FROM "ValidTag"')
+            return {row[0] for row in cursor}
+
+        self._install(self.db_manager.run(query))
+
+    def _install(self, digests):
+        if self._replace(digests):
+            self.snapshot.write(digests)
+
+    def _replace(self, digests):
+        """Installs digests in memory. Returns True if the snapshot has to be rewritten with them."""
+        with self._lock:
+            changed = digests != self._digests
+            self._digests = digests
+            self._ready = True
+            self.last_sync_time = time.time()
+            self.sync_count += 1
+        self.db_manager.bloom = BloomFilter.from_digests(digests)
+        logger.info(f"Allowlist cache synchronised: {len(digests)} valid tags.")
+        return self.snapshot is not None and (changed or not self.snapshot.is_loaded() or self.snapshot.has_delta())
+
+    def apply_notification(self, payload):
+        change = self._apply_change(payload)
+        if change is not None and self.snapshot is not None:
+            self.snapshot.apply(*change)
+
+    def _apply_change(self, payload):
+        """Applies a notification in memory. Returns (added, digest) for the snapshot, or None if it was ignored."""
         try:
-            logger.info("Attempting to connect to the database for RFID validity check.")
-            with psycopg2.connect(self.dsn) as conn:
+            change = json.loads(payload)
+            operation, digest = change['operation'], change['tag']
+        except (ValueError, KeyError, TypeError):
+            logger.warning(f"Ignoring malformed allowlist notification: {payload!r}")
+            return None
+
+        with self._lock:
+            if operation == 'insert':
+                self._digests.add(digest)
+                # Removals cannot be expressed in a Bloom filter; removed tags just cost a query until the next sync
+                if self.db_manager.bloom is not None:
+                    self.db_manager.bloom.add(digest)
+                if self.db_manager.negative_cache is not None:
+                    self.db_manager.negative_cache.discard(digest)
+            elif operation == 'delete':
+                self._digests.discard(digest)
+            else:
+                logger.warning(f"Ignoring unknown allowlist operation '{operation}'.")
+                return None
+            self.change_count += 1
+
+        sent_at = change.get('sentAt')
+        if sent_at is not None:
+            self.last_propagation_ms = max(0.0, time.time() * 1000 - float(sent_at))
+            if operation == 'delete':
+                self.last_revocation_ms = self.last_propagation_ms
+                self.max_revocation_ms = max(self.max_revocation_ms or 0.0, self.last_propagation_ms)
+                logger.info(f"Allowlist revocation applied {self.last_propagation_ms:.1f} ms after it was issued.")
+        logger.info(f"Allowlist cache updated ({operation}), {len(self._digests)} valid tags.")
+        return operation == 'insert', digest
+
+    def stats(self):
+        return {
+            'ready': self._ready,
+            'live': self._live,
+            'size': len(self._digests),
+            'sync_count': self.sync_count,
+            'change_count': self.change_count,
+            'last_sync_time': self.last_sync_time,
+            'last_propagation_ms': self.last_propagation_ms,
+            'last_revocation_ms': self.last_revocation_ms,
+            'max_revocation_ms': self.max_revocation_ms,
+        }
+
+    def start(self):
+        self._thread = threading.Thread(target=self._listen_loop, name="allowlist-listener", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+    def _listen_loop(self):
+        backoff = 1
+        while not self._stop.is_set():
+            conn = None
+            try:
+                # LISTEN needs its own autocommit connection that is never returned to the pool
+                conn = self.db_manager.connect()
+                conn.autocommit = True
                 with conn.cursor() as cursor:
-                    # Hash the RFID ID with SHA-256 for comparison
-                    hash_rfid_id = hashlib.sha256(str(rfid_id).encode()).hexdigest()
-                    logger.info(f"Hashed RFID ID: {hash_rfid_id}")
-                    cursor.execute('SELECT EXISTS(SELECT 1 FROM "ValidTag" WHERE "tag" = %s)', (hash_rfid_id,))
-                    exists = cursor.fetchone()[0]
-                    logger.info(f"Tag exists: {exists}")
-                    return exists
-        except psycopg2.Error as e:
-            logger.error(f"Database error when checking RFID validity: {e.pgcode}: {e.pgerror}", exc_info=True)
+                    cursor.execute(f"LISTEN {self.CHANNEL}")
+                logger.info(f"Listening for allowlist changes on channel '{self.CHANNEL}'.")
+                self._resync.clear()
+                self.full_sync()
+                self._live = True
+                backoff = 1
+                next_resync = time.monotonic() + self.resync_interval
+
+                while not self._stop.is_set():
+                    timeout = min(1.0, max(0.0, next_resync - time.monotonic()))
+                    if select.select([conn], [], [], timeout)[0]:
+                        conn.poll()
+                        while conn.notifies:
+                            self.apply_notification(conn.notifies.pop(0).payload)
+                    if self._resync.is_set() or time.monotonic() >= next_resync:
+                        self._resync.clear()
+                        self.full_sync()
+                        next_resync = time.monotonic() + self.resync_interval
+            except Exception as e:
+                self._live = False
+                metrics.db_reconnects.inc('listener')
+                logger.error(f"Allowlist listener lost its database connection: {e}. Retrying in {backoff} s.")
+                self._stop.wait(backoff)
+                backoff = min(backoff * 2, 60)
+            finally:
+                if conn is not None:
+                    conn.close()
+
+# Log Spool Class
+class LogSpool:
+    """
+    Append-only SQLite (WAL) spool for "RfidLog" rows that could not be written to Postgres.
+
+    Each append is one transaction, so a whole batch costs a single fsync.
+    Rows keep their insertion order and are only removed after Postgres has
+    committed them.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or config('SPOOL_PATH', default='') or \
+            os.path.join(os.path.dirname(__file__), "spool", "rfid_log_spool.db")
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=FULL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS spool ("
+            "seq INTEGER PRIMARY KEY AUTOINCREMENT, event_id TEXT NOT NULL, rfid_id INTEGER NOT NULL, "
+            "is_valid INTEGER, timestamp TEXT NOT NULL)"
+        )
+        self._pending = self._conn.execute("SELECT COUNT(*) FROM spool").fetchone()[0]
+        if self._pending:
+            logger.warning(f"Log spool contains {self._pending} entries from a previous run.")
+
+    def pending(self):
+        return self._pending
+
+    def append(self, rows):
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.executemany(
+                    "INSERT INTO spool (event_id, rfid_id, is_valid, timestamp) VALUES (?, ?, ?, ?)",
+                    [(event_id, rfid_id, None if is_valid is None else int(is_valid), timestamp.isoformat())
+                     for event_id, rfid_id, is_valid, timestamp in rows]
+                )
+                self._conn.execute("COMMIT")
+            except sqlite3.Error:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._pending += len(rows)
+
+    def peek(self, limit):
+        """Returns (last_seq, rows) for the oldest spooled entries."""
+        with self._lock:
+            records = self._conn.execute(
+                "SELECT seq, event_id, rfid_id, is_valid, timestamp FROM spool ORDER BY seq LIMIT ?", (limit,)
+            ).fetchall()
+        rows = [(event_id, rfid_id, None if is_valid is None else bool(is_valid), datetime.fromisoformat(timestamp))
+                for _, event_id, rfid_id, is_valid, timestamp in records]
+        return (records[-1][0] if records else None), rows
+
+    def remove_through(self, seq):
+        with self._lock:
+            removed = self._conn.execute("DELETE FROM spool WHERE seq <= ?", (seq,)).rowcount
+            self._pending = max(0, self._pending - removed)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+# RFID Log Writer Class
+class RfidLogWriter:
+    """
+    Writes "RfidLog" rows from a bounded queue on a background thread.
+
+    Rows are flushed in one statement once batch_size rows are waiting or
+    flush_interval seconds have passed. When the queue is full, the 'drop'
+    policy discards the new row and 'block' waits up to block_timeout
+    seconds for space before dropping it.
+
+    If Postgres is unreachable, batches go to the LogSpool instead and are
+    replayed in order every replay_interval seconds until it is empty. While
+    the spool holds rows, new batches are appended behind them.
+    """
+    _STOP = object()
+
+    def __init__(self, db_manager, max_queue_size=None, batch_size=None, flush_interval=None,
+                 full_policy=None, block_timeout=None, spool=None, replay_interval=None):
+        self.db_manager = db_manager
+        self.spool = spool
+        self.replay_interval = replay_interval if replay_interval is not None else \
+            config('SPOOL_REPLAY_SECONDS', cast=float, default=5.0)
+        self.batch_size = batch_size if batch_size is not None else config('LOG_BATCH_SIZE', cast=int, default=50)
+        self.flush_interval = flush_interval if flush_interval is not None else \
+            config('LOG_FLUSH_SECONDS', cast=float, default=1.0)
+        self.full_policy = full_policy or config('LOG_QUEUE_FULL_POLICY', default='drop')
+        if self.full_policy not in ('drop', 'block'):
+            raise ValueError(f"LOG_QUEUE_FULL_POLICY must be 'drop' or 'block', not '{self.full_policy}'")
+        self.block_timeout = block_timeout if block_timeout is not None else \
+            config('LOG_QUEUE_BLOCK_SECONDS', cast=float, default=0.5)
+        self._queue = queue.Queue(maxsize=max_queue_size if max_queue_size is not None else
+                                  config('LOG_QUEUE_SIZE', cast=int, default=1000))
+        self._thread = threading.Thread(target=self._run, name="rfid-log-writer", daemon=True)
+        self._closed = False
+        # Backpressure metrics
+        self.enqueued = 0
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+        self.batches = 0
+        self.max_depth = 0
+        self.blocked_seconds = 0.0
+        self.spooled = 0
+        self.replayed = 0
+
+    def start(self):
+        self._thread.start()
+
+    def submit(self, rfid_id, is_valid, event_id=None):
+        """Queues an access attempt for logging. Never touches the database on the caller's thread."""
+        # The event ID makes replays and retries idempotent, see DatabaseManager.insert_logs
+        row = (event_id or uuid.uuid4().hex, rfid_id, is_valid, datetime.now())
+        try:
+            if self.full_policy == 'block':
+                start = time.monotonic()
+                try:
+                    self._queue.put(row, timeout=self.block_timeout)
+                finally:
+                    self.blocked_seconds += time.monotonic() - start
+            else:
+                self._queue.put_nowait(row)
+        except queue.Full:
+            self.dropped += 1
+            logger.warning(f"RFID log queue full, dropped log entry for RFID ID: {rfid_id}.")
             return False
+        self.enqueued += 1
+        self.max_depth = max(self.max_depth, self._queue.qsize())
+        return True
+
+    def depth(self):
+        return self._queue.qsize()
+
+    def stats(self):
+        return {
+            'depth': self.depth(),
+            'max_depth': self.max_depth,
+            'enqueued': self.enqueued,
+            'written': self.written,
+            'dropped': self.dropped,
+            'failed': self.failed,
+            'batches': self.batches,
+            'blocked_seconds': self.blocked_seconds,
+            'policy': self.full_policy,
+            'spooled': self.spooled,
+            'replayed': self.replayed,
+            'spool_pending': self.spool.pending() if self.spool is not None else 0,
+        }
+
+    def close(self, timeout=10):
+        """Flushes everything still queued and stops the writer thread."""
+        if self._closed:
+            return
+        self._closed = True
+        if self._thread.is_alive():
+            self._queue.put(self._STOP)
+            self._thread.join(timeout)
+        else:
+            self._drain_remaining()
+        if self.spool is not None:
+            if self.spool.pending():
+                logger.warning(f"{self.spool.pending()} RFID log entries remain spooled in {self.spool.path}.")
+            self.spool.close()
+        logger.info(f"RFID log writer stopped, {self.written} entries written, {self.dropped} dropped.")
+
+    def _run(self):
+        batch = []
+        deadline = None
+        next_replay = time.monotonic()
+        while True:
+            wakeups = []
+            if deadline is not None:
+                wakeups.append(deadline)
+            if self.spool is not None and self.spool.pending():
+                wakeups.append(next_replay)
+            timeout = max(0.0, min(wakeups) - time.monotonic()) if wakeups else None
+            try:
+                row = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                row = None
+
+            if row is self._STOP:
+                self._flush(batch)
+                self._drain_remaining()
+                if self.spool is not None and self.spool.pending():
+                    self._replay_spool()
+                return
+            if row is not None:
+                batch.append(row)
+                if deadline is None:
+                    deadline = time.monotonic() + self.flush_interval
+
+            if len(batch) >= self.batch_size or (batch and time.monotonic() >= deadline):
+                self._flush(batch)
+                batch = []
+                deadline = None
+
+            if self.spool is not None and self.spool.pending() and time.monotonic() >= next_replay:
+                self._replay_spool()
+                next_replay = time.monotonic() + self.replay_interval
+
+    def _drain_remaining(self):
+        batch = []
+        while True:
+            try:
+                row = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if row is not self._STOP:
+                batch.append(row)
+            if len(batch) >= self.batch_size:
+                self._flush(batch)
+                batch = []
+        self._flush(batch)
+
+    def _flush(self, batch):
+        if not batch:
+            return
+        if self.spool is not None and self.spool.pending():
+            # Older entries are still spooled, queue behind them to keep the log in order
+            self._spool_batch(batch)
+            return
+        try:
+            self.db_manager.insert_logs(batch)
+            self.written += len(batch)
+            self.batches += 1
+            logger.debug(f"Wrote {len(batch)} RFID log entries.")
+        except (psycopg2.DataError, psycopg2.IntegrityError) as e:
+            # The rows themselves are rejected, retrying them later would fail the same way
+            self.failed += len(batch)
+            logger.error(f"Database error when writing {len(batch)} RFID log entries: {e.pgcode}: {e.pgerror}")
+        except Exception as e:
+            # Unreachable database, exhausted pool, open breaker, ...: keep the rows for the replay
+            if self.spool is None:
+                self.failed += len(batch)
+                logger.error(f"Could not write, lost {len(batch)} RFID log entries: {e}")
+            else:
+                logger.warning(f"Could not write, spooling {len(batch)} RFID log entries: {e}")
+                self._spool_batch(batch)
+
+    def _spool_batch(self, batch):
+        try:
+            self.spool.append(batch)
+            self.spooled += len(batch)
+        except sqlite3.Error as e:
+            self.failed += len(batch)
+            logger.error(f"Could not spool {len(batch)} RFID log entries: {e}", exc_info=True)
+
+    def _replay_spool(self, chunk_size=500):
+        replayed = 0
+        while self.spool.pending():
+            last_seq, rows = self.spool.peek(chunk_size)
+            if not rows:
+                break
+            try:
+                self.db_manager.insert_logs(rows)
+            except psycopg2.Error as e:
+                logger.warning(f"Replaying spooled RFID log entries failed, will retry: {e}")
+                break
+            # Only forget the rows once Postgres has committed them
+            self.spool.remove_through(last_seq)
+            replayed += len(rows)
+            self.replayed += len(rows)
+            self.written += len(rows)
+            self.batches += 1
+        if replayed:
+            logger.info(f"Replayed {replayed} spooled RFID log entries, {self.spool.pending()} still pending.")
+
+def read_uid_no_block(simple_reader):
+    """
+    UID-only read: REQA, anticollision and select, without the sector
+    authentication and block reads SimpleMFRC522.read_no_block() does to get
+    the card text. Returns (id, '') like read_no_block(), or (None, None).
+    """
+    chip = simple_reader.READER
+    status, _ = chip.MFRC522_Request(chip.PICC_REQIDL)
+    if status != chip.MI_OK:
+        return None, None
+    status, uid = chip.MFRC522_Anticoll()
+    if status != chip.MI_OK:
+        return None, None
+    chip.MFRC522_SelectTag(uid)
+    return simple_reader.uid_to_num(uid), ''
+
+# Scheduler Class
+class Scheduler:
+    """Runs callbacks at monotonic deadlines on one dedicated thread, under realtime_policy if realtime is set."""
+
+    def __init__(self, name, realtime=False):
+        self.realtime = realtime
+        self._queue = []
+        self._sequence = 0
+        self._condition = threading.Condition()
+        self._stopped = False
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def call_later(self, delay, callback, *args):
+        with self._condition:
+            self._sequence += 1
+            heapq.heappush(self._queue, (time.monotonic() + delay, self._sequence, callback, args))
+            self._condition.notify()
+
+    def stop(self):
+        with self._condition:
+            self._stopped = True
+            self._condition.notify()
+        self._thread.join(timeout=5)
+
+    def _run(self):
+        if self.realtime:
+            realtime_policy.apply()
+        while True:
+            with self._condition:
+                while not self._stopped and (not self._queue or self._queue[0][0] > time.monotonic()):
+                    self._condition.wait(self._queue[0][0] - time.monotonic() if self._queue else None)
+                if self._stopped:
+                    return
+                _, _, callback, args = heapq.heappop(self._queue)
+            try:
+                callback(*args)
+            except Exception as e:
+                logger.error(f"Error in scheduled callback {getattr(callback, '__name__', callback)}: {e}",
+                             exc_info=True)
+
+# Door Controller Class
+class DoorController:
+    """
+    Timer-driven door state machine: locked -> unlocking -> open -> relocking -> locked.
+
+    Servo moves only start the PWM signal; stopping it and every state
+    change happen on the scheduler thread, so request_open() returns
+    immediately. Opening an already open door extends the hold time, and
+    opening while relocking turns the servo around.
+    """
+    LOCKED, UNLOCKING, OPEN, RELOCKING = 'locked', 'unlocking', 'open', 'relocking'
+
+    def __init__(self, servo=None, name='door', scheduler=None, hold_seconds=None, move_seconds=None):
+        self.name = name
+        self.logger = logger.getChild(name)
+        self.servo = servo or create_servo(SERVO_PIN)
+        # One scheduler per door, so a slow actuation never delays another door
+        self.scheduler = scheduler or Scheduler(f"door-{name}", realtime=True)
+        self.hold_seconds = hold_seconds if hold_seconds is not None else DOOR_HOLD_SECONDS
+        # None asks the servo how long each move takes
+        self.move_seconds = move_seconds
+        self.state = self.LOCKED
+        self.open_until = None
+        self.open_count = 0
+        self.extend_count = 0
+        self._lock = threading.RLock()
+        # Bumped on every transition so timers scheduled for an earlier state are ignored
+        self._generation = 0
+        # Traces of the scan being unlocked for and of the current relock, with the time the move started
+        self._unlock_trace = None
+        self._relock_trace = None
+        self._move_started = None
+
+    def request_open(self, trace=None):
+        """Opens the door, or extends the hold time. A given scan trace gets an 'unlock' span once the servo has moved."""
+        with self._lock:
+            self.open_until = time.monotonic() + self._move_time(DOOR_UNLOCK_ANGLE) + self.hold_seconds
+            if self.state in (self.LOCKED, self.RELOCKING):
+                self.open_count += 1
+                if self._relock_trace is not None:
+                    self._relock_trace.finish(interrupted=True)
+                    self._relock_trace = None
+                self._move(self.UNLOCKING, DOOR_UNLOCK_ANGLE, self._unlocked)
+                if trace is not None:
+                    trace.hold()
+                    self._unlock_trace = trace
+                self.logger.info("Door unlocking.")
+            else:
+                self.extend_count += 1
+                if self.state == self.OPEN:
+                    self._schedule_relock()
+                self.logger.info("Door already open, hold time extended.")
+
+    def _move_time(self, angle):
+        return self.move_seconds if self.move_seconds is not None else self.servo.move_time(angle)
+
+    def _move(self, state, angle, on_done):
+        self._generation += 1
+        self.state = state
+        self._move_started = time.monotonic()
+        move_time = self._move_time(angle)
+        self.servo.start_move(angle)
+        self.scheduler.call_later(move_time, self._if_current, self._generation, on_done)
+
+    def _if_current(self, generation, callback):
+        with self._lock:
+            if generation == self._generation:
+                callback()
+
+    def _unlocked(self):
+        self.servo.stop_signal()
+        self.state = self.OPEN
+        if self._unlock_trace is not None:
+            self._unlock_trace.add_span('unlock', self._move_started)
+            self._unlock_trace.finish()
+            self._unlock_trace = None
+        self.logger.info("Door unlocked.")
+        self._schedule_relock()
+
+    def _schedule_relock(self):
+        self._generation += 1
+        self.scheduler.call_later(max(0.0, self.open_until - time.monotonic()), self._if_current,
+                                  self._generation, self._relock)
+
+    def _relock(self):
+        self._relock_trace = tracer.start('relock', attach=False, door=self.name)
+        self._move(self.RELOCKING, DOOR_LOCK_ANGLE, self._locked)
+
+    def _locked(self):
+        self.servo.stop_signal()
+        self.state = self.LOCKED
+        self._generation += 1
+        self.open_until = None
+        if self._relock_trace is not None:
+            self._relock_trace.add_span('relock', self._move_started)
+            self._relock_trace.finish()
+            self._relock_trace = None
+        self.logger.info("Door locked.")
+
+    def shutdown(self):
+        """Stops the timers and makes sure the door ends up locked."""
+        self.scheduler.stop()
+        with self._lock:
+            self._generation += 1
+            if self.state != self.LOCKED:
+                self.servo.set_angle(DOOR_LOCK_ANGLE)
+                self.state = self.LOCKED
+                self.logger.info("Door locked.")
+            self.servo.stop()
+
+# LED Pattern Engine Class
+# Each step is (green, red, seconds). Background patterns repeat until replaced.
+LED_PATTERNS = {
+    'accept': ([(1, 0, 0.5), (0, 0, 0.5)] * 3, False),
+    'deny': ([(0, 1, 0.5), (0, 0, 0.5)] * 3, False),
+    'error': ([(0, 1, 0.1), (0, 0, 0.1)] * 5, False),
+    'offline': ([(0, 1, 0.2), (0, 0, 0.2), (0, 1, 0.2), (0, 0, 1.4)], True),
+    'heartbeat': ([(1, 1, 0.05), (0, 1, 1.95)], True),
+    'enrolled': ([(1, 0, 1.5), (0, 0, 0.2)], False),
+}
+LED_IDLE = (0, 1)  # Red LED on, indicating system is active
+
+class LedPatternEngine:
+    """
+    Plays LED_PATTERNS on a dedicated thread.
+
+    play() starts a one-shot pattern and preempts whatever is showing;
+    set_background() selects the repeating pattern shown otherwise (or the
+    idle state for None). Step times are derived from the pattern start on
+    the monotonic clock, so long patterns do not drift. GREEN_LED_PIN and
+    RED_LED_PIN are not PWM-capable pins, so plain GPIO writes are used.
+    """
+
+    def __init__(self, output=None, green_pin=None, red_pin=None):
+        self.green_pin = green_pin if green_pin is not None else GREEN_LED_PIN
+        self.red_pin = red_pin if red_pin is not None else RED_LED_PIN
+        if output is None:
+            init_hardware()
+            GPIO.setup(self.green_pin, GPIO.OUT)
+            GPIO.setup(self.red_pin, GPIO.OUT)
+        self.output = output or GPIO.output
+        self._condition = threading.Condition()
+        self._foreground = None
+        self._background = None
+        self._version = 0
+        self._stopped = False
+        self._current = (None, None)
+        self._thread = threading.Thread(target=self._run, name="led-patterns", daemon=True)
+        self._thread.start()
+
+    def play(self, name):
+        with self._condition:
+            self._foreground = name
+            self._version += 1
+            self._condition.notify()
+
+    def set_background(self, name):
+        with self._condition:
+            if name == self._background:
+                return
+            self._background = name
+            self._version += 1
+            self._condition.notify()
+
+    def cancel(self):
+        """Stops the one-shot pattern and returns to the background pattern."""
+        self.play(None)
+
+    def current_pattern(self):
+        return self._foreground or self._background
+
+    def stop(self):
+        with self._condition:
+            self._stopped = True
+            self._condition.notify()
+        self._thread.join(timeout=2)
+
+    def _apply(self, green, red):
+        if (green, red) == self._current:
+            return
+        self.output(self.green_pin, 1 if green else 0)
+        self.output(self.red_pin, 1 if red else 0)
+        self._current = (green, red)
+
+    def _run(self):
+        with self._condition:
+            while not self._stopped:
+                version = self._version
+                name = self._foreground or self._background
+                if name is None:
+                    self._apply(*LED_IDLE)
+                    self._condition.wait_for(lambda: self._stopped or self._version != version)
+                    continue
+
+                steps, repeat = LED_PATTERNS[name]
+                step_start = time.monotonic()
+                index = 0
+                while not self._stopped and self._version == version:
+                    green, red, seconds = steps[index]
+                    self._apply(green, red)
+                    deadline = step_start + seconds
+                    self._condition.wait_for(lambda: self._stopped or self._version != version,
+                                             timeout=max(0.0, deadline - time.monotonic()))
+                    step_start = deadline
+                    index += 1
+                    if index == len(steps):
+                        if not repeat:
+                            if self._version == version:
+                                self._foreground = None
+                            break
+                        index = 0
+            self._apply(*LED_IDLE)
+
+# IRQ Card Detector Class
+class IrqCardDetector:
+    """
+    Waits for a card using the MFRC522 IRQ line instead of polling.
+
+    Only the receive interrupt is routed to the (active low) IRQ pin. Every
+    kick_interval seconds a bare REQA is started with three register writes;
+    the chip raises IRQ only if a card answers, which wakes the waiting
+    thread through a GPIO edge callback. The full read happens afterwards.
+    """
+    # Register values from the MFRC522 datasheet
+    IRQ_INVERTED_RX_ENABLED = 0xA0  # ComIEnReg: IRqInv | RxIEn
+    CLEAR_ALL_IRQS = 0x7F  # ComIrqReg: Set1 = 0 clears the marked bits
+    START_SEND_7_BITS = 0x87  # BitFramingReg: StartSend, 7 valid bits for REQA
+
+    def __init__(self, mfrc522, irq_pin, kick_interval=None):
+        self.mfrc522 = mfrc522
+        self.irq_pin = irq_pin
+        self.kick_interval = kick_interval if kick_interval is not None else \
+            config('READER_IRQ_KICK_MS', cast=float, default=100.0) / 1000
+        self._card_event = threading.Event()
+        self.irq_count = 0
+        init_hardware()
+        GPIO.setup(irq_pin, GPIO.IN, pull_up_down=GPIO.PUD_UP)
+        GPIO.add_event_detect(irq_pin, GPIO.FALLING, callback=self._on_irq)
+
+    def _on_irq(self, channel):
+        self.irq_count += 1
+        self._card_event.set()
+
+    def arm(self):
+        # Reads through MFRC522_ToCard reprogram ComIEnReg, so restore the IRQ routing before waiting again
+        self.mfrc522.Write_MFRC522(self.mfrc522.CommIEnReg, self.IRQ_INVERTED_RX_ENABLED)
+        self.mfrc522.Write_MFRC522(self.mfrc522.CommIrqReg, self.CLEAR_ALL_IRQS)
+        self._card_event.clear()
+
+    def _kick(self):
+        chip = self.mfrc522
+        chip.Write_MFRC522(chip.FIFODataReg, chip.PICC_REQIDL)
+        chip.Write_MFRC522(chip.CommandReg, chip.PCD_TRANSCEIVE)
+        chip.Write_MFRC522(chip.BitFramingReg, self.START_SEND_7_BITS)
+
+    def wait_for_card(self, timeout):
+        """Returns True as soon as a card answers, or False after timeout seconds without one."""
+        self.arm()
+        deadline = time.monotonic() + timeout
+        while True:
+            self._kick()
+            remaining = deadline - time.monotonic()
+            if self._card_event.wait(min(self.kick_interval, max(0.0, remaining))):
+                return True
+            if remaining <= self.kick_interval:
+                return False
+            self.mfrc522.Write_MFRC522(self.mfrc522.CommIrqReg, self.CLEAR_ALL_IRQS)
+
+    def close(self):
+        GPIO.remove_event_detect(self.irq_pin)
+
+# Scan Debouncer Class
+class ScanDebouncer:
+    """
+    Suppresses repeated reads of a card that is still on the reader.
+
+    Tracks the UIDs seen in the last window seconds in insertion order of
+    their latest read, so expired entries are always at the front. A read is
+    suppressed while its UID was last seen less than window seconds ago;
+    every read refreshes that time, so a card left on the reader stays
+    suppressed until it has been gone for a full window.
+    """
+
+    def __init__(self, window=None):
+        self.window = window if window is not None else config('DEBOUNCE_SECONDS', cast=float, default=3.0)
+        self._last_seen = OrderedDict()
+        self.passed = 0
+        self.suppressed = 0
+
+    def should_process(self, rfid_id, now=None):
+        now = time.monotonic() if now is None else now
+        # Drop cards that have left the field
+        while self._last_seen:
+            uid, seen = next(iter(self._last_seen.items()))
+            if now - seen < self.window:
+                break
+            self._last_seen.popitem(last=False)
+
+        present = rfid_id in self._last_seen
+        self._last_seen[rfid_id] = now
+        self._last_seen.move_to_end(rfid_id)
+        if present:
+            self.suppressed += 1
+            return False
+        self.passed += 1
+        return True
+
+    def stats(self):
+        return {
+            'window_seconds': self.window,
+            'cards_present': len(self._last_seen),
+            'passed': self.passed,
+            'suppressed': self.suppressed,
+        }
+
+# Reader Watchdog Class
+class ReaderWatchdog:
+    """
+    Detects an MFRC522 that has stopped answering and resets it.
+
+    A latched-up chip looks just like a reader with no card on it, since
+    REQA simply times out. So whenever no card has been read for
+    check_interval seconds, the watchdog reads VersionReg, which a working
+    chip always answers with its version (a dead SPI link reads 0x00 or
+    0xFF), and ErrorReg, where TempErr or BufferOvfl mean the chip has shut
+    down. After failure_threshold bad checks in a row it pulses RST low and
+    re-initialises the chip. The time from the first bad check until the
+    chip answers again is counted as downtime. Without an RST pin only the
+    re-initialisation over SPI is possible.
+    """
+    VERSION_REG, ERROR_REG = 0x37, 0x06
+    DEAD_VERSIONS = (0x00, 0xFF)
+    FATAL_ERRORS = 0x50  # ErrorReg: TempErr | BufferOvfl
+    RESET_PULSE_SECONDS = 0.01  # The datasheet needs 100 ns, this leaves room for slow GPIO
+    STARTUP_SECONDS = 0.05  # Oscillator start-up after RST goes high
+
+    def __init__(self, chip, rst_pin=-1, log=None, check_interval=None, failure_threshold=None):
+        self.chip = chip
+        self.rst_pin = rst_pin
+        self.logger = log or logger
+        self.check_interval = check_interval if check_interval is not None else \
+            config('READER_WATCHDOG_CHECK_SECONDS', cast=float, default=10.0)
+        self.failure_threshold = failure_threshold if failure_threshold is not None else \
+            config('READER_WATCHDOG_FAILURES', cast=int, default=2)
+        self.version = None
+        self.last_ok = time.monotonic()
+        self.down_since = None
+        self.failures = 0
+        self.resets = 0
+        self.downtime = 0.0
+        self.register_errors = 0
+        if rst_pin < 0:
+            self.logger.info("No RST pin configured, the reader watchdog can only re-initialise the chip over SPI.")
+
+    def after_read(self, card_read):
+        """Called after every read attempt; runs a health check when one is due."""
+        now = time.monotonic()
+        if card_read:
+            self.last_ok = now
+            self.failures = 0
+            if self.down_since is not None:
+                self._recovered(now)
+        elif now - self.last_ok >= self.check_interval:
+            self.check(now)
+
+    def check(self, now=None):
+        """Reads the version and error registers. Returns True if the chip looks healthy."""
+        now = time.monotonic() if now is None else now
+        try:
+            version = self.chip.Read_MFRC522(self.VERSION_REG)
+            errors = self.chip.Read_MFRC522(self.ERROR_REG)
+            problem = None
+            if version in self.DEAD_VERSIONS:
+                problem = f"version register reads 0x{version:02X}"
+            elif errors & self.FATAL_ERRORS:
+                problem = f"error register 0x{errors:02X}"
+            elif errors:
+                self.register_errors += 1  # Protocol, parity, CRC or collision errors from a marginal card
+        except Exception as e:
+            problem = f"SPI error: {e}"
+        self.last_ok = now  # Next check in check_interval seconds, whatever the outcome
+        if problem is None:
+            if self.version != version:
+                self.version = version
+                self.logger.info(f"MFRC522 answering, version 0x{version:02X}.")
+            self.failures = 0
+            if self.down_since is not None:
+                self._recovered(now)
+            return True
+
+        self.failures += 1
+        if self.down_since is None:
+            self.down_since = now
+        self.logger.warning(f"MFRC522 health check failed ({problem}), {self.failures} in a row.", extra=RATE_LIMITED)
+        if self.failures >= self.failure_threshold:
+            self.reset()
+        return False
+
+    def reset(self):
+        self.resets += 1
+        self.failures = 0
+        self.logger.error(f"MFRC522 not responding, resetting it (reset {self.resets}).")
+        try:
+            if self.rst_pin >= 0:
+                GPIO.output(self.rst_pin, GPIO.LOW)
+                time.sleep(self.RESET_PULSE_SECONDS)
+                GPIO.output(self.rst_pin, GPIO.HIGH)
+                time.sleep(self.STARTUP_SECONDS)
+            self.chip.MFRC522_Init()
+        except Exception as e:
+            self.logger.error(f"MFRC522 reset failed: {e}")
+            return
+        # Check again on the next idle read rather than a full interval later
+        self.last_ok = time.monotonic() - self.check_interval
+
+    def _recovered(self, now):
+        down = now - self.down_since
+        self.downtime += down
+        self.down_since = None
+        self.logger.info(f"MFRC522 recovered after {down:.1f} s.")
+
+    def is_healthy(self):
+        return self.down_since is None
+
+    def downtime_seconds(self):
+        """Total downtime, including the current outage."""
+        return self.downtime + (time.monotonic() - self.down_since if self.down_since is not None else 0.0)
+
+    def stats(self):
+        return {
+            'healthy': self.is_healthy(),
+            'version': self.version,
+            'resets': self.resets,
+            'downtime_seconds': self.downtime_seconds(),
+            'register_errors': self.register_errors,
+        }
 
 # RFID Reader Class
 class RFIDReader:
-    def __init__(self, db_manager):
-        self.reader = SimpleMFRC522()
+    def __init__(self, db_manager, log_writer=None, door=None, leds=None, reader=None, name='door', irq_pin=None,
+                 rst_pin=-1):
+        self.name = name
+        self.logger = logger.getChild(name)
+        self.reader = reader or init_hardware().open_reader(pin_rst=rst_pin)
         self.db_manager = db_manager
-        self.last_scan_time = None
-        self.last_invalid_scan_time = None
+        self.log_writer = log_writer
+        self.door = door or DoorController(name=name)
+        self.leds = leds or LedPatternEngine()
+        self.use_authorize_function = config('DB_AUTHORIZE_FUNCTION', cast=bool, default=True)
+        self.poll_interval = config('READER_POLL_SECONDS', cast=float, default=1.0)
+        # The card text is never used for authorization, so only read it when asked to
+        self.read_text = config('READER_READ_TEXT', cast=bool, default=False)
+        self.card_detector = None
+        if config('READER_MODE', default='poll') == 'irq':
+            try:
+                irq_pin = irq_pin if irq_pin is not None else config('READER_IRQ_PIN', cast=int, default=24)
+                self.card_detector = IrqCardDetector(self.reader.READER, irq_pin)
+                self.logger.info("Card detection is interrupt driven.")
+            except Exception as e:
+                self.logger.error(f"Could not set up IRQ card detection, falling back to polling: {e}")
+        # Even in IRQ mode, do a full read at this interval in case the IRQ line is not wired
+        self.irq_fallback_interval = config('READER_IRQ_FALLBACK_SECONDS', cast=float, default=5.0)
+        self.debouncer = ScanDebouncer()
+        self.enrollment = None  # Set by ControlServer.enroll(), takes the next card instead of authorizing it
+        self.watchdog = None
+        if config('READER_WATCHDOG_ENABLED', cast=bool, default=True):
+            # READER_RST_PIN=-1 still has an RST line on the Pi, the one the mfrc522 library picks
+            self.watchdog = ReaderWatchdog(self.reader.READER, init_hardware().resolve_rst_pin(rst_pin), self.logger)
+
+    def run(self, stop_event):
+        realtime_policy.apply()
+        while not stop_event.is_set():
+            self.read_rfid()
 
     def read_rfid(self):
-        logger.info("Attempting to read RFID...")
-
-        try:
-            id, text = self.reader.read_no_block()  # Attempt to read RFID tag
-            if id:
-                logger.info(f"RFID ID: {id} read. Text: '{text}'")  # Log successful read
-                is_valid = self.db_manager.check_validity(id)  # Check validity of the RFID tag
-
-                if is_valid:
-                    logger.info("RFID code valid. Unlocking door...")
-                    self.blink_led(GREEN_LED_PIN, duration=3)  # Blink green LED to indicate valid tag
-                    unlock_door()  # Unlock the door
-                    time.sleep(5)  # Keep the door unlocked for 5 seconds
-                    lock_door()  # Lock the door
-                    logger.info("Door re-locked.")
-                else:
-                    logger.warning("RFID code invalid. Access denied.")  # Log an invalid RFID attempt
-                    self.blink_led(RED_LED_PIN, duration=3)  # Blink red LED to indicate invalid tag
-                    GPIO.output(RED_LED_PIN, GPIO.HIGH)  # Ensure red LED is on after blinking
-            else:
-                logger.debug("No RFID tag detected.")  # Log if no tag is detected
+        self.logger.info("Attempting to read RFID...", extra=RATE_LIMITED)
+        trace = tracer.start('scan', door=self.name)
+        scanned = counted = False
 
+        try:
+            with tracer.span('read'):
+                id, text = self.read_card()  # Attempt to read RFID tag
+            if self.accept_card(id, text):
+                scanned = True
+                with tracer.span('authorize'):
+                    is_valid = self.authorize(id)  # Check validity of the RFID tag and log the attempt
+                counted = True
+                self.act_on_decision(is_valid, trace)
         except Exception as e:
-            logger.error(f"Error during RFID read or processing: {e}", exc_info=True)  # Log any exceptions with traceback
+            self.scan_failed(e, scanned and not counted)
+        finally:
+            self.end_trace(trace, scanned)
+
+        self.wait_for_card()
+
+    # The steps of a scan shared by read_rfid() and AsyncReaderService, which only differ in how they wait
+    def accept_card(self, id, text):
+        """Returns True if the card that was read is to be authorized, False if there was none or it was handled."""
+        if not id:
+            self.logger.debug("No RFID tag detected.", extra=RATE_LIMITED)  # Log if no tag is detected
+            return False
+        # Before the debouncer, so a card tapped just before the enrollment started can still be enrolled
+        if self.enrollment is not None and self.enrollment.complete(id, self.name):
+            self.logger.info(f"RFID ID: {id} read for enrollment.")
+            metrics.scans.inc('enrolled')
+            self.leds.play('enrolled')
+            self.debouncer.should_process(id)  # Keeps the card from being authorized while it is still held there
+            return False
+        if not self.debouncer.should_process(id):
+            self.logger.debug(f"RFID ID: {id} still on the reader, read suppressed.")
+            metrics.scans.inc('suppressed')
+            return False
+        self.logger.info(f"RFID ID: {id} read. Text: '{text}'")  # Log successful read
+        return True
 
-        time.sleep(1)  # Delay between attempts to prevent rapid-fire reading
+    def act_on_decision(self, is_valid, trace):
+        tracer.annotate(granted=bool(is_valid))
+        metrics.scans.inc('granted' if is_valid else 'denied')
+        if is_valid:
+            self.logger.info("RFID code valid. Unlocking door...")
+            self.door.request_open(trace)  # Returns immediately, the door relocks on its own timer
+            with tracer.span('led'):
+                self.leds.play('accept')  # Blink green LED to indicate valid tag
+        else:
+            self.logger.warning("RFID code invalid. Access denied.")  # Log an invalid RFID attempt
+            with tracer.span('led'):
+                self.leds.play('deny')  # Blink red LED to indicate invalid tag
+
+    def scan_failed(self, e, uncounted):
+        self.logger.error(f"Error during RFID read or processing: {e}", exc_info=True)  # Log any exceptions with traceback
+        self.leds.play('error')
+        tracer.annotate(error=str(e))
+        metrics.reader_errors.inc()
+        if uncounted:
+            metrics.scans.inc('error')
+
+    def end_trace(self, trace, scanned):
+        tracer.detach()
+        # Polls without a card (or with a suppressed repeat) are not traced
+        if trace is not None and scanned:
+            trace.finish()
+
+    def stats(self):
+        return {
+            'door_state': self.door.state,
+            'debounce': self.debouncer.stats(),
+            'watchdog': self.watchdog.stats() if self.watchdog is not None else None,
+        }
+
+    def read_card(self):
+        if self.read_text:
+            id, text = self.reader.read_no_block()
+        else:
+            id, text = read_uid_no_block(self.reader)
+        if self.watchdog is not None:
+            self.watchdog.after_read(id is not None)
+        return id, text
+
+    def wait_for_card(self):
+        if self.card_detector is not None:
+            self.card_detector.wait_for_card(self.irq_fallback_interval)
+        else:
+            time.sleep(self.poll_interval)  # Delay between attempts to prevent rapid-fire reading
 
 
 
+    def authorize(self, rfid_id):
+        # One event ID for both the database function and the log writer, so a late database reply cannot log twice
+        event_id = uuid.uuid4().hex
+        decision = self.db_manager.authorize(rfid_id, event_id=event_id, log=self.use_authorize_function)
+        return self.record_decision(rfid_id, decision, event_id)
+
+    async def authorize_async(self, rfid_id):
+        """authorize() against an AsyncDatabaseManager."""
+        event_id = uuid.uuid4().hex
+        decision = await self.db_manager.authorize(rfid_id, event_id=event_id, log=self.use_authorize_function)
+        return self.record_decision(rfid_id, decision, event_id)
+
+    def record_decision(self, rfid_id, decision, event_id):
+        if not decision.logged:
+            self.log_access(rfid_id, decision.is_valid, event_id)
+        return decision.is_valid
+
+    def log_access(self, rfid_id, is_valid, event_id=None):
+        with tracer.span('log'):
+            if self.log_writer is not None:
+                self.log_writer.submit(rfid_id, is_valid, event_id)  # Written in the background, never delays the door
+            else:
+                self.db_manager.insert_log(rfid_id, is_valid)
+
     def cleanup(self):
         try:
-            servo.stop()
-            GPIO.cleanup()
+            self.leds.stop()
+            self.door.shutdown()
+            if self.card_detector is not None:
+                self.card_detector.close()
+        except Exception as e:
+            self.logger.error(f"Error during cleanup: {e}")
+
+
+DoorConfig = namedtuple('DoorConfig', ['name', 'spi_bus', 'spi_device', 'rst_pin', 'servo_pin',
+                                       'green_led_pin', 'red_led_pin', 'irq_pin'])
+
+# GPIO pins every door needs for itself. Only the first door may take them from .env.
+DOOR_PIN_KEYS = ('servo_pin', 'green_led_pin', 'red_led_pin', 'irq_pin', 'rst_pin')
+
+def load_door_configs():
+    """
+    Reads the door list from the JSON file named by DOORS_FILE (a list of
+    objects with DoorConfig keys). Missing keys of the first door fall back
+    to the single-door .env values; every other door must give its own
+    DOOR_PIN_KEYS, and no GPIO pin (an rst_pin of -1 counting as the pin
+    the hardware backend resolves it to) or SPI chip select may be shared.
+    Without DOORS_FILE there is one door configured from .env.
+    """
+    defaults = {
+        'name': 'door',
+        'spi_bus': config('READER_SPI_BUS', cast=int, default=0),
+        'spi_device': config('READER_SPI_DEVICE', cast=int, default=0),
+        'rst_pin': config('READER_RST_PIN', cast=int, default=-1),
+        'servo_pin': SERVO_PIN,
+        'green_led_pin': GREEN_LED_PIN,
+        'red_led_pin': RED_LED_PIN,
+        'irq_pin': config('READER_IRQ_PIN', cast=int, default=24),
+    }
+    doors_file = config('DOORS_FILE', default='')
+    if not doors_file:
+        return [DoorConfig(**defaults)]
+
+    with open(doors_file) as f:
+        entries = json.load(f)
+    doors = []
+    for i, entry in enumerate(entries):
+        missing = [key for key in DOOR_PIN_KEYS if key not in entry]
+        if i > 0 and missing:
+            raise ValueError(f"Door {entry.get('name', i + 1)} in {doors_file} must set {', '.join(missing)}; "
+                             f"only the first door falls back to the .env pins")
+        doors.append(DoorConfig(**{**defaults, 'name': f"door{i + 1}", **entry}))
+    names = [door.name for door in doors]
+    if len(set(names)) != len(names):
+        raise ValueError(f"Door names in {doors_file} must be unique: {names}")
+
+    users = {}
+    for door in doors:
+        for key in DOOR_PIN_KEYS:
+            pin = getattr(door, key)
+            if key == 'rst_pin':
+                pin = init_hardware().resolve_rst_pin(pin)  # -1 is a real pin on the Pi
+            if pin < 0:
+                continue  # Not wired
+            if pin in users:
+                raise ValueError(f"GPIO {pin} is used twice in {doors_file}: {users[pin]} and {door.name} {key}")
+            users[pin] = f"{door.name} {key}"
+    chip_selects = [(door.spi_bus, door.spi_device) for door in doors]
+    if len(set(chip_selects)) != len(chip_selects):
+        raise ValueError(f"Each door in {doors_file} needs its own SPI bus and device: {chip_selects}")
+    return doors
+
+def create_reader(door_config, db_manager, log_writer, scheduler=None):
+    """Builds the reader, door and LEDs for one door. All doors share db_manager and log_writer."""
+    door = DoorController(create_servo(door_config.servo_pin), name=door_config.name, scheduler=scheduler)
+    leds = LedPatternEngine(green_pin=door_config.green_led_pin, red_pin=door_config.red_led_pin)
+    mfrc522 = init_hardware().open_reader(door_config.spi_bus, door_config.spi_device, door_config.rst_pin)
+    return RFIDReader(db_manager, log_writer, door=door, leds=leds, reader=mfrc522, name=door_config.name,
+                      irq_pin=door_config.irq_pin, rst_pin=door_config.rst_pin)
+
+def register_metrics(db_manager, log_writer, readers):
+    """Adds the collectors that read the shared components and every door when /metrics is scraped."""
+    metrics.add_collector('decisions_total', 'counter', 'Authorization decisions by source.',
+                          lambda: [({'source': source}, count)
+                                   for source, count in sorted(db_manager.decision_counts.collect().items())])
+
+    def cache_hit_ratio():
+        decisions = db_manager.decision_counts.collect()
+        total = sum(decisions.values())
+        return decisions['cache'] / total if total else 0.0
+
+    metrics.add_collector('cache_hit_ratio', 'gauge', 'Share of decisions answered by the allowlist cache.',
+                          cache_hit_ratio)
+    metrics.add_collector('db_queries_total', 'counter', 'Authorizations sent to the database.',
+                          lambda: sum(db_manager.db_queries.collect().values()))
+    metrics.add_collector('db_breaker_open', 'gauge', '1 while the database circuit breaker is open.',
+                          lambda: 1 if db_manager.breaker.state == 'open' else 0)
+    if db_manager.allowlist is not None:
+        metrics.add_collector('allowlist_live', 'gauge', '1 while the allowlist cache is loaded and listening.',
+                              lambda: 1 if db_manager.allowlist.is_live() else 0)
+    if log_writer is not None:
+        metrics.add_collector('log_queue_depth', 'gauge', 'RFID log entries waiting to be written.',
+                              log_writer.depth)
+        metrics.add_collector('log_entries_dropped_total', 'counter', 'RFID log entries dropped on a full queue.',
+                              lambda: log_writer.dropped)
+        if log_writer.spool is not None:
+            metrics.add_collector('log_spool_pending', 'gauge', 'RFID log entries spooled until Postgres is back.',
+                                  log_writer.spool.pending)
+    states = (DoorController.LOCKED, DoorController.UNLOCKING, DoorController.OPEN, DoorController.RELOCKING)
+    metrics.add_collector('door_state', 'gauge', 'Current door state (1 for the active state).',
+                          lambda: [({'door': reader.name, 'state': state}, 1 if reader.door.state == state else 0)
+                                   for reader in readers for state in states])
+    watched = [reader for reader in readers if reader.watchdog is not None]
+    if watched:
+        metrics.add_collector('reader_healthy', 'gauge', '1 while the MFRC522 answers its health checks.',
+                              lambda: [({'door': reader.name}, 1 if reader.watchdog.is_healthy() else 0)
+                                       for reader in watched])
+        metrics.add_collector('reader_resets_total', 'counter', 'MFRC522 resets by the reader watchdog.',
+                              lambda: [({'door': reader.name}, reader.watchdog.resets) for reader in watched])
+        metrics.add_collector('reader_downtime_seconds_total', 'counter',
+                              'Time the MFRC522 was not answering, including the current outage.',
+                              lambda: [({'door': reader.name}, reader.watchdog.downtime_seconds())
+                                       for reader in watched])
+        metrics.add_collector('reader_register_errors_total', 'counter',
+                              'Health checks that found protocol, parity, CRC or collision errors.',
+                              lambda: [({'door': reader.name}, reader.watchdog.register_errors)
+                                       for reader in watched])
+
+# Control Socket
+# Messages in both directions are a 4-byte big-endian length followed by that many bytes of UTF-8 JSON. A request
+# is {"command": ..., arguments...}; the reply is {"ok": true, ...} or {"ok": false, "error": ...}.
+CONTROL_HEADER = struct.Struct('>I')
+CONTROL_MAX_MESSAGE = 1 << 20
+
+def send_control_message(sock, message):
+    body = json.dumps(message, default=str).encode()
+    sock.sendall(CONTROL_HEADER.pack(len(body)) + body)
+
+def recv_control_message(sock):
+    """Returns the next message, or None once the peer has closed the connection."""
+    header = _recv_exactly(sock, CONTROL_HEADER.size)
+    if header is None:
+        return None
+    length, = CONTROL_HEADER.unpack(header)
+    if length > CONTROL_MAX_MESSAGE:
+        raise ValueError(f"Control message of {length} bytes exceeds the {CONTROL_MAX_MESSAGE} byte limit")
+    body = _recv_exactly(sock, length)
+    if body is None:
+        raise ConnectionError("Connection closed in the middle of a control message")
+    return json.loads(body)
+
+def _recv_exactly(sock, size):
+    data = b''
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        if not chunk:
+            if data:
+                raise ConnectionError("Connection closed in the middle of a control message")
+            return None
+        data += chunk
+    return data
+
+class Enrollment:
+    """A pending "enroll the next scanned card" request. The first reader to complete() it wins."""
+
+    def __init__(self):
+        self.rfid_id = None
+        self.door = None
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+
+    def complete(self, rfid_id, door):
+        with self._lock:
+            if self._done.is_set():
+                return False
+            self.rfid_id = rfid_id
+            self.door = door
+            self._done.set()
+            return True
+
+    def wait(self, timeout):
+        return self._done.wait(timeout)
+
+class ControlRequestHandler(socketserver.BaseRequestHandler):
+    def handle(self):
+        control = self.server.control
+        while True:
+            try:
+                request = recv_control_message(self.request)
+            except (json.JSONDecodeError, UnicodeDecodeError) as e:
+                # The whole frame was read, so the connection is still usable
+                logger.warning(f"Malformed control message: {e}")
+                send_control_message(self.request, {'ok': False, 'error': f"Malformed control message: {e}"})
+                continue
+            except ValueError as e:
+                logger.warning(f"Dropping control connection: {e}")
+                send_control_message(self.request, {'ok': False, 'error': str(e)})
+                return
+            except ConnectionError as e:
+                logger.warning(f"Dropping control connection: {e}")
+                return
+            if request is None:
+                return
+            send_control_message(self.request, control.handle(request))
+
+class ControlServer:
+    """
+    Local control API on a Unix socket (CONTROL_SOCKET_PATH), served from
+    its own threads so commands never run on a scan thread. Only the owner
+    and group of the socket (CONTROL_SOCKET_MODE, 0660 by default) can
+    connect, which is how the web server gets access.
+
+    Commands: ping, state, unlock [door], reload, log_level level,
+    enroll [door] [timeout]. dispatch(fn) runs commands that touch the
+    doors; the asyncio runtime passes one that runs them on the event loop,
+    otherwise they run on the connection's thread. reload is handed to the
+    allowlist listener.
+    """
+    RELOAD_TIMEOUT_SECONDS = 10.0
+
+    def __init__(self, readers, db_manager, log_writer=None, path=None, mode=None, dispatch=None):
+        self.readers = {reader.name: reader for reader in readers}
+        self.db_manager = db_manager
+        self.log_writer = log_writer
+        self.path = path or config('CONTROL_SOCKET_PATH', default='') or \
+            os.path.join(os.path.dirname(__file__), "run", "control.sock")
+        self.mode = mode if mode is not None else int(config('CONTROL_SOCKET_MODE', default='660'), 8)
+        self.dispatch = dispatch or (lambda fn: fn())
+        self.enroll_timeout = config('CONTROL_ENROLL_TIMEOUT_SECONDS', cast=float, default=30.0)
+        self._enroll_lock = threading.Lock()
+        self.commands = {
+            'ping': self.ping,
+            'state': self.state,
+            'unlock': self.unlock,
+            'reload': self.reload,
+            'log_level': self.log_level,
+            'enroll': self.enroll,
+        }
+        self._server = None
+
+    def start(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        if os.path.exists(self.path):
+            os.unlink(self.path)  # Left behind by a process that did not shut down cleanly
+        self._server = socketserver.ThreadingUnixStreamServer(self.path, ControlRequestHandler)
+        self._server.daemon_threads = True
+        self._server.control = self
+        os.chmod(self.path, self.mode)
+        threading.Thread(target=self._server.serve_forever, name="control-socket", daemon=True).start()
+        logger.info(f"Control socket listening on {self.path}")
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+            if os.path.exists(self.path):
+                os.unlink(self.path)
+
+    def handle(self, request):
+        command = request.get('command') if isinstance(request, dict) else None
+        handler = self.commands.get(command)
+        if handler is None:
+            return {'ok': False, 'error': f"Unknown command {command!r}, expected one of {sorted(self.commands)}"}
+        arguments = {key: value for key, value in request.items() if key != 'command'}
+        try:
+            return {'ok': True, **handler(**arguments)}
         except Exception as e:
-            logger.error(f"Error during cleanup: {e}")
+            logger.warning(f"Control command {command} failed: {e}")
+            return {'ok': False, 'error': str(e)}
 
+    def _readers_for(self, door):
+        if door is None:
+            return list(self.readers.values())
+        if door not in self.readers:
+            raise ValueError(f"Unknown door {door!r}, expected one of {sorted(self.readers)}")
+        return [self.readers[door]]
 
-    def blink_led(self, pin, duration=2, on_time=0.5, off_time=0.5):
-        end_time = time.time() + duration
-        while time.time() < end_time:
-            GPIO.output(pin, GPIO.HIGH)
-            time.sleep(on_time)
-            GPIO.output(pin, GPIO.LOW)
-            time.sleep(off_time)
+    def ping(self):
+        return {}
 
-def setup_leds():
-    GPIO.output(RED_LED_PIN, GPIO.HIGH)  # Red LED on, indicating system is active
-    GPIO.output(GREEN_LED_PIN, GPIO.LOW)  # Ensure green LED is off
+    def state(self):
+        allowlist = self.db_manager.allowlist
+        return {
+            'doors': {name: reader.stats() for name, reader in self.readers.items()},
+            'db': self.db_manager.stats(),
+            'allowlist': allowlist.stats() if allowlist is not None else None,
+            'log_writer': self.log_writer.stats() if self.log_writer is not None else None,
+            'log_level': logging.getLevelName(logging.getLogger().level),
+        }
 
-def signal_handler(sig, frame, reader):
-    reader.cleanup()
+    def unlock(self, door=None):
+        readers = self._readers_for(door)
+        for reader in readers:
+            logger.info(f"Remote unlock of door {reader.name} through the control socket.")
+            self.dispatch(reader.door.request_open)
+        return {'doors': [reader.name for reader in readers]}
+
+    def reload(self):
+        allowlist = self.db_manager.allowlist
+        if allowlist is None:
+            raise ValueError("The allowlist cache is disabled (ALLOWLIST_CACHE_ENABLED)")
+        logger.info("Allowlist reload requested through the control socket.")
+        # Run by the listener between notifications; a sync from here could finish after a later revocation
+        if not allowlist.request_resync(self.RELOAD_TIMEOUT_SECONDS):
+            raise TimeoutError(f"The allowlist listener did not resynchronise within "
+                               f"{self.RELOAD_TIMEOUT_SECONDS:g} s, is it connected to Postgres?")
+        return {'size': len(allowlist)}
+
+    def log_level(self, level):
+        level = set_log_level(level)
+        logger.warning(f"Log level changed to {level} through the control socket.")
+        return {'level': level}
+
+    def enroll(self, door=None, timeout=None):
+        """Waits for the next card on door (any door by default) and returns its ID and tag instead of authorizing it."""
+        readers = self._readers_for(door)
+        # Checked before any door is claimed, so a bad request cannot leave one waiting for an enrollment
+        try:
+            timeout = float(timeout if timeout is not None else self.enroll_timeout)
+        except (TypeError, ValueError):
+            raise ValueError(f"timeout must be a number of seconds, not {timeout!r}") from None
+        if not (0 < timeout < math.inf):
+            raise ValueError(f"timeout must be a positive number of seconds, not {timeout!r}")
+        enrollment = Enrollment()
+        # Each connection has its own thread, so two enrollments could otherwise both find the doors free
+        with self._enroll_lock:
+            for reader in readers:
+                if reader.enrollment is not None:
+                    raise ValueError(f"An enrollment is already waiting on door {reader.name}")
+            for reader in readers:
+                reader.enrollment = enrollment
+        try:
+            logger.info(f"Waiting up to {timeout:g} s for a card to enroll on {', '.join(r.name for r in readers)}.")
+            if not enrollment.wait(timeout):
+                raise TimeoutError(f"No card scanned within {timeout:g} s")
+        finally:
+            for reader in readers:
+                if reader.enrollment is enrollment:
+                    reader.enrollment = None
+        return {'rfid_id': enrollment.rfid_id, 'tag': hash_rfid(enrollment.rfid_id), 'door': enrollment.door}
+
+# Asyncio Runtime
+# READER_RUNTIME=asyncio runs card polling, the allowlist listener, the log
+# writer, the metrics endpoint and the door timers as tasks on one event
+# loop, with psycopg 3 async connections instead of the psycopg2 pool.
+class LoopScheduler:
+    """The Scheduler interface (call_later, stop) on an asyncio event loop, for DoorController."""
+
+    def __init__(self, loop):
+        self.loop = loop
+        self._handles = set()
+
+    def call_later(self, delay, callback, *args):
+        def run():
+            self._handles.discard(handle)
+            callback(*args)
+
+        handle = self.loop.call_later(delay, run)
+        self._handles.add(handle)
+        return handle
+
+    def stop(self):
+        for handle in list(self._handles):
+            handle.cancel()
+        self._handles.clear()
+
+class AsyncDatabaseManager:
+    """
+    Authorization and log writes over psycopg 3 async connections, with the
+    same decision order and fallbacks as DatabaseManager.authorize.
+
+    Up to max_connections autocommit connections are opened on demand and
+    reused once idle, with a semaphore holding callers back while all of
+    them are busy; a connection that fails or whose query is cancelled at
+    the budget is closed instead of reused, freeing its slot. Log batches
+    are one pipelined executemany, so each costs a single round trip.
+    """
+
+    def __init__(self, dsn, max_connections=None, allowlist=None, snapshot=None):
+        self.dsn = dsn
+        self.allowlist = allowlist
+        self.snapshot = snapshot
+        self.bloom = None
+        self.negative_cache = NegativeCache() if config('NEGATIVE_CACHE_ENABLED', cast=bool, default=True) else None
+        self.max_connections = max_connections if max_connections is not None else config('DB_POOL_MAX', cast=int, default=4)
+        self._connect_kwargs = {
+            'connect_timeout': config('DB_CONNECT_TIMEOUT_SECONDS', cast=int, default=2),
+            'options': f"-c statement_timeout={config('DB_STATEMENT_TIMEOUT_MS', cast=int, default=1000)}",
+        }
+        self.budget = config('AUTH_BUDGET_MS', cast=float, default=150.0) / 1000
+        self.decision_counts = ShardedCounter()  # Same counters as DatabaseManager, so /metrics reads both alike
+        self.db_queries = ShardedCounter()
+        self._idle = []
+        self._slots = None
+        self._opened = 0
+        self._loop = None
+        self.breaker = CircuitBreaker(self._probe_from_thread)
+        import psycopg
+        self.psycopg = psycopg
+
+    async def connect(self):
+        """Opens a dedicated autocommit connection outside the pool, with the same timeouts."""
+        return await self.psycopg.AsyncConnection.connect(self.dsn, autocommit=True, **self._connect_kwargs)
+
+    @asynccontextmanager
+    async def connection(self):
+        if self._slots is None:
+            self._loop = asyncio.get_running_loop()
+            self._slots = asyncio.Semaphore(self.max_connections)
+        # One slot per connection, idle or busy, so a discarded connection lets the next waiter open a new one
+        await self._slots.acquire()
+        try:
+            if self._idle:
+                conn = self._idle.pop()
+            else:
+                conn = await self.connect()
+                self._opened += 1
+        except BaseException:
+            self._slots.release()
+            raise
+        start = time.monotonic()
+        try:
+            yield conn
+        except BaseException:
+            # Failed or cancelled mid-query, the connection state is unknown
+            self._opened -= 1
+            await conn.close()
+            raise
+        else:
+            self._idle.append(conn)
+        finally:
+            self._slots.release()
+            metrics.db_seconds.observe(time.monotonic() - start)
+
+    def _probe_from_thread(self):
+        # The circuit breaker probes from its own thread
+        asyncio.run_coroutine_threadsafe(self._probe(), self._loop).result(timeout=self.budget * 10)
+
+    async def _probe(self):
+        async with self.connection() as conn:
+            await conn.execute("SELECT 1")
+
+    async def _lookup(self, rfid_id, digest, event_id, log):
+        """Returns (is_valid, logged)."""
+        async with self.connection() as conn:
+            if log:
+                cursor = await conn.execute('SELECT * FROM "authorize_and_log"(%s, %s, %s, %s)',
+                                            (rfid_id, digest, event_id, datetime.now()))
+                return (await cursor.fetchone())[0], True
+            cursor = await conn.execute('SELECT EXISTS(SELECT 1 FROM "ValidTag" WHERE "tag" = %s)', (digest,))
+            return (await cursor.fetchone())[0], False
+
+    async def authorize(self, rfid_id, event_id=None, log=False):
+        """
+        Decides like DatabaseManager.authorize; with log, a database lookup
+        goes through authorize_and_log and logs the attempt in the same call.
+        """
+        start = time.monotonic()
+        digest = hash_rfid(rfid_id)
+
+        def decided(is_valid, source, logged=False):
+            latency_ms = (time.monotonic() - start) * 1000
+            self.decision_counts.inc(source)
+            metrics.decision_seconds.observe(latency_ms / 1000)
+            logger.info(f"Tag exists: {is_valid} (source: {source}, {latency_ms:.1f} ms)")
+            return Decision(is_valid, source, logged, latency_ms)
+
+        allowlist = self.allowlist
+        if allowlist is not None and allowlist.is_live():
+            return decided(allowlist.contains(digest), 'cache')
+        if allowlist is not None and self.bloom is not None and digest not in self.bloom:
+            return decided(False, 'bloom')
+        if self.negative_cache is not None and digest in self.negative_cache:
+            return decided(False, 'negative-cache')
+
+        if self.breaker.allow():
+            self.db_queries.inc()
+            try:
+                is_valid, logged = await asyncio.wait_for(self._lookup(rfid_id, digest, event_id, log), self.budget)
+                self.breaker.record_success()
+                if not is_valid and self.negative_cache is not None:
+                    self.negative_cache.add(digest)
+                return decided(is_valid, 'db', logged)
+            except asyncio.TimeoutError:
+                self.breaker.record_failure()
+                logger.warning(f"Database missed the {self.budget * 1000:.0f} ms authorization budget.")
+            except (self.psycopg.Error, OSError) as e:
+                self.breaker.record_failure()
+                logger.error(f"Database error when checking RFID validity: {e}")
+        else:
+            logger.debug("Database circuit breaker is open, skipping the database.")
+
+        if allowlist is not None and allowlist.is_ready():
+            return decided(allowlist.contains(digest), 'cache')
+        if self.snapshot is not None and self.snapshot.is_loaded():
+            return decided(self.snapshot.contains(digest), 'snapshot')
+        logger.error("No database, allowlist cache or snapshot available, denying access.")
+        return decided(False, 'none')
+
+    async def insert_logs(self, rows):
+        """Inserts (event_id, rfid_id, is_valid, timestamp) rows in one pipelined executemany. Errors are left to the caller."""
+        async with self.connection() as conn:
+            async with conn.cursor() as cursor:
+                await cursor.executemany(
+                    'INSERT INTO "RfidLog" ("eventId", "rfidId", "isValid", "timestamp") VALUES (%s, %s, %s, %s) '
+                    'ON CONFLICT ("eventId") DO NOTHING',
+                    rows)
+
+    def stats(self):
+        decisions = self.decision_counts.collect()
+        return {
+            'decisions': dict(decisions),
+            'db_queries': sum(self.db_queries.collect().values()),
+            'db_queries_avoided': decisions['bloom'] + decisions['negative-cache'],
+            'negative_cache_size': len(self.negative_cache) if self.negative_cache is not None else 0,
+            'breaker': self.breaker.stats(),
+            'connections_open': self._opened,
+        }
+
+    async def fetch_valid_tags(self):
+        async with self.connection() as conn:
+            cursor = await conn.execute('SELECT "tag" FROM "ValidTag"')
+            return {row[0] for row in await cursor.fetchall()}
+
+    async def close(self):
+        self.breaker.stop()
+        while self._idle:
+            await self._idle.pop().close()
+            self._opened -= 1
+        logger.info("Database connections closed.")
+
+class AsyncAllowlistCache(AllowlistCache):
+    """
+    AllowlistCache whose LISTEN loop and full syncs run as a task on the
+    event loop. Snapshot writes fsync, so they run on a worker thread while
+    the doors' scan tasks keep going.
+    """
+
+    async def full_sync_async(self):
+        digests = await self.db_manager.fetch_valid_tags()
+        if self._replace(digests):
+            await asyncio.to_thread(self.snapshot.write, digests)
+
+    async def apply_notification_async(self, payload):
+        change = self._apply_change(payload)
+        if change is not None and self.snapshot is not None:
+            await asyncio.to_thread(self.snapshot.apply, *change)
+
+    async def run(self, stop):
+        backoff = 1
+        while not stop.is_set():
+            conn = None
+            try:
+                conn = await self.db_manager.connect()
+                await conn.execute(f"LISTEN {self.CHANNEL}")
+                logger.info(f"Listening for allowlist changes on channel '{self.CHANNEL}'.")
+                self._resync.clear()
+                await self.full_sync_async()
+                self._live = True
+                backoff = 1
+                next_resync = time.monotonic() + self.resync_interval
+
+                while not stop.is_set():
+                    timeout = min(1.0, max(0.0, next_resync - time.monotonic()))
+                    async for notify in conn.notifies(timeout=timeout):
+                        await self.apply_notification_async(notify.payload)
+                    if self._resync.is_set() or time.monotonic() >= next_resync:
+                        self._resync.clear()
+                        await self.full_sync_async()
+                        next_resync = time.monotonic() + self.resync_interval
+            except Exception as e:
+                self._live = False
+                metrics.db_reconnects.inc('listener')
+                logger.error(f"Allowlist listener lost its database connection: {e}. Retrying in {backoff} s.")
+                try:
+                    await asyncio.wait_for(stop.wait(), backoff)
+                except asyncio.TimeoutError:
+                    pass
+                backoff = min(backoff * 2, 60)
+            finally:
+                self._live = False
+                if conn is not None:
+                    await conn.close()
+
+class AsyncRfidLogWriter:
+    """
+    RfidLogWriter as a task: submit() queues without blocking, run() writes
+    batches of up to batch_size every flush_interval seconds and spools them
+    while Postgres is unreachable, like the threaded writer.
+    """
+
+    def __init__(self, db_manager, max_queue_size=None, batch_size=None, flush_interval=None, spool=None,
+                 replay_interval=None):
+        self.db_manager = db_manager
+        self.spool = spool
+        self.batch_size = batch_size if batch_size is not None else config('LOG_BATCH_SIZE', cast=int, default=50)
+        self.flush_interval = flush_interval if flush_interval is not None else \
+            config('LOG_FLUSH_SECONDS', cast=float, default=1.0)
+        self.replay_interval = replay_interval if replay_interval is not None else \
+            config('SPOOL_REPLAY_SECONDS', cast=float, default=5.0)
+        self._queue = asyncio.Queue(maxsize=max_queue_size if max_queue_size is not None else
+                                    config('LOG_QUEUE_SIZE', cast=int, default=1000))
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+        self.spooled = 0
+        self.replayed = 0
+        self.batches = 0
+
+    def submit(self, rfid_id, is_valid, event_id=None):
+        try:
+            self._queue.put_nowait((event_id or uuid.uuid4().hex, rfid_id, is_valid, datetime.now()))
+        except asyncio.QueueFull:
+            self.dropped += 1
+            logger.error(f"RFID log queue full, dropped entry for RFID ID {rfid_id}.")
+
+    def depth(self):
+        return self._queue.qsize()
+
+    def stats(self):
+        return {
+            'depth': self.depth(),
+            'written': self.written,
+            'dropped': self.dropped,
+            'failed': self.failed,
+            'batches': self.batches,
+            'spooled': self.spooled,
+            'replayed': self.replayed,
+            'spool_pending': self.spool.pending() if self.spool is not None else 0,
+        }
+
+    async def run(self, stop):
+        next_replay = time.monotonic() + self.replay_interval
+        while not stop.is_set() or not self._queue.empty():
+            batch = []
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), self.flush_interval))
+            except asyncio.TimeoutError:
+                pass
+            while batch and len(batch) < self.batch_size and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            await self._flush(batch)
+            if self.spool is not None and time.monotonic() >= next_replay:
+                await self._replay_spool()
+                next_replay = time.monotonic() + self.replay_interval
+
+    async def _flush(self, batch):
+        if not batch:
+            return
+        if self.spool is not None and self.spool.pending():
+            # Older entries are still spooled, queue behind them to keep the log in order
+            await self._spool_batch(batch)
+            return
+        try:
+            await self.db_manager.insert_logs(batch)
+            self.written += len(batch)
+            self.batches += 1
+        except (self.db_manager.psycopg.DataError, self.db_manager.psycopg.IntegrityError) as e:
+            # The rows themselves are rejected, retrying them later would fail the same way
+            self.failed += len(batch)
+            logger.error(f"Database error when writing {len(batch)} RFID log entries: {e}")
+        except Exception as e:
+            # Unreachable database, no free connection, open breaker, ...: keep the rows for the replay
+            if self.spool is None:
+                self.failed += len(batch)
+                logger.error(f"Could not write, lost {len(batch)} RFID log entries: {e}")
+            else:
+                logger.warning(f"Could not write, spooling {len(batch)} RFID log entries: {e}")
+                await self._spool_batch(batch)
+
+    async def _spool_batch(self, batch):
+        try:
+            # The spool fsyncs, keep that off the event loop
+            await asyncio.to_thread(self.spool.append, batch)
+            self.spooled += len(batch)
+        except sqlite3.Error as e:
+            self.failed += len(batch)
+            logger.error(f"Could not spool {len(batch)} RFID log entries: {e}", exc_info=True)
+
+    async def _replay_spool(self, chunk_size=500):
+        while self.spool.pending():
+            last_seq, rows = self.spool.peek(chunk_size)
+            if not rows:
+                break
+            try:
+                await self.db_manager.insert_logs(rows)
+            except (self.db_manager.psycopg.Error, OSError) as e:
+                logger.warning(f"Replaying spooled RFID log entries failed, will retry: {e}")
+                break
+            await asyncio.to_thread(self.spool.remove_through, last_seq)
+            self.replayed += len(rows)
+            self.written += len(rows)
+            self.batches += 1
+
+async def serve_metrics_async(stop, host=None, port=None):
+    """Serves /metrics from the event loop until stop is set."""
+    host = host or config('METRICS_HOST', default='127.0.0.1')
+    port = port if port is not None else config('METRICS_PORT', cast=int, default=9105)
+
+    async def handle(reader, writer):
+        try:
+            request_line = (await reader.readline()).decode(errors='replace').split()
+            while (await reader.readline()) not in (b'\r\n', b'\n', b''):
+                pass  # Skip the headers
+            if len(request_line) >= 2 and request_line[0] == 'GET' and request_line[1].split('?', 1)[0] == '/metrics':
+                body = metrics.render().encode()
+                head = (f"HTTP/1.1 200 OK\r\nContent-Type: text/plain; version=0.0.4; charset=utf-8\r\n"
+                        f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n")
+            else:
+                body = b"Not Found\n"
+                head = f"HTTP/1.1 404 Not Found\r\nContent-Length: {len(body)}\r\nConnection: close\r\n\r\n"
+            writer.write(head.encode() + body)
+            await writer.drain()
+        finally:
+            writer.close()
+
+    server = await asyncio.start_server(handle, host, port)
+    logger.info(f"Serving metrics on http://{host}:{server.sockets[0].getsockname()[1]}/metrics")
+    async with server:
+        await stop.wait()
+
+class AsyncReaderService:
+    """
+    Runs the doors' scan loops, and the log writer and allowlist listener
+    if given, as tasks on the running event loop until stop() is called.
+    Card reads are blocking SPI transfers, so they run on a small thread pool
+    (one thread per door); everything else stays on the loop.
+    """
+
+    def __init__(self, db_manager, readers, log_writer=None, allowlist=None, serve_metrics=False):
+        self.db_manager = db_manager
+        self.readers = readers
+        self.log_writer = log_writer
+        self.allowlist = allowlist
+        self.serve_metrics = serve_metrics
+        self._stop = None
+        self._read_executor = ThreadPoolExecutor(max_workers=max(1, len(readers)), thread_name_prefix="card-read",
+                                                 initializer=realtime_policy.apply)
+
+    def stop(self):
+        if self._stop is not None:
+            self._stop.set()
+
+    async def run(self):
+        self._stop = asyncio.Event()
+        tasks = [self._scan_loop(reader) for reader in self.readers]
+        if self.allowlist is not None:
+            tasks.append(self.allowlist.run(self._stop))
+        if self.serve_metrics:
+            tasks.append(serve_metrics_async(self._stop))
+        writer = asyncio.ensure_future(self.log_writer.run(self._stop)) if self.log_writer is not None else None
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            self._stop.set()
+            if writer is not None:
+                await writer  # Flushes what is still queued
+            self._read_executor.shutdown(wait=False)
+
+    async def _scan_loop(self, reader):
+        loop = asyncio.get_running_loop()
+        while not self._stop.is_set():
+            # Each door's loop is its own task, so the tracer keeps its scans apart
+            trace = tracer.start('scan', door=reader.name)
+            scanned = counted = False
+            try:
+                with tracer.span('read'):
+                    id, text = await loop.run_in_executor(self._read_executor, reader.read_card)
+                if reader.accept_card(id, text):
+                    scanned = True
+                    with tracer.span('authorize'):
+                        is_valid = await reader.authorize_async(id)
+                    counted = True
+                    reader.act_on_decision(is_valid, trace)
+            except Exception as e:
+                reader.scan_failed(e, scanned and not counted)
+            finally:
+                reader.end_trace(trace, scanned)
+            if reader.card_detector is not None:
+                await loop.run_in_executor(self._read_executor, reader.card_detector.wait_for_card,
+                                           reader.irq_fallback_interval)
+            else:
+                await asyncio.sleep(reader.poll_interval)
+
+async def run_async_service(door_configs):
+    """Builds the asyncio runtime from the .env settings and runs it until SIGINT or SIGTERM."""
+    loop = asyncio.get_running_loop()
+    realtime_policy.apply()  # The event loop drives the doors
+    db_manager = AsyncDatabaseManager(config('DATABASE_URL', default='CHANGEME'))
+    if config('SNAPSHOT_ENABLED', cast=bool, default=True):
+        db_manager.snapshot = AllowlistSnapshot()
+        db_manager.snapshot.load()
+    if config('ALLOWLIST_CACHE_ENABLED', cast=bool, default=True):
+        # Only the cache keeps the Bloom filter current, so it is installed only when the cache runs
+        if db_manager.snapshot is not None and db_manager.snapshot.is_loaded():
+            db_manager.bloom = BloomFilter.from_digests(db_manager.snapshot.raw_digests(),
+                                                        capacity=2 * len(db_manager.snapshot))
+        db_manager.allowlist = AsyncAllowlistCache(db_manager, snapshot=db_manager.snapshot)
+    spool = LogSpool() if config('SPOOL_ENABLED', cast=bool, default=True) else None
+    log_writer = AsyncRfidLogWriter(db_manager, spool=spool)
+    readers = [create_reader(door_config, db_manager, log_writer, scheduler=LoopScheduler(loop))
+               for door_config in door_configs]
+    idle_pattern = 'heartbeat' if config('LED_HEARTBEAT', cast=bool, default=False) else None
+    for reader in readers:
+        reader.leds.set_background(idle_pattern)
+
+    def show_breaker_state(state):
+        for reader in readers:
+            reader.leds.set_background('offline' if state == 'open' else idle_pattern)
+
+    db_manager.breaker.on_change = show_breaker_state
+    register_metrics(db_manager, log_writer, readers)
+    control = None
+    if config('CONTROL_ENABLED', cast=bool, default=False):
+        async def call(fn):
+            result = fn()
+            return await result if asyncio.iscoroutine(result) else result
+
+        # Door timers and the allowlist belong to the event loop, so commands run there
+        control = ControlServer(readers, db_manager, log_writer,
+                                dispatch=lambda fn: asyncio.run_coroutine_threadsafe(call(fn), loop).result())
+        control.start()
+    service = AsyncReaderService(db_manager, readers, log_writer, db_manager.allowlist,
+                                 serve_metrics=config('METRICS_ENABLED', cast=bool, default=False))
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, service.stop)
+    loop.add_signal_handler(signal.SIGUSR1, toggle_debug_logging)
+
+    logger.info(f"Script start (asyncio runtime), running {len(readers)} door(s): "
+                f"{', '.join(reader.name for reader in readers)}")
+    try:
+        await service.run()
+    finally:
+        if control is not None:
+            control.stop()
+        for reader in readers:
+            reader.cleanup()
+        if spool is not None:
+            spool.close()
+        await db_manager.close()
+        hardware.cleanup()
+        logger.info("Graceful shutdown initiated")
+
+def signal_handler(sig, frame, readers, stop_event, control=None):
+    stop_event.set()
+    if control is not None:
+        control.stop()
+    for reader in readers:
+        reader.cleanup()
+    hardware.cleanup()
+    # The remaining components are shared by all readers
+    reader = readers[0]
+    if reader.log_writer is not None:
+        reader.log_writer.close()  # Flush queued log entries before the pool goes away
+    if reader.db_manager.allowlist is not None:
+        reader.db_manager.allowlist.stop()
+    reader.db_manager.close()
     logger.info("Graceful shutdown initiated")
     sys.exit(0)
 
 if __name__ == "__main__":
-    setup_leds()
-
+    realtime_policy.lock_memory()
+    init_hardware()
+    if config('READER_RUNTIME', default='threads') == 'asyncio':
+        asyncio.run(run_async_service(load_door_configs()))
+        sys.exit(0)
     dsn = config('DATABASE_URL', default='CHANGEME')
     db_manager = DatabaseManager(dsn)
-    reader = RFIDReader(db_manager)
+    if config('SNAPSHOT_ENABLED', cast=bool, default=True):
+        # Loaded before the first poll so the door works even if Postgres is not up yet
+        db_manager.snapshot = AllowlistSnapshot()
+        db_manager.snapshot.load()
+    if config('ALLOWLIST_CACHE_ENABLED', cast=bool, default=True):
+        # Only the cache keeps the Bloom filter current, so it is installed only when the cache runs
+        if db_manager.snapshot is not None and db_manager.snapshot.is_loaded():
+            db_manager.bloom = BloomFilter.from_digests(db_manager.snapshot.raw_digests(),
+                                                        capacity=2 * len(db_manager.snapshot))
+        db_manager.allowlist = AllowlistCache(db_manager, snapshot=db_manager.snapshot)
+        db_manager.allowlist.start()
+    spool = LogSpool() if config('SPOOL_ENABLED', cast=bool, default=True) else None
+    log_writer = RfidLogWriter(db_manager, spool=spool)
+    log_writer.start()
+    readers = [create_reader(door_config, db_manager, log_writer) for door_config in load_door_configs()]
+
+    idle_pattern = 'heartbeat' if config('LED_HEARTBEAT', cast=bool, default=False) else None
+    for reader in readers:
+        reader.leds.set_background(idle_pattern)
+
+    # Show that the database is unreachable while the circuit breaker is open
+    def show_breaker_state(state):
+        for reader in readers:
+            reader.leds.set_background('offline' if state == 'open' else idle_pattern)
 
-    signal.signal(signal.SIGINT, lambda sig, frame: signal_handler(sig, frame, reader))
-    signal.signal(signal.SIGTERM, lambda sig, frame: signal_handler(sig, frame, reader))
+    db_manager.breaker.on_change = show_breaker_state
 
-    logger.info("Script start, entering main loop")
+    register_metrics(db_manager, log_writer, readers)
+    if config('METRICS_ENABLED', cast=bool, default=False):
+        MetricsServer().start()
+    control = None
+    if config('CONTROL_ENABLED', cast=bool, default=False):
+        control = ControlServer(readers, db_manager, log_writer)
+        control.start()
+
+    stop_event = threading.Event()
+    signal.signal(signal.SIGINT, lambda sig, frame: signal_handler(sig, frame, readers, stop_event, control))
+    signal.signal(signal.SIGTERM, lambda sig, frame: signal_handler(sig, frame, readers, stop_event, control))
+    signal.signal(signal.SIGUSR1, toggle_debug_logging)
+
+    logger.info(f"Script start, running {len(readers)} door(s): {', '.join(reader.name for reader in readers)}")
+    threads = [threading.Thread(target=reader.run, args=(stop_event,), name=f"reader-{reader.name}", daemon=True)
+               for reader in readers]
     try:
-        while True:
-            reader.read_rfid()
+        for thread in threads:
+            thread.start()
+        # The main thread only waits, so signals are handled promptly
+        while any(thread.is_alive() for thread in threads):
+            for thread in threads:
+                thread.join(timeout=1)
     except KeyboardInterrupt:
         pass
     finally:
-        GPIO.cleanup()
+        hardware.cleanup()
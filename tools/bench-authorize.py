@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""
+Compares the two-query authorization path (SELECT on "ValidTag", then INSERT
+into "RfidLog") with the single authorize_and_log database function called
+through a prepared statement. Both run on the same connection pool.
+
+Usage: python3 tools/bench-authorize.py [iterations]
+Requires DATABASE_URL to point at a migrated PortalWarden database.
+"""
+import sys
+import uuid
+from datetime import datetime
+
+from decouple import config
+
+from benchlib import load_connector, print_summary, time_calls
+
+RFID_ID = 584190925461
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    connector = load_connector()
+    connector.logger.setLevel("WARNING")
+    db_manager = connector.DatabaseManager(config('DATABASE_URL'), min_connections=1, max_connections=1)
+
+    def two_queries():
+        is_valid = db_manager.check_validity(RFID_ID)
+        db_manager.insert_logs([(uuid.uuid4().hex, RFID_ID, is_valid, datetime.now())])
+
+    def single_function():
+        db_manager.authorize_and_log(RFID_ID)
+
+    # Warm up the pool and the prepared statement
+    two_queries()
+    single_function()
+
+    print(f"Authorize and log latency over {iterations} scans:")
+    print_summary("check_validity + insert_logs", time_calls(two_queries, iterations))
+    print_summary("authorize_and_log (prepared)", time_calls(single_function, iterations))
+    db_manager.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Measures per-scan database latency of the RFID reader.
+
+Compares the old behaviour (a fresh psycopg2 connection for the validity
+check and another one for the log insert) with the pooled DatabaseManager.
+
+Usage: python3 tools/bench-db.py [iterations]
+Requires DATABASE_URL to point at a migrated PortalWarden database.
+"""
+import hashlib
+import sys
+from datetime import datetime
+
+import psycopg2
+from decouple import config
+
+from benchlib import load_connector, print_summary, time_calls
+
+RFID_ID = 584190925461
+
+
+def legacy_scan(dsn):
+    hash_rfid_id = hashlib.sha256(str(RFID_ID).encode()).hexdigest()
+    with psycopg2.connect(dsn) as conn:
+        with conn.cursor() as cursor:
+            cursor.execute('SELECT EXISTS(SELECT 1 FROM "ValidTag" WHERE "tag" = %s)', (hash_rfid_id,))
+            is_valid = cursor.fetchone()[0]
+    conn.close()
+    with psycopg2.connect(dsn) as conn:
+        with conn.cursor() as cursor:
+            cursor.execute('INSERT INTO "RfidLog" ("rfidId", "isValid", "timestamp") VALUES (%s, %s, %s)',
+                           (RFID_ID, is_valid, datetime.now()))
+    conn.close()
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    dsn = config('DATABASE_URL')
+    connector = load_connector()
+    db_manager = connector.DatabaseManager(dsn)
+
+    def pooled_scan():
+        is_valid = db_manager.check_validity(RFID_ID)
+        db_manager.insert_log(RFID_ID, is_valid)
+
+    # Silence the per-scan INFO lines so they do not dominate the measurement
+    connector.logger.setLevel("WARNING")
+    pooled_scan()  # Warm the pool before measuring
+
+    print(f"Per-scan database latency over {iterations} scans:")
+    print_summary("connect per query (before)", time_calls(lambda: legacy_scan(dsn), iterations))
+    print_summary("pooled connections (after)", time_calls(pooled_scan, iterations))
+    db_manager.close()
+
+
+if __name__ == "__main__":
+    main()
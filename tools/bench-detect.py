@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Compares polling and interrupt-driven card detection on the Raspberry Pi.
+
+1. Idle: runs each detection loop for a while without a card and reports
+   process CPU usage and SPI transfers per second.
+2. Card present: with a card held on the reader, measures how long a full
+   read takes (polling) and how long a REQA kick takes to raise IRQ (IRQ
+   mode), and derives the expected and worst-case time-to-detect from the
+   configured poll and kick intervals.
+3. Read path: with the card still present, compares SPI transactions and
+   milliseconds per detection of the UID-only read against the full
+   SimpleMFRC522.read_no_block() with its sector authentication and block reads.
+
+Usage: python3 tools/bench-detect.py [--seconds 30] [--samples 50] [--irq-pin 24]
+"""
+import argparse
+import time
+
+from decouple import config
+
+from benchlib import load_connector, print_summary, summarize
+
+
+def count_spi(chip):
+    """Wraps the chip's SPI transfer function with a counter."""
+    counter = {'transfers': 0}
+    transfer = chip.spi.xfer2
+
+    def counted(data):
+        counter['transfers'] += 1
+        return transfer(data)
+
+    chip.spi.xfer2 = counted
+    return counter
+
+
+def measure_idle(name, loop_once, seconds, counter):
+    counter['transfers'] = 0
+    wall_start, cpu_start = time.monotonic(), time.process_time()
+    while time.monotonic() - wall_start < seconds:
+        loop_once()
+    wall, cpu = time.monotonic() - wall_start, time.process_time() - cpu_start
+    print(f"{name:<8} idle CPU {100 * cpu / wall:6.2f} %   SPI transfers {counter['transfers'] / wall:8.1f}/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--seconds', type=float, default=30.0)
+    parser.add_argument('--samples', type=int, default=50)
+    parser.add_argument('--irq-pin', type=int, default=config('READER_IRQ_PIN', cast=int, default=24))
+    args = parser.parse_args()
+
+    connector = load_connector('rpi')
+    reader = connector.hardware.open_reader()
+    chip = reader.READER
+    counter = count_spi(chip)
+    detector = connector.IrqCardDetector(chip, args.irq_pin)
+    poll_interval = config('READER_POLL_SECONDS', cast=float, default=1.0)
+
+    def poll_once():
+        reader.read_no_block()
+        time.sleep(poll_interval)
+
+    def irq_once():
+        if detector.wait_for_card(1.0):
+            reader.read_no_block()
+
+    print(f"Idle for {args.seconds:.0f} s per mode, keep cards away from the reader...")
+    measure_idle("poll", poll_once, args.seconds, counter)
+    measure_idle("irq", irq_once, args.seconds, counter)
+
+    input("Hold a card on the reader and press Enter...")
+    read_ms = []
+    while len(read_ms) < args.samples:
+        start = time.perf_counter()
+        rfid_id, _ = reader.read_no_block()
+        if rfid_id:
+            read_ms.append((time.perf_counter() - start) * 1000)
+
+    irq_ms = []
+    while len(irq_ms) < args.samples:
+        detector.arm()
+        start = time.perf_counter()
+        detector._kick()
+        if detector._card_event.wait(0.5):
+            irq_ms.append((time.perf_counter() - start) * 1000)
+        reader.read_no_block()  # Completes the exchange so the card answers the next REQA
+    detector.close()
+
+    read_paths = {}
+    for name, read in (("UID-only read", lambda: connector.read_uid_no_block(reader)),
+                       ("full read_no_block", reader.read_no_block)):
+        samples, transfers = [], 0
+        while len(samples) < args.samples:
+            counter['transfers'] = 0
+            start = time.perf_counter()
+            rfid_id, _ = read()
+            elapsed = (time.perf_counter() - start) * 1000
+            if rfid_id:
+                samples.append(elapsed)
+                transfers += counter['transfers']
+        read_paths[name] = (samples, transfers / len(samples))
+
+    print_summary("full read (poll)", read_ms)
+    print_summary("REQA kick to IRQ", irq_ms)
+    read, irq = summarize(read_ms), summarize(irq_ms)
+    kick_ms = detector.kick_interval * 1000
+    print(f"Expected time-to-detect, poll: {poll_interval * 500 + read['mean_ms']:.1f} ms mean, "
+          f"{poll_interval * 1000 + read['max_ms']:.1f} ms worst")
+    print(f"Expected time-to-detect, irq:  {kick_ms / 2 + irq['mean_ms'] + read['mean_ms']:.1f} ms mean, "
+          f"{kick_ms + irq['max_ms'] + read['max_ms']:.1f} ms worst")
+    for name, (samples, transfers) in read_paths.items():
+        print_summary(f"{name} ({transfers:.0f} SPI xfers)", samples)
+
+
+if __name__ == "__main__":
+    main()
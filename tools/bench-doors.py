@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Throughput check for several doors served by one spi-connector process.
+
+Starts one RFIDReader thread per door on the simulated hardware backend,
+all sharing one fake database manager that lets --pool-size authorizations run at a time with
+--db-ms latency each. Every door is fed --scans distinct cards as fast as
+it can take them. Door 1's servo can be made slow (--slow-servo-ms) to
+check that a slow actuation on one door does not hold up the others.
+
+Reports scans per second and scan-to-decision latency for each door and
+for all doors together.
+
+Usage: python3 tools/bench-doors.py [--doors 4] [--scans 200] [--db-ms 2] [--pool-size 5] [--read-ms 0]
+                                    [--slow-servo-ms 0]
+"""
+import argparse
+import logging
+import threading
+import time
+
+from benchlib import FakeDatabaseManager, load_connector, print_summary
+
+
+class FakeServo:
+    def __init__(self, move_delay=0.0):
+        self.move_delay = move_delay
+
+    def start_move(self, angle):
+        time.sleep(self.move_delay)
+
+    def stop_signal(self):
+        pass
+
+    def set_angle(self, angle):
+        pass
+
+    def stop(self):
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--doors', type=int, default=4)
+    parser.add_argument('--scans', type=int, default=200, help="cards fed to each door")
+    parser.add_argument('--db-ms', type=float, default=2.0)
+    parser.add_argument('--pool-size', type=int, default=5)
+    parser.add_argument('--read-ms', type=float, default=0.0, help="simulated MFRC522 read latency")
+    parser.add_argument('--slow-servo-ms', type=float, default=0.0, help="start_move delay on the first door")
+    args = parser.parse_args()
+
+    connector = load_connector('sim')
+    connector.logger.setLevel(logging.WARNING)  # Per-scan INFO lines would dominate the timing
+    db_manager = FakeDatabaseManager(connector, args.db_ms / 1000, pool_size=args.pool_size)
+    readers = []
+    for index in range(args.doors):
+        name = f"door{index + 1}"
+        mfrc522 = connector.hardware.open_reader(device=index)
+        mfrc522.read_latency = args.read_ms / 1000
+        for scan in range(args.scans):
+            mfrc522.tap(index * args.scans + scan + 1)  # Distinct IDs so the debouncer lets every scan through
+        delay = args.slow_servo_ms / 1000 if index == 0 else 0.0
+        door = connector.DoorController(FakeServo(delay), name=name, hold_seconds=0.01, move_seconds=0.01)
+        leds = connector.LedPatternEngine(green_pin=20 + 2 * index, red_pin=21 + 2 * index)
+        reader = connector.RFIDReader(db_manager, door=door, leds=leds, reader=mfrc522, name=name)
+        reader.card_detector = None
+        reader.poll_interval = 0.0
+        readers.append(reader)
+
+    stop_event = threading.Event()
+    threads = [threading.Thread(target=reader.run, args=(stop_event,), name=f"reader-{reader.name}", daemon=True)
+               for reader in readers]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    finished = {}
+    while len(finished) < len(readers):
+        for reader in readers:
+            if reader.name not in finished and not reader.reader.pending():
+                finished[reader.name] = time.perf_counter() - start
+        time.sleep(0.001)
+    time.sleep(args.db_ms / 1000 + 0.05)  # Let the last decisions land
+    stop_event.set()
+    elapsed = max(finished.values())
+
+    all_samples = []
+    for reader in readers:
+        samples = [(db_manager.decided_at[rfid_id] - read_at) * 1000
+                   for read_at, rfid_id in reader.reader.reads if rfid_id in db_manager.decided_at]
+        all_samples.extend(samples)
+        print(f"{reader.name:<8} {args.scans / finished[reader.name]:10.1f} scans/s  "
+              f"door opened {reader.door.open_count} times, extended {reader.door.extend_count} times")
+        print_summary(f"{reader.name} scan to decision", samples)
+    print(f"{'all':<8} {args.doors * args.scans / elapsed:10.1f} scans/s")
+    print_summary("all scan to decision", all_samples)
+
+    for reader in readers:
+        reader.cleanup()
+
+
+if __name__ == "__main__":
+    main()
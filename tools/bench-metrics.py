@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Measures what the metrics cost the scan path.
+
+1. Per call: ShardedCounter.inc() and ShardedHistogram.observe() against an
+   empty call and a lock-protected counter, in nanoseconds.
+2. Contention: --threads threads incrementing one counter at once, sharded
+   against locked.
+3. Scan path: RFIDReader.read_rfid() on simulated hardware with a fake
+   database, with metrics replaced by no-ops, with metrics, and with
+   metrics while another thread scrapes /metrics over HTTP in a loop.
+   Also reports how long one scrape takes.
+
+Usage: python3 tools/bench-metrics.py [--calls 200000] [--threads 4] [--scans 2000]
+"""
+import argparse
+import logging
+import threading
+import time
+import urllib.request
+
+from benchlib import FakeDatabaseManager, load_connector, print_summary, time_calls
+
+
+class LockedCounter:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.value = 0
+
+    def inc(self, label='', amount=1):
+        with self.lock:
+            self.value += amount
+
+
+class NullMetric:
+    def inc(self, label='', amount=1):
+        pass
+
+    def observe(self, value):
+        pass
+
+
+class NullMetrics:
+    def __init__(self):
+        self.scans = self.reader_errors = self.db_reconnects = NullMetric()
+        self.decision_seconds = self.db_seconds = NullMetric()
+
+
+def ns_per_call(func, calls):
+    start = time.perf_counter()
+    for _ in range(calls):
+        func()
+    return (time.perf_counter() - start) * 1e9 / calls
+
+
+def contended(counter, threads, calls):
+    def work():
+        for _ in range(calls):
+            counter.inc('granted')
+
+    workers = [threading.Thread(target=work) for _ in range(threads)]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return threads * calls / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--calls', type=int, default=200000)
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--scans', type=int, default=2000)
+    args = parser.parse_args()
+
+    connector = load_connector('sim')
+    connector.logger.setLevel(logging.ERROR)  # Per-scan log lines would dominate the timing
+
+    counter, histogram, locked = connector.ShardedCounter(), connector.ShardedHistogram(
+        connector.Metrics.LATENCY_BUCKETS), LockedCounter()
+    print("Per call, single thread:")
+    print(f"  empty call                 {ns_per_call(lambda: None, args.calls):8.1f} ns")
+    print(f"  ShardedCounter.inc         {ns_per_call(lambda: counter.inc('granted'), args.calls):8.1f} ns")
+    print(f"  ShardedHistogram.observe   {ns_per_call(lambda: histogram.observe(0.004), args.calls):8.1f} ns")
+    print(f"  locked counter             {ns_per_call(lambda: locked.inc('granted'), args.calls):8.1f} ns")
+
+    print(f"\n{args.threads} threads on one counter:")
+    print(f"  sharded {contended(connector.ShardedCounter(), args.threads, args.calls // args.threads):12.0f} incs/s")
+    print(f"  locked  {contended(LockedCounter(), args.threads, args.calls // args.threads):12.0f} incs/s")
+
+    mfrc522 = connector.hardware.open_reader()
+    mfrc522.read_latency = 0.0
+    door = connector.DoorController(connector.Servo(connector.SERVO_PIN), hold_seconds=0.0, move_seconds=0.0)
+    db_manager = FakeDatabaseManager(connector, source='cache')
+    reader = connector.RFIDReader(db_manager, door=door, reader=mfrc522, name="bench")
+    reader.card_detector = None
+    reader.poll_interval = 0.0
+    uids = iter(range(1, 1 << 30))
+
+    def scan():
+        mfrc522.tap(next(uids))  # A new card every time, so the debouncer never suppresses
+        reader.read_rfid()
+
+    real_metrics = connector.metrics
+    print(f"\nread_rfid() over {args.scans} scans:")
+    connector.metrics = NullMetrics()
+    time_calls(scan, 100)
+    print_summary("metrics off", time_calls(scan, args.scans))
+    connector.metrics = real_metrics
+    time_calls(scan, 100)
+    print_summary("metrics on", time_calls(scan, args.scans))
+
+    connector.register_metrics(connector.DatabaseManager('postgresql://unused'), None, [reader])
+    server = connector.MetricsServer(port=0)
+    server.start()
+    url = f"http://{server.host}:{server.port}/metrics"
+    stop = threading.Event()
+    scrapes = []
+
+    def scrape():
+        while not stop.is_set():
+            start = time.perf_counter()
+            urllib.request.urlopen(url).read()
+            scrapes.append((time.perf_counter() - start) * 1000)
+
+    scraper = threading.Thread(target=scrape, daemon=True)
+    scraper.start()
+    print_summary("metrics on, scraped in a loop", time_calls(scan, args.scans))
+    stop.set()
+    scraper.join()
+    server.stop()
+    print_summary("one /metrics scrape", scrapes)
+    reader.cleanup()
+
+
+if __name__ == "__main__":
+    main()
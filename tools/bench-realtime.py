@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Measures decision-latency tails with and without REALTIME_ENABLED under load.
+
+Runs --doors reader threads on the simulated hardware backend against a
+fake database manager (or the real one with --dsn), taps Poisson-distributed
+cards for --seconds, and reports tap-to-decision percentiles twice: first
+with the default scheduling, then with RealtimePolicy applied to the
+reader and door threads (CPUs --cpus, SCHED_FIFO --priority, mlockall).
+
+The load runs in separate processes during both phases: --url starts
+--clients processes requesting that page of the web server in a loop (for
+example the dashboard at http://localhost:3000/), and --burn adds busy
+processes. Without either, one busy process per core is started.
+
+Needs root (or CAP_SYS_NICE and CAP_IPC_LOCK) for the real-time phase to
+differ; the policy logs a warning for each step it cannot apply.
+
+Usage: python3 tools/bench-realtime.py [--doors 1] [--rate 5] [--seconds 20] [--db-ms 2] [--poll-ms 10]
+                                       [--url http://localhost:3000/] [--clients 8] [--burn 0]
+                                       [--cpus 3] [--priority 50] [--dsn postgresql://...] [--json FILE]
+"""
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import random
+import threading
+import time
+import urllib.request
+
+from benchlib import FakeDatabaseManager, RecordingDatabaseManager, load_connector, print_summary, summarize
+
+
+def burn():
+    while True:
+        pass
+
+
+def request_loop(url):
+    while True:
+        try:
+            urllib.request.urlopen(url, timeout=5).read()
+        except OSError:
+            time.sleep(0.1)
+
+
+def start_load(args):
+    processes = [multiprocessing.Process(target=request_loop, args=(args.url,), daemon=True)
+                 for _ in range(args.clients if args.url else 0)]
+    burners = args.burn if args.burn or args.url else os.cpu_count()
+    processes += [multiprocessing.Process(target=burn, daemon=True) for _ in range(burners)]
+    for process in processes:
+        process.start()
+    return processes
+
+
+def run_phase(connector, db_manager, args, first_uid):
+    readers = []
+    for index in range(args.doors):
+        name = f"door{index + 1}"
+        mfrc522 = connector.hardware.open_reader(device=first_uid + index)
+        mfrc522.read_latency = args.read_ms / 1000
+        door = connector.DoorController(connector.Servo(12 + index), name=name, hold_seconds=0.05, move_seconds=0.01)
+        leds = connector.LedPatternEngine(green_pin=20 + 2 * index, red_pin=21 + 2 * index)
+        reader = connector.RFIDReader(db_manager, door=door, leds=leds, reader=mfrc522, name=name)
+        reader.card_detector = None
+        reader.poll_interval = args.poll_ms / 1000
+        readers.append(reader)
+
+    stop = threading.Event()
+    threads = [threading.Thread(target=reader.run, args=(stop,), name=f"reader-{reader.name}", daemon=True)
+               for reader in readers]
+    for thread in threads:
+        thread.start()
+    rng = random.Random(1)
+    tapped_at = {}
+    uid = first_uid * 1_000_000
+    deadline = time.monotonic() + args.seconds
+    due = time.monotonic()
+    while True:
+        due += rng.expovariate(args.rate * args.doors)
+        if due >= deadline:
+            break
+        time.sleep(max(0.0, due - time.monotonic()))
+        uid += 1
+        tapped_at[uid] = time.monotonic()
+        readers[uid % len(readers)].reader.tap(uid)
+    time.sleep(args.poll_ms / 1000 + args.db_ms / 1000 + 0.2)  # Let the last decisions land
+    stop.set()
+    for thread in threads:
+        thread.join()
+    for reader in readers:
+        reader.cleanup()
+    return [(db_manager.decided_at[uid] - tapped) * 1000 for uid, tapped in tapped_at.items()
+            if uid in db_manager.decided_at]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--doors', type=int, default=1)
+    parser.add_argument('--rate', type=float, default=5.0, help="taps per second per door")
+    parser.add_argument('--seconds', type=float, default=20.0, help="per phase")
+    parser.add_argument('--db-ms', type=float, default=2.0, help="fake database latency")
+    parser.add_argument('--poll-ms', type=float, default=10.0)
+    parser.add_argument('--read-ms', type=float, default=1.0, help="simulated MFRC522 read latency")
+    parser.add_argument('--url', help="web server page to load")
+    parser.add_argument('--clients', type=int, default=8)
+    parser.add_argument('--burn', type=int, default=0, help="busy processes")
+    parser.add_argument('--cpus', default=str(os.cpu_count() - 1), help="REALTIME_CPUS for the real-time phase")
+    parser.add_argument('--priority', type=int, default=50, help="SCHED_FIFO priority, 0 for nice only")
+    parser.add_argument('--dsn')
+    parser.add_argument('--json')
+    args = parser.parse_args()
+
+    connector = load_connector('sim')
+    connector.logger.setLevel(logging.ERROR)  # Per-scan log lines would dominate the timing
+    if args.dsn:
+        db_manager = RecordingDatabaseManager(connector.DatabaseManager(args.dsn))
+    else:
+        db_manager = FakeDatabaseManager(connector, args.db_ms / 1000)
+
+    load = start_load(args)
+    print(f"{len(load)} load processes running")
+    results = {}
+    try:
+        samples = run_phase(connector, db_manager, args, first_uid=1)
+        results['default'] = summarize(samples)
+        print_summary("default scheduling", samples)
+
+        # Last, because mlockall and the thread priorities cannot be undone in this process
+        connector.realtime_policy = connector.RealtimePolicy(enabled=True, cpus=args.cpus, priority=args.priority)
+        connector.realtime_policy.lock_memory()
+        samples = run_phase(connector, db_manager, args, first_uid=2)
+        results['realtime'] = summarize(samples)
+        print_summary("real-time", samples)
+        print(f"  policy applied to {len(connector.realtime_policy.applied)} threads")
+    finally:
+        for process in load:
+            process.terminate()
+        if args.dsn:
+            db_manager.close()
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Compares the threaded runtime with READER_RUNTIME=asyncio.
+
+Both runtimes serve --doors simulated doors (hardware backend 'sim') fed
+with Poisson-distributed taps at --rate taps per second per door for
+--seconds. The threaded runtime runs one RFIDReader.run() thread per door
+against a fake DatabaseManager whose authorize() sleeps --db-ms; the
+asyncio runtime runs AsyncReaderService against a fake
+AsyncDatabaseManager that awaits asyncio.sleep() for the same time.
+
+Reports tap-to-decision latency, the CPU time the process used (user +
+system, so polling overhead shows up) and the number of threads.
+
+With --dsn both runtimes use their real database managers instead, so
+the comparison includes psycopg2 against psycopg 3.
+
+Usage: python3 tools/bench-runtime.py [--doors 4] [--rate 2] [--seconds 10] [--db-ms 5] [--poll-ms 10]
+                                      [--read-ms 1] [--dsn postgresql://...] [--only threads|asyncio]
+"""
+import argparse
+import asyncio
+import logging
+import random
+import threading
+import time
+
+from benchlib import (AsyncRecordingDatabaseManager, FakeAsyncDatabaseManager, FakeDatabaseManager,
+                      RecordingDatabaseManager, load_connector, print_summary)
+
+
+def make_readers(connector, db_manager, args, first_uid, scheduler=None):
+    readers = []
+    for index in range(args.doors):
+        name = f"door{index + 1}"
+        mfrc522 = connector.hardware.open_reader(device=index)
+        mfrc522.read_latency = args.read_ms / 1000
+        door = connector.DoorController(connector.Servo(12 + index), name=name, scheduler=scheduler,
+                                        hold_seconds=0.05, move_seconds=0.01)
+        leds = connector.LedPatternEngine(green_pin=20 + 2 * index, red_pin=21 + 2 * index)
+        reader = connector.RFIDReader(db_manager, door=door, leds=leds, reader=mfrc522, name=name)
+        reader.card_detector = None
+        reader.poll_interval = args.poll_ms / 1000
+        reader.uids = iter(range(first_uid + index * 1_000_000, first_uid + (index + 1) * 1_000_000))
+        readers.append(reader)
+    return readers
+
+
+def feed(readers, rate, seconds, tapped_at, stop):
+    """Taps new cards on every reader with exponential gaps until seconds have passed."""
+    rng = random.Random(1)
+    deadline = time.monotonic() + seconds
+    schedule = [(time.monotonic() + rng.expovariate(rate), reader) for reader in readers]
+    while not stop.is_set():
+        schedule.sort(key=lambda item: item[0])
+        due, reader = schedule[0]
+        if due >= deadline:
+            return
+        time.sleep(max(0.0, due - time.monotonic()))
+        uid = next(reader.uids)
+        tapped_at[uid] = time.monotonic()
+        reader.reader.tap(uid)
+        schedule[0] = (due + rng.expovariate(rate), reader)
+
+
+def decision_latencies(db_manager, tapped_at):
+    return [(db_manager.decided_at[uid] - tapped) * 1000 for uid, tapped in tapped_at.items()
+            if uid in db_manager.decided_at]
+
+
+def run_threads(connector, args):
+    if args.dsn:
+        db_manager = RecordingDatabaseManager(connector.DatabaseManager(args.dsn))
+    else:
+        db_manager = FakeDatabaseManager(connector, args.db_ms / 1000)
+    readers = make_readers(connector, db_manager, args, first_uid=1)
+    tapped_at, stop = {}, threading.Event()
+    feeder = threading.Thread(target=feed, args=(readers, args.rate, args.seconds, tapped_at, stop), daemon=True)
+    threads = [threading.Thread(target=reader.run, args=(stop,), name=f"reader-{reader.name}", daemon=True)
+               for reader in readers]
+    try:
+        cpu_start, wall_start = time.process_time(), time.monotonic()
+        for thread in threads + [feeder]:
+            thread.start()
+        feeder.join()
+        time.sleep(args.poll_ms / 1000 + args.db_ms / 1000 + 0.1)  # Let the last decisions land
+        thread_count = threading.active_count()
+        stop.set()
+        for thread in threads:
+            thread.join()
+        cpu, wall = time.process_time() - cpu_start, time.monotonic() - wall_start
+    finally:
+        for reader in readers:
+            reader.cleanup()
+        if args.dsn:
+            db_manager.close()
+    return decision_latencies(db_manager, tapped_at), len(tapped_at), cpu, wall, thread_count
+
+
+def run_asyncio(connector, args):
+    async def main():
+        if args.dsn:
+            db_manager = AsyncRecordingDatabaseManager(connector.AsyncDatabaseManager(args.dsn))
+        else:
+            db_manager = FakeAsyncDatabaseManager(connector, args.db_ms / 1000)
+        readers = make_readers(connector, db_manager, args, first_uid=1 << 30,
+                               scheduler=connector.LoopScheduler(asyncio.get_running_loop()))
+        service = connector.AsyncReaderService(db_manager, readers)
+        tapped_at, stop = {}, threading.Event()
+        feeder = threading.Thread(target=feed, args=(readers, args.rate, args.seconds, tapped_at, stop),
+                                  daemon=True)
+        try:
+            cpu_start, wall_start = time.process_time(), time.monotonic()
+            task = asyncio.ensure_future(service.run())
+            feeder.start()
+            await asyncio.to_thread(feeder.join)
+            await asyncio.sleep(args.poll_ms / 1000 + args.db_ms / 1000 + 0.1)  # Let the last decisions land
+            thread_count = threading.active_count()
+            service.stop()
+            await task
+            cpu, wall = time.process_time() - cpu_start, time.monotonic() - wall_start
+        finally:
+            for reader in readers:
+                reader.cleanup()
+            if args.dsn:
+                await db_manager.close()
+        return decision_latencies(db_manager, tapped_at), len(tapped_at), cpu, wall, thread_count
+
+    return asyncio.run(main())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--doors', type=int, default=4)
+    parser.add_argument('--rate', type=float, default=2.0, help="taps per second per door")
+    parser.add_argument('--seconds', type=float, default=10.0)
+    parser.add_argument('--db-ms', type=float, default=5.0, help="fake database latency")
+    parser.add_argument('--poll-ms', type=float, default=10.0, help="reader poll interval")
+    parser.add_argument('--read-ms', type=float, default=1.0, help="simulated MFRC522 read latency")
+    parser.add_argument('--dsn')
+    parser.add_argument('--only', choices=('threads', 'asyncio'))
+    args = parser.parse_args()
+
+    connector = load_connector('sim')
+    connector.logger.setLevel(logging.ERROR)  # Per-scan log lines would dominate the CPU time
+
+    runtimes = [('threads', run_threads), ('asyncio', run_asyncio)]
+    for name, run in runtimes:
+        if args.only and name != args.only:
+            continue
+        samples, taps, cpu, wall, threads = run(connector, args)
+        print(f"{name}: {taps} taps on {args.doors} doors in {wall:.1f} s, {len(samples)} decided, "
+              f"CPU {cpu:.2f} s ({100 * cpu / wall:.1f} % of one core), {threads} threads")
+        print_summary(f"{name} tap to decision", samples)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Measures the CPU cost and pulse jitter of a servo backend (SERVO_BACKEND).
+
+Holds the unlock angle for --seconds and reports the CPU time this
+process used meanwhile, plus that of pigpiod for the pigpio backend.
+--load starts that many busy processes to show how the pulses hold up
+when the Pi is busy.
+
+With --loopback-pin, wire the servo pin to that input pin: every edge is
+timestamped by pigpiod (which must be running, for any backend) and the
+report adds the pulse width and period with their spread and extremes.
+Software PWM shows its jitter there; the hardware backends should be
+within a few microseconds.
+
+Usage: python3 tools/bench-servo.py [--backend gpio|sysfs|pigpio] [--pin 12] [--seconds 10] [--load 0]
+                                    [--loopback-pin 26] [--hardware rpi|sim]
+"""
+import argparse
+import multiprocessing
+import os
+import statistics
+import time
+
+from benchlib import load_connector
+
+
+def burn():
+    while True:
+        pass
+
+
+def daemon_cpu_seconds(name):
+    """User + system CPU seconds of the first process called name, or None."""
+    for pid in filter(str.isdigit, os.listdir('/proc')):
+        try:
+            with open(f"/proc/{pid}/comm") as f:
+                if f.read().strip() != name:
+                    continue
+            with open(f"/proc/{pid}/stat") as f:
+                fields = f.read().rsplit(')', 1)[1].split()
+            return (int(fields[11]) + int(fields[12])) / os.sysconf('SC_CLK_TCK')
+        except OSError:
+            continue
+    return None
+
+
+def print_spread(label, samples_us):
+    if not samples_us:
+        print(f"  {label:<12} no samples")
+        return
+    print(f"  {label:<12} n={len(samples_us):<6} mean={statistics.fmean(samples_us):9.1f} us  "
+          f"stdev={statistics.pstdev(samples_us):7.1f} us  min={min(samples_us):7.0f} us  "
+          f"max={max(samples_us):7.0f} us")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--backend', choices=('gpio', 'sysfs', 'pigpio'))
+    parser.add_argument('--pin', type=int, default=12)
+    parser.add_argument('--seconds', type=float, default=10.0)
+    parser.add_argument('--load', type=int, default=0, help="busy processes to run meanwhile")
+    parser.add_argument('--loopback-pin', type=int)
+    parser.add_argument('--hardware', default='rpi', help="hardware backend for the gpio servo")
+    args = parser.parse_args()
+
+    connector = load_connector(args.hardware)
+    servo = connector.create_servo(args.pin, args.backend)
+    edges = []
+    callback = None
+    if args.loopback_pin is not None:
+        import pigpio
+        pi = pigpio.pi()
+        if not pi.connected:
+            raise SystemExit("--loopback-pin needs pigpiod running")
+        pi.set_mode(args.loopback_pin, pigpio.INPUT)
+        callback = pi.callback(args.loopback_pin, pigpio.EITHER_EDGE,
+                               lambda gpio, level, tick: edges.append((level, tick)))
+
+    load = [multiprocessing.Process(target=burn, daemon=True) for _ in range(args.load)]
+    for process in load:
+        process.start()
+    daemon_start = daemon_cpu_seconds('pigpiod')
+    cpu_start = time.process_time()
+    servo.start_move(connector.DOOR_UNLOCK_ANGLE)
+    time.sleep(args.seconds)
+    cpu = time.process_time() - cpu_start
+    daemon_end = daemon_cpu_seconds('pigpiod')
+    servo.stop_signal()
+    for process in load:
+        process.terminate()
+    if callback is not None:
+        callback.cancel()
+        pi.stop()
+    servo.stop()
+
+    name = type(servo).__name__
+    print(f"{name} on GPIO {args.pin}, {args.seconds:.0f} s at {connector.DOOR_UNLOCK_ANGLE:.0f} degrees, "
+          f"{args.load} busy processes")
+    print(f"  CPU this process {cpu:.3f} s ({100 * cpu / args.seconds:.2f} % of one core)")
+    if daemon_start is not None and daemon_end is not None:
+        daemon = daemon_end - daemon_start
+        print(f"  CPU pigpiod      {daemon:.3f} s ({100 * daemon / args.seconds:.2f} % of one core)")
+    if args.loopback_pin is not None:
+        widths, periods = [], []
+        rising = None
+        for (level, tick), (_, next_tick) in zip(edges, edges[1:]):
+            delta = (next_tick - tick) & 0xFFFFFFFF  # pigpio ticks wrap every 72 minutes
+            if level == 1:
+                widths.append(delta)
+                if rising is not None:
+                    periods.append((tick - rising) & 0xFFFFFFFF)
+                rising = tick
+        expected = 1e6 / servo.frequency * connector.Servo.duty_for(connector.DOOR_UNLOCK_ANGLE) / 100
+        print(f"  expected pulse {expected:.0f} us every {1e6 / servo.frequency:.0f} us")
+        print_spread("pulse width", widths)
+        print_spread("period", periods)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Measures lookup latency and memory of the memory-mapped allowlist snapshot.
+
+Writes a snapshot of random tag digests (1M by default), maps it the way the
+reader does at startup and times hits and misses, next to a plain Python set
+of the same hex digests for reference. The set is also built once in a fresh
+process to measure its memory, since the parent's heap still holds the freed
+digest list the set would reuse.
+
+Usage: python3 tools/bench-snapshot.py [tags] [lookups]
+"""
+import hashlib
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import time
+
+from benchlib import load_connector, print_summary, time_calls
+
+
+def rss_mb():
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def set_rss_mb(tags):
+    """RSS growth from building the set of tags hex digests, run in a fresh process."""
+    rss_before = rss_mb()
+    in_memory = {hashlib.sha256(str(i).encode()).hexdigest() for i in range(tags)}
+    return rss_mb() - rss_before if in_memory else 0.0
+
+
+def main():
+    tags = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    lookups = int(sys.argv[2]) if len(sys.argv) > 2 else 10_000
+    connector = load_connector()
+    connector.logger.setLevel("WARNING")
+
+    digests = [hashlib.sha256(str(i).encode()).hexdigest() for i in range(tags)]
+    misses = [hashlib.sha256(f"unknown-{i}".encode()).hexdigest() for i in range(lookups)]
+    hits = random.sample(digests, min(lookups, tags))
+
+    path = os.path.join(tempfile.mkdtemp(prefix="allowlist-"), "allowlist.snapshot")
+    start = time.perf_counter()
+    connector.AllowlistSnapshot(path).write(digests)
+    print(f"Wrote {tags} tags ({os.path.getsize(path) / 2 ** 20:.1f} MiB) in {time.perf_counter() - start:.2f} s")
+    del digests
+
+    rss_before = rss_mb()
+    snapshot = connector.AllowlistSnapshot(path)
+    start = time.perf_counter()
+    snapshot.load()
+    print(f"Loaded snapshot in {(time.perf_counter() - start) * 1000:.3f} ms, RSS +{rss_mb() - rss_before:.1f} MiB")
+
+    hit_iter, miss_iter = iter(hits), iter(misses)
+    print_summary("snapshot hit", time_calls(lambda: snapshot.contains(next(hit_iter)), len(hits)))
+    print_summary("snapshot miss", time_calls(lambda: snapshot.contains(next(miss_iter)), len(misses)))
+    print(f"RSS after {len(hits) + len(misses)} lookups: +{rss_mb() - rss_before:.1f} MiB")
+
+    with multiprocessing.get_context('spawn').Pool(1) as pool:
+        print(f"Python set of the same hex digests: RSS +{pool.apply(set_rss_mb, (tags,)):.1f} MiB")
+    in_memory = {hashlib.sha256(str(i).encode()).hexdigest() for i in range(tags)}
+    hit_iter = iter(hits)
+    print_summary("set hit", time_calls(lambda: next(hit_iter) in in_memory, len(hits)))
+
+
+if __name__ == "__main__":
+    main()
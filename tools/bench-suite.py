@@ -0,0 +1,316 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark suite for the authorization hot path, with a baseline.
+
+Benchmarks (per call unless noted):
+  hash_rfid                  UID hashing
+  check_validity_cold        validity query on a fresh connection
+  check_validity_pooled      check_validity through the pool, caches off
+  check_validity_cache_hit   check_validity answered by the live allowlist cache
+  insert_log_single          one insert_log() round trip
+  insert_logs_batched        insert_logs() with --batch rows, per row
+  read_rfid                  RFIDReader.read_rfid() on simulated hardware,
+                             with the live cache and the background log writer
+  authorize_offline          DatabaseManager.authorize() through the budget and
+                             breaker, answered in memory instead of by Postgres
+  read_rfid_offline          read_rfid() with the log writer, answered in memory
+
+The benchmarks between check_validity_cold and read_rfid need a migrated
+PortalWarden Postgres (--dsn or DATABASE_URL) and are skipped without one.
+The queries rely on Postgres features (prepared statements, ON CONFLICT,
+the authorize_and_log function), so there is no SQLite stand-in; the
+offline benchmarks cover the Python side of the same paths on any machine.
+Log rows are written with UIDs above the 40-bit MIFARE range and deleted
+afterwards.
+
+Each benchmark is warmed up (--warmup calls) and timed --runs times; the
+reported figures are the medians over the runs, so one noisy run (a cold
+CPU cache, frequency scaling, a busy neighbour) does not decide the result.
+
+Results are compared with the baseline file (tools/bench-baseline.json by
+default): a benchmark whose p50 or p95 is more than --threshold (a
+fraction, BENCH_REGRESSION_THRESHOLD) above the baseline is flagged and the
+exit status is 1. A baseline of 0 ms only flags results above 0 ms.
+--update-baseline stores this run as the new baseline; commit it together
+with the change it measures, recorded on the target hardware (a Raspberry
+Pi), or say in --note which machine it came from. --json writes the run.
+
+Usage: python3 tools/bench-suite.py [--dsn postgresql://...] [--iterations 500] [--warmup 100] [--runs 5]
+                                    [--batch 50] [--only NAME ...] [--baseline FILE] [--threshold 0.2]
+                                    [--update-baseline] [--note TEXT] [--json FILE]
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import statistics
+import sys
+import time
+from datetime import datetime
+
+from decouple import config
+
+from benchlib import BASEDIR, load_connector, offline_database_manager, summarize, time_calls
+
+DEFAULT_BASELINE = os.path.join(BASEDIR, "tools", "bench-baseline.json")
+BENCH_UID_BASE = 1 << 40  # Above every real MIFARE UID, so benchmark log rows are easy to remove
+# Cards tapped on the simulated reader must fit its 5 UID bytes; their rows are removed by time as well
+TAP_UID_BASE = (1 << 40) - (1 << 30)
+VALID_UID = 584190925461
+HASH_CALLS_PER_SAMPLE = 100  # One hash takes about as long as reading the clock, so time them in batches
+
+
+def make_benchmarks(connector, dsn, batch):
+    """Returns [(name, setup)] where setup() returns (call, calls_per_sample, teardown)."""
+    counter = iter(range(BENCH_UID_BASE, BENCH_UID_BASE + (1 << 30)))
+    tap_counter = iter(range(TAP_UID_BASE, 1 << 40))
+
+    def hash_rfid():
+        def call():
+            for _ in range(HASH_CALLS_PER_SAMPLE):
+                connector.hash_rfid(VALID_UID)
+
+        return call, HASH_CALLS_PER_SAMPLE, None
+
+    def check_validity_cold():
+        digest = connector.hash_rfid(VALID_UID)
+        db_manager = connector.DatabaseManager(dsn)
+
+        def call():
+            conn = db_manager.connect()
+            try:
+                with conn.cursor() as cursor:
+                    connector.DatabaseManager._query_validity(cursor, digest)
+            finally:
+                conn.close()
+
+        return call, 1, db_manager.close
+
+    def check_validity_pooled():
+        db_manager = connector.DatabaseManager(dsn)
+        db_manager.negative_cache = None
+        db_manager.check_validity(VALID_UID)  # Opens the pool
+        return (lambda: db_manager.check_validity(VALID_UID)), 1, db_manager.close
+
+    def check_validity_cache_hit():
+        db_manager = connector.DatabaseManager(dsn)
+        db_manager.allowlist = connector.AllowlistCache(db_manager)
+        db_manager.allowlist.start()
+        deadline = time.monotonic() + 10
+        while not db_manager.allowlist.is_live() and time.monotonic() < deadline:
+            time.sleep(0.05)
+        if not db_manager.allowlist.is_live():
+            raise RuntimeError("the allowlist cache did not go live within 10 s")
+
+        def teardown():
+            db_manager.allowlist.stop()
+            db_manager.close()
+
+        return (lambda: db_manager.check_validity(VALID_UID)), 1, teardown
+
+    def insert_log_single():
+        db_manager = connector.DatabaseManager(dsn)
+        return (lambda: db_manager.insert_log(next(counter), False)), 1, db_manager.close
+
+    def insert_logs_batched():
+        db_manager = connector.DatabaseManager(dsn)
+
+        def call():
+            now = datetime.now()
+            db_manager.insert_logs([(f"bench-{uid}", uid, False, now) for uid in (next(counter) for _ in range(batch))])
+
+        return call, batch, db_manager.close
+
+    def scan_loop(db_manager):
+        log_writer = connector.RfidLogWriter(db_manager)
+        log_writer.start()
+        mfrc522 = connector.hardware.open_reader()
+        mfrc522.read_latency = 0.0
+        door = connector.DoorController(connector.Servo(connector.SERVO_PIN), hold_seconds=0.0, move_seconds=0.0)
+        reader = connector.RFIDReader(db_manager, log_writer, door=door, reader=mfrc522, name="bench")
+        reader.card_detector = None
+        reader.poll_interval = 0.0
+
+        def call():
+            mfrc522.tap(next(tap_counter))  # A new card every time, so the debouncer never suppresses
+            reader.read_rfid()
+
+        def teardown():
+            reader.cleanup()
+            log_writer.close()
+            if db_manager.allowlist is not None:
+                db_manager.allowlist.stop()
+            db_manager.close()
+
+        return call, 1, teardown
+
+    def read_rfid():
+        db_manager = connector.DatabaseManager(dsn)
+        db_manager.allowlist = connector.AllowlistCache(db_manager)
+        db_manager.allowlist.start()
+        deadline = time.monotonic() + 10
+        while not db_manager.allowlist.is_live() and time.monotonic() < deadline:
+            time.sleep(0.05)
+        return scan_loop(db_manager)
+
+    def authorize_offline():
+        db_manager = offline_database_manager(connector)
+        db_manager.negative_cache = None
+        return (lambda: db_manager.authorize(next(counter), log=True)), 1, db_manager.close
+
+    def read_rfid_offline():
+        db_manager = offline_database_manager(connector)
+        db_manager.negative_cache = None
+        return scan_loop(db_manager)
+
+    benchmarks = [('hash_rfid', hash_rfid)]
+    if dsn:
+        benchmarks += [
+            ('check_validity_cold', check_validity_cold),
+            ('check_validity_pooled', check_validity_pooled),
+            ('check_validity_cache_hit', check_validity_cache_hit),
+            ('insert_log_single', insert_log_single),
+            ('insert_logs_batched', insert_logs_batched),
+            ('read_rfid', read_rfid),
+        ]
+    benchmarks += [('authorize_offline', authorize_offline), ('read_rfid_offline', read_rfid_offline)]
+    return benchmarks
+
+
+def remove_bench_rows(connector, dsn, started):
+    db_manager = connector.DatabaseManager(dsn)
+    try:
+        db_manager.run(lambda cursor: cursor.execute(
+            'DELETE FROM "RfidLog" WHERE "rfidId" >= %s OR ("rfidId" >= %s AND "timestamp" >= %s)',
+            (BENCH_UID_BASE, TAP_UID_BASE, started)))
+    finally:
+        db_manager.close()
+
+
+def median_summary(summaries):
+    """Combines the summaries of several runs into the median of each figure."""
+    result = {key: statistics.median(summary[key] for summary in summaries) for key in summaries[0]}
+    result['n'] = sum(summary['n'] for summary in summaries)
+    return result
+
+
+def relative_change(value, base):
+    if base > 0:
+        return value / base - 1
+    return 0.0 if value <= 0 else float('inf')
+
+
+def compare(results, baseline, threshold):
+    """Prints each benchmark against the baseline and returns the names that regressed."""
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get('benchmarks', {}).get(name)
+        if base is None:
+            print(f"new  {name:<28} no baseline")
+            continue
+        worst = max(relative_change(result[key], base[key]) for key in ('p50_ms', 'p95_ms'))
+        status = "REGR" if worst > threshold else "ok  "
+        if worst > threshold:
+            regressions.append(name)
+        print(f"{status} {name:<28} p50 {base['p50_ms']:9.4f} -> {result['p50_ms']:9.4f} ms  "
+              f"p95 {base['p95_ms']:9.4f} -> {result['p95_ms']:9.4f} ms  ({worst * 100:+.1f} % worst)")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--dsn', default=config('DATABASE_URL', default=''))
+    parser.add_argument('--iterations', type=int, default=500)
+    parser.add_argument('--warmup', type=int, default=100)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--batch', type=int, default=config('LOG_BATCH_SIZE', cast=int, default=50))
+    parser.add_argument('--only', nargs='+', metavar='NAME')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    parser.add_argument('--threshold', type=float,
+                        default=config('BENCH_REGRESSION_THRESHOLD', cast=float, default=0.2))
+    parser.add_argument('--update-baseline', action='store_true')
+    parser.add_argument('--note', help="where the run was recorded, stored with --update-baseline")
+    parser.add_argument('--json')
+    args = parser.parse_args()
+    if args.runs < 1:
+        parser.error("--runs must be at least 1")
+
+    connector = load_connector('sim')
+    connector.logger.setLevel(logging.ERROR)  # Per-call log lines would dominate the timing
+
+    results = {}
+    started = datetime.now()
+    try:
+        for name, setup in make_benchmarks(connector, args.dsn, args.batch):
+            if args.only and name not in args.only:
+                continue
+            try:
+                call, per_sample, teardown = setup()
+            except Exception as e:
+                print(f"skip {name:<28} {e}")
+                continue
+            summaries = []
+            try:
+                iterations = max(1, args.iterations // per_sample)
+                for _ in range(args.runs):
+                    time_calls(call, args.warmup)
+                    summaries.append(summarize([sample / per_sample for sample in time_calls(call, iterations)]))
+            finally:
+                if teardown is not None:
+                    teardown()
+            result = results[name] = median_summary(summaries)
+            print(f"{name:<32} median of {args.runs}: mean={result['mean_ms']:8.3f} ms  p50={result['p50_ms']:8.3f} ms  "
+                  f"p95={result['p95_ms']:8.3f} ms  p99={result['p99_ms']:8.3f} ms  max={result['max_ms']:8.3f} ms")
+    finally:
+        if args.dsn:
+            remove_bench_rows(connector, args.dsn, started)
+    if not args.dsn:
+        print("No --dsn or DATABASE_URL, only the database-free and offline benchmarks ran.")
+
+    run = {
+        'recorded_at': datetime.now().isoformat(timespec='seconds'),
+        'host': platform.node(),
+        'machine': platform.machine(),
+        'python': platform.python_version(),
+        'iterations': args.iterations,
+        'warmup': args.warmup,
+        'runs': args.runs,
+        'benchmarks': results,
+    }
+    if args.note:
+        run['note'] = args.note
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(run, f, indent=2)
+
+    regressions = []
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        print(f"\nAgainst the baseline from {baseline.get('recorded_at')} on {baseline.get('host')} "
+              f"({baseline.get('machine')}, threshold {args.threshold * 100:.0f} %):")
+        if baseline.get('note'):
+            print(f"  {baseline['note']}")
+        if baseline.get('machine') != run['machine']:
+            print(f"  This run is on {run['machine']}; the figures are not comparable across machines.")
+        regressions = compare(results, baseline, args.threshold)
+    else:
+        print(f"\nNo baseline at {args.baseline}; run with --update-baseline to store one.")
+
+    if args.update_baseline:
+        if os.path.exists(args.baseline):
+            with open(args.baseline) as f:
+                # Keep the entries of benchmarks that were skipped in this run
+                run['benchmarks'] = {**json.load(f).get('benchmarks', {}), **results}
+        with open(args.baseline, 'w') as f:
+            json.dump(run, f, indent=2)
+            f.write('\n')
+        print(f"Baseline written to {args.baseline}.")
+    elif regressions:
+        print(f"Regressions beyond {args.threshold * 100:.0f} %: {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
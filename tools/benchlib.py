@@ -0,0 +1,183 @@
+"""
+Shared helpers and fakes for the spi-connector benchmark and check scripts
+in this directory.
+
+The reader lives in a file whose name is not a valid module name, so the
+benchmarks load it by path instead of importing it.
+"""
+import asyncio
+import importlib.util
+import os
+import statistics
+import threading
+import time
+from contextlib import nullcontext
+
+BASEDIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CONNECTOR_PATH = os.path.join(BASEDIR, "spi-connector.py")
+
+
+def load_connector(backend=None):
+    """
+    Loads spi-connector.py as a module without running its main loop. With
+    backend ('rpi' or 'sim') the hardware backend is selected right away,
+    otherwise HARDWARE_BACKEND decides on first use.
+    """
+    spec = importlib.util.spec_from_file_location("spi_connector", CONNECTOR_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    if backend is not None:
+        module.init_hardware(backend)
+    return module
+
+
+class FakeDatabaseManager:
+    """
+    Stands in for DatabaseManager. authorize() takes latency seconds, with at
+    most pool_size calls at a time if given, and grants the UIDs in valid
+    (even UIDs if valid is None). decided_at maps each UID to the
+    time.monotonic() of its last decision, the clock the simulated reader
+    timestamps its reads with. Decisions are counted and observed in the
+    metrics like the real ones.
+    """
+
+    def __init__(self, connector, latency=0.0, valid=None, pool_size=None, source='db'):
+        self.connector = connector
+        self.latency = latency
+        self.valid = valid
+        self.source = source
+        self.allowlist = None
+        self.slots = threading.Semaphore(pool_size) if pool_size else nullcontext()
+        self.decided_at = {}
+        self.decision_counts = connector.ShardedCounter()
+        self.db_queries = connector.ShardedCounter()
+
+    def authorize(self, rfid_id, event_id=None, log=False):
+        start = time.monotonic()
+        with self.slots:
+            if self.latency:
+                time.sleep(self.latency)
+        return self._decided(rfid_id, start)
+
+    def _decided(self, rfid_id, start):
+        now = time.monotonic()
+        self.decided_at[rfid_id] = now
+        self.decision_counts.inc(self.source)
+        if self.source == 'db':
+            self.db_queries.inc()
+        self.connector.metrics.decision_seconds.observe(now - start)
+        is_valid = rfid_id in self.valid if self.valid is not None else rfid_id % 2 == 0
+        return self.connector.Decision(is_valid, self.source, True, (now - start) * 1000)
+
+    def stats(self):
+        decisions = self.decision_counts.collect()
+        return {'decisions': dict(decisions), 'db_queries': sum(self.db_queries.collect().values())}
+
+    def close(self):
+        pass
+
+
+class FakeAsyncDatabaseManager(FakeDatabaseManager):
+    """FakeDatabaseManager for the asyncio runtime; pool_size does not apply."""
+
+    async def authorize(self, rfid_id, event_id=None, log=False):
+        start = time.monotonic()
+        await asyncio.sleep(self.latency)
+        return self._decided(rfid_id, start)
+
+
+class RecordingDatabaseManager:
+    """Wraps a real database manager and records when each decision was made, like FakeDatabaseManager."""
+
+    def __init__(self, db_manager):
+        self.db_manager = db_manager
+        self.decided_at = {}
+
+    def __getattr__(self, name):
+        return getattr(self.db_manager, name)
+
+    def authorize(self, rfid_id, event_id=None, log=False):
+        decision = self.db_manager.authorize(rfid_id, event_id=event_id, log=log)
+        self.decided_at[rfid_id] = time.monotonic()
+        return decision
+
+
+class AsyncRecordingDatabaseManager(RecordingDatabaseManager):
+    async def authorize(self, rfid_id, event_id=None, log=False):
+        decision = await self.db_manager.authorize(rfid_id, event_id=event_id, log=log)
+        self.decided_at[rfid_id] = time.monotonic()
+        return decision
+
+
+class FakeCursor:
+    """Stands in for a psycopg2 cursor: every tag lookup finds the tag."""
+
+    def execute(self, query, params=None):
+        pass
+
+    def fetchone(self):
+        return (True,)
+
+
+def offline_database_manager(connector, latency=0.0):
+    """
+    A real DatabaseManager, with its caches, breaker and latency budget,
+    whose queries are answered in memory after latency seconds instead of
+    by Postgres. Lets the authorize and read paths be measured without a
+    database.
+    """
+    class OfflineDatabaseManager(connector.DatabaseManager):
+        def run(self, work):
+            time.sleep(latency)
+            return work(FakeCursor())
+
+        def authorize_and_log(self, rfid_id, event_id=None):
+            time.sleep(latency)
+            return True, None
+
+        def insert_logs(self, rows):
+            time.sleep(latency)
+
+    return OfflineDatabaseManager('postgresql://unused')
+
+
+def check(label, ok):
+    """Prints one line of a check script's report and returns ok, to be and-ed into the exit status."""
+    print(f"{'ok  ' if ok else 'FAIL'} {label}")
+    return ok
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def time_calls(func, iterations):
+    """Calls func() iterations times and returns the per-call latencies in milliseconds."""
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def summarize(samples):
+    return {
+        "n": len(samples),
+        "mean_ms": statistics.fmean(samples) if samples else 0.0,
+        "p50_ms": percentile(samples, 50),
+        "p95_ms": percentile(samples, 95),
+        "p99_ms": percentile(samples, 99),
+        "max_ms": max(samples) if samples else 0.0,
+    }
+
+
+def print_summary(name, samples):
+    result = summarize(samples)
+    print(f"{name:<32} n={result['n']:<6} mean={result['mean_ms']:8.3f} ms  p50={result['p50_ms']:8.3f} ms  "
+          f"p95={result['p95_ms']:8.3f} ms  p99={result['p99_ms']:8.3f} ms  max={result['max_ms']:8.3f} ms")
+    return result
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Checks LED pattern timing against the simulated GPIO.
+
+Plays every one-shot pattern through LedPatternEngine on the simulated
+hardware backend and compares each LED edge with the time the pattern
+defines. Also checks that a new pattern preempts a running one right away.
+Exits non-zero if any edge is off by more than the tolerance.
+
+Usage: python3 tools/check-led-patterns.py [--tolerance-ms 10]
+"""
+import argparse
+import sys
+import time
+
+from benchlib import load_connector
+
+
+def edges_since(gpio, start):
+    return [(t - start, pin, value) for t, pin, kind, value in gpio.timeline(kind='output') if t >= start]
+
+
+def expected_edges(connector, steps, green_pin, red_pin):
+    edges, elapsed = [], 0.0
+    state = connector.LED_IDLE
+    for green, red, seconds in steps:
+        if green != state[0]:
+            edges.append((elapsed, green_pin, green))
+        if red != state[1]:
+            edges.append((elapsed, red_pin, red))
+        state = (green, red)
+        elapsed += seconds
+    idle_green, idle_red = connector.LED_IDLE
+    if idle_green != state[0]:
+        edges.append((elapsed, green_pin, idle_green))
+    if idle_red != state[1]:
+        edges.append((elapsed, red_pin, idle_red))
+    return edges, elapsed
+
+
+def transitions(recorded, initial):
+    """Drops writes that leave a pin at the value it already had."""
+    last, result = dict(initial), []
+    for t, pin, value in recorded:
+        value = 1 if value else 0
+        if last.get(pin) != value:
+            result.append((t, pin, value))
+            last[pin] = value
+    return result
+
+
+def compare(name, expected, recorded, tolerance):
+    if [(pin, value) for _, pin, value in expected] != [(pin, value) for _, pin, value in recorded]:
+        print(f"FAIL {name}: edge sequence differs\n  expected {expected}\n  recorded {recorded}")
+        return False
+    worst = max((abs(r[0] - e[0]) for e, r in zip(expected, recorded)), default=0.0)
+    status = "ok  " if worst <= tolerance else "FAIL"
+    print(f"{status} {name:<10} {len(expected):3d} edges, worst deviation {worst * 1000:6.2f} ms")
+    return worst <= tolerance
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--tolerance-ms', type=float, default=10.0)
+    args = parser.parse_args()
+    tolerance = args.tolerance_ms / 1000
+
+    connector = load_connector('sim')
+    gpio = connector.GPIO
+    green_pin, red_pin = 2, 3
+    engine = connector.LedPatternEngine(green_pin=green_pin, red_pin=red_pin)
+    time.sleep(0.05)  # Let the engine settle on the idle state
+    ok = True
+
+    for name, (steps, repeat) in connector.LED_PATTERNS.items():
+        if repeat:
+            continue
+        expected, duration = expected_edges(connector, steps, green_pin, red_pin)
+        start = time.monotonic()
+        engine.play(name)
+        time.sleep(duration + 0.2)
+        idle = {green_pin: connector.LED_IDLE[0], red_pin: connector.LED_IDLE[1]}
+        ok &= compare(name, expected, transitions(edges_since(gpio, start), idle), tolerance)
+
+    # A deny during an accept must take over at once
+    start = time.monotonic()
+    engine.play('accept')
+    time.sleep(0.7)
+    preempt_at = time.monotonic()
+    engine.play('deny')
+    time.sleep(0.05)
+    edges = edges_since(gpio, preempt_at)
+    took = edges[0][0] if edges else float('inf')
+    status = "ok  " if took <= tolerance else "FAIL"
+    print(f"{status} preemption took {took * 1000:6.2f} ms")
+    ok &= took <= tolerance
+    engine.stop()
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
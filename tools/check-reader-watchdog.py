@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Checks the reader watchdog against a simulated MFRC522 that stops responding.
+
+1. With an RST pin: a card is read, then the chip latches up and a second
+   card goes unread. The watchdog must notice within its check interval,
+   pulse RST low, re-initialise the chip, and the second card must then be
+   read. Resets and downtime must show up in /metrics.
+2. Without an RST pin: the re-initialisation over SPI cannot clear the
+   latch-up, so the reader must stay unhealthy and keep retrying.
+
+Usage: python3 tools/check-reader-watchdog.py [--check-ms 100]
+"""
+import argparse
+import logging
+import sys
+import time
+
+from benchlib import FakeDatabaseManager, check, load_connector
+
+
+def make_reader(connector, rst_pin, check_interval, name):
+    mfrc522 = connector.hardware.open_reader(device=rst_pin if rst_pin >= 0 else 9, pin_rst=rst_pin)
+    mfrc522.read_latency = 0.0
+    door = connector.DoorController(connector.Servo(12), name=name, hold_seconds=0.0, move_seconds=0.0)
+    reader = connector.RFIDReader(FakeDatabaseManager(connector), door=door, reader=mfrc522, name=name,
+                                  rst_pin=rst_pin)
+    reader.card_detector = None
+    reader.poll_interval = check_interval / 10
+    reader.watchdog.check_interval = check_interval
+    return reader
+
+
+def poll_until(reader, condition, timeout):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        reader.read_rfid()
+    return condition()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--check-ms', type=float, default=100.0)
+    args = parser.parse_args()
+
+    connector = load_connector('sim')
+    connector.logger.setLevel(logging.WARNING)
+    check_interval = args.check_ms / 1000
+    rst_pin = 25
+    ok = True
+
+    reader = make_reader(connector, rst_pin, check_interval, "with-rst")
+    mfrc522, watchdog = reader.reader, reader.watchdog
+    connector.register_metrics(reader.db_manager, None, [reader])
+
+    mfrc522.tap(1)
+    ok &= check("first card read", poll_until(reader, lambda: len(mfrc522.reads) == 1, 1.0))
+    hung_at = time.monotonic()
+    mfrc522.hang()
+    mfrc522.tap(2)
+    ok &= check("reader stays silent while latched up", not poll_until(reader, lambda: len(mfrc522.reads) == 2,
+                                                                       check_interval / 2))
+    ok &= check("watchdog resets the chip", poll_until(reader, lambda: watchdog.resets > 0,
+                                                       check_interval * (watchdog.failure_threshold + 2)))
+    pulses = [event for event in connector.GPIO.timeline(rst_pin, 'output') if event[0] >= hung_at]
+    ok &= check(f"RST pulsed low then high: {[value for _, _, _, value in pulses]}",
+                [value for _, _, _, value in pulses] == [0, 1])
+    ok &= check("chip re-initialised", mfrc522.READER.inits == 1)
+    ok &= check("second card read after the reset", poll_until(reader, lambda: len(mfrc522.reads) == 2, 1.0))
+    recovery = mfrc522.reads[1][0] - hung_at
+    ok &= check(f"recovered {recovery * 1000:.0f} ms after the latch-up", recovery < check_interval * 5)
+    ok &= check(f"healthy again, downtime {watchdog.downtime_seconds() * 1000:.0f} ms recorded",
+                watchdog.is_healthy() and watchdog.downtime_seconds() > 0)
+    rendered = connector.metrics.render()
+    ok &= check("resets in /metrics", 'portalwarden_reader_resets_total{door="with-rst"} 1' in rendered)
+    ok &= check("healthy in /metrics", 'portalwarden_reader_healthy{door="with-rst"} 1' in rendered)
+    reader.cleanup()
+
+    reader = make_reader(connector, -1, check_interval, "without-rst")
+    mfrc522, watchdog = reader.reader, reader.watchdog
+    mfrc522.hang()
+    poll_until(reader, lambda: watchdog.resets >= 2, check_interval * (2 * watchdog.failure_threshold + 4))
+    ok &= check(f"without RST: {watchdog.resets} soft resets, still unhealthy",
+                watchdog.resets >= 2 and not watchdog.is_healthy() and mfrc522.READER.inits == watchdog.resets)
+    reader.cleanup()
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Checks SysfsPwmServo against a fake /sys/class/pwm tree.
+
+Builds pwmchip0 in a temporary directory, with a thread standing in for
+the kernel that creates pwmN when N is written to export and removes it on
+unexport. Then checks that the servo exports the right channel, sets a
+20 ms period before enabling, writes the duty cycle in nanoseconds for the
+lock and unlock angles, and disables and unexports on stop(). Finally a
+DoorController drives the servo through one unlock and relock.
+
+Runs on any machine, no Raspberry Pi needed.
+
+Usage: python3 tools/check-servo-sysfs.py [--pin 12]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+from benchlib import check, load_connector
+
+
+class FakePwmChip:
+    """A pwmchip directory whose export and unexport files behave like the kernel's."""
+
+    def __init__(self, root, chip=0, npwm=2):
+        self.path = os.path.join(root, f"pwmchip{chip}")
+        os.makedirs(self.path)
+        for name, value in (('export', ''), ('unexport', ''), ('npwm', npwm)):
+            self.write(name, value)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def write(self, name, value):
+        with open(os.path.join(self.path, name), 'w') as f:
+            f.write(str(value))
+
+    def read(self, name):
+        with open(os.path.join(self.path, name)) as f:
+            return f.read().strip()
+
+    def _take(self, name):
+        value = self.read(name)
+        if value:
+            self.write(name, '')
+        return value
+
+    def _run(self):
+        while not self._stop.is_set():
+            channel = self._take('export')
+            if channel:
+                os.makedirs(os.path.join(self.path, f"pwm{channel}"), exist_ok=True)
+                for name, value in (('period', 0), ('duty_cycle', 0), ('enable', 0), ('polarity', 'normal')):
+                    self.write(os.path.join(f"pwm{channel}", name), value)
+            channel = self._take('unexport')
+            if channel:
+                channel_path = os.path.join(self.path, f"pwm{channel}")
+                for name in os.listdir(channel_path):
+                    os.remove(os.path.join(channel_path, name))
+                os.rmdir(channel_path)
+            time.sleep(0.005)
+
+    def close(self):
+        self._stop.set()
+        self._thread.join()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--pin', type=int, default=12)
+    args = parser.parse_args()
+
+    connector = load_connector('sim')
+    ok = True
+    with tempfile.TemporaryDirectory() as root:
+        chip = FakePwmChip(root)
+        servo = connector.SysfsPwmServo(args.pin, chip=0, root=root)
+        channel = f"pwm{connector.SysfsPwmServo.CHANNELS[args.pin]}"
+        ok &= check(f"GPIO {args.pin} exported as {channel}", os.path.isdir(servo.path) and servo.path.endswith(channel))
+        ok &= check("period 20 ms", chip.read(f"{channel}/period") == '20000000')
+        ok &= check("enabled", chip.read(f"{channel}/enable") == '1')
+        ok &= check("no pulse before the first move", chip.read(f"{channel}/duty_cycle") == '0')
+
+        for angle in (connector.DOOR_LOCK_ANGLE, connector.DOOR_UNLOCK_ANGLE):
+            servo.start_move(angle)
+            expected = round(20_000_000 * connector.Servo.duty_for(angle) / 100)
+            duty = int(chip.read(f"{channel}/duty_cycle"))
+            ok &= check(f"{angle:.0f} degrees: duty cycle {duty} ns (expected {expected})", duty == expected)
+        servo.stop_signal()
+        ok &= check("stop_signal() ends the pulses", chip.read(f"{channel}/duty_cycle") == '0')
+
+        hold, move = 0.2, 0.05
+        door = connector.DoorController(servo, hold_seconds=hold, move_seconds=move)
+        door.request_open()
+        unlock = round(20_000_000 * connector.Servo.duty_for(connector.DOOR_UNLOCK_ANGLE) / 100)
+        ok &= check("door unlocking", int(chip.read(f"{channel}/duty_cycle")) == unlock)
+        time.sleep(move + 0.05)
+        ok &= check("signal stopped once open", chip.read(f"{channel}/duty_cycle") == '0' and door.state == door.OPEN)
+        time.sleep(hold + move + 0.1)
+        ok &= check("door locked again", door.state == door.LOCKED)
+
+        door.shutdown()
+        time.sleep(0.05)
+        ok &= check("disabled and unexported on stop()", not os.path.exists(servo.path))
+        chip.close()
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
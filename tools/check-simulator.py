@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Runs a door end to end on the simulated hardware backend.
+
+Taps one allowed and one unknown card on a simulated MFRC522 and checks
+the servo timeline recorded by the simulated GPIO: the allowed card must
+unlock, stop the signal after the move, relock after the hold time and
+stop again; the unknown card must not move the servo at all.
+
+Without --dsn a fake database manager allows --allowed only. With --dsn the real
+DatabaseManager is used and --allowed must be a registered tag.
+
+Usage: python3 tools/check-simulator.py [--dsn postgresql://...] [--allowed 123456789] [--unknown 987654321]
+"""
+import argparse
+import sys
+import time
+
+from benchlib import FakeDatabaseManager, check, load_connector
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--dsn')
+    parser.add_argument('--allowed', type=int, default=123456789)
+    parser.add_argument('--unknown', type=int, default=987654321)
+    args = parser.parse_args()
+
+    connector = load_connector('sim')
+    if args.dsn:
+        db_manager = connector.DatabaseManager(args.dsn)
+    else:
+        db_manager = FakeDatabaseManager(connector, valid={args.allowed})
+    hold, move = 0.3, 0.1
+    servo_pin = 12
+    door = connector.DoorController(connector.Servo(servo_pin), hold_seconds=hold, move_seconds=move)
+    reader = connector.RFIDReader(db_manager, door=door, reader=connector.hardware.open_reader())
+    reader.card_detector = None
+    reader.poll_interval = 0.01
+    gpio = connector.GPIO
+    duty = lambda angle: angle / 18 + 2
+
+    ok = True
+    start = time.monotonic()
+    reader.reader.tap(args.allowed)
+    while door.state == door.LOCKED and time.monotonic() - start < 1.0:
+        reader.read_rfid()
+    time.sleep(move + hold + move + 0.1)
+    duties = [(t - start, value) for t, pin, kind, value in gpio.timeline(servo_pin, 'duty') if t >= start]
+    values = [value for _, value in duties]
+    ok &= check(f"allowed card: duty cycles {values}",
+                values == [duty(connector.DOOR_UNLOCK_ANGLE), 0, duty(connector.DOOR_LOCK_ANGLE), 0])
+    if len(duties) == 4:
+        held = duties[2][0] - duties[1][0]
+        ok &= check(f"held open {held * 1000:.0f} ms (configured {hold * 1000:.0f} ms)", abs(held - hold) < 0.05)
+    ok &= check("door locked again", door.state == door.LOCKED)
+
+    start = time.monotonic()
+    reader.reader.tap(args.unknown)
+    reader.read_rfid()
+    time.sleep(move + 0.1)
+    moved = [event for event in gpio.timeline(servo_pin, 'duty') if event[0] >= start]
+    ok &= check("unknown card: servo did not move", not moved)
+
+    reader.cleanup()
+    if args.dsn:
+        db_manager.close()
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
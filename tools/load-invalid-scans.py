@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Load generator for floods of unenrolled cards.
+
+Replays invalid scans (10k per minute by default) through
+DatabaseManager.authorize with the allowlist listener disabled, so every
+decision has to go through the Bloom filter, the negative cache or the
+database. Part of the scans reuse a small set of unenrolled cards, the rest
+are random UIDs. Reports how many database queries were avoided.
+
+Usage: python3 tools/load-invalid-scans.py [--rate 10000] [--seconds 60] [--repeat-cards 50] [--repeat-share 0.5]
+Requires DATABASE_URL to point at a migrated PortalWarden database.
+"""
+import argparse
+import random
+import time
+
+from decouple import config
+
+from benchlib import load_connector, print_summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rate', type=float, default=10000.0, help="scans per minute")
+    parser.add_argument('--seconds', type=float, default=60.0)
+    parser.add_argument('--repeat-cards', type=int, default=50, help="unenrolled cards that are scanned repeatedly")
+    parser.add_argument('--repeat-share', type=float, default=0.5, help="share of scans using the repeated cards")
+    parser.add_argument('--no-bloom', action='store_true', help="only use the negative cache")
+    args = parser.parse_args()
+
+    connector = load_connector()
+    connector.logger.setLevel("ERROR")
+    db_manager = connector.DatabaseManager(config('DATABASE_URL'))
+
+    def load_tags(cursor):
+        cursor.execute('SELECT "tag" FROM "ValidTag"')
+        return {row[0] for row in cursor}
+
+    valid_digests = db_manager.run(load_tags)
+    # Synchronised once but never started: the cache is not live, so its Bloom filter answers instead
+    db_manager.allowlist = connector.AllowlistCache(db_manager)
+    db_manager.allowlist.full_sync()
+    if args.no_bloom:
+        db_manager.bloom = None
+
+    # UIDs above the 40-bit range of MIFARE cards, checked against the allowlist so none of them is valid
+    def invalid_uid():
+        while True:
+            uid = random.getrandbits(48) | (1 << 47)
+            if connector.hash_rfid(uid) not in valid_digests:
+                return uid
+
+    repeated = [invalid_uid() for _ in range(args.repeat_cards)]
+    total = int(args.rate * args.seconds / 60)
+    interval = 60 / args.rate
+    latencies = []
+
+    start = time.monotonic()
+    for i in range(total):
+        uid = random.choice(repeated) if random.random() < args.repeat_share else invalid_uid()
+        decision = db_manager.authorize(uid)
+        latencies.append(decision.latency_ms)
+        if decision.is_valid:
+            print(f"Unexpected grant for UID {uid}")
+        # Keep the arrival rate steady
+        delay = start + (i + 1) * interval - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+    stats = db_manager.stats()
+    avoided = stats['db_queries_avoided']
+    print(f"Replayed {total} invalid scans in {time.monotonic() - start:.1f} s")
+    print(f"Decisions by source: {stats['decisions']}")
+    print(f"Database queries: {stats['db_queries']}, avoided: {avoided} ({100 * avoided / max(total, 1):.1f} %)")
+    print_summary("decision latency", latencies)
+    db_manager.close()
+
+
+if __name__ == "__main__":
+    main()
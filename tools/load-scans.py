@@ -0,0 +1,310 @@
+#!/usr/bin/env python3
+"""
+Trace-driven scan load generator for the whole read path.
+
+Builds a scan trace and replays it through RFIDReader on the simulated
+hardware backend, one reader thread per door, tapping each card on the
+simulated MFRC522 at its offset. Traces can be:
+
+  synthetic   Poisson arrivals (--rate scans per minute for --seconds) plus
+              optional bursts (--burst-every, --burst-size, --burst-spread),
+              with --valid-share of the scans using allowed cards
+  recorded    RfidLog history from --dsn (--from-rfidlog, optionally limited
+              by --since/--until), replayed --speed times faster
+  file        a CSV trace written earlier with --save-trace (offset,uid,valid)
+
+Without --dsn decisions come from a fake database with --db-ms latency that
+counts one query per scan. With --dsn the real DatabaseManager, allowlist
+cache and log writer are used; the run then writes RfidLog rows, so point
+it at a scratch database, and allowed cards must be enrolled (recorded
+traces already use real UIDs).
+
+Reports tap-to-decision and read-to-decision latency (p50/p95/p99), the
+depth of the card and log queues, database queries per scan and decisions
+by source. --json writes the same as one JSON object ('-' for stdout) so
+runs can be compared.
+
+Usage: python3 tools/load-scans.py [--rate 60] [--seconds 60] [--valid-share 0.8] [--doors 1]
+                                   [--burst-every 0] [--burst-size 20] [--burst-spread 5]
+                                   [--dsn postgresql://... [--from-rfidlog] [--since ISO] [--until ISO]]
+                                   [--trace FILE] [--save-trace FILE] [--speed 1] [--json FILE]
+"""
+import argparse
+import collections
+import csv
+import json
+import logging
+import random
+import sys
+import threading
+import time
+from datetime import datetime
+
+from benchlib import FakeDatabaseManager, load_connector, percentile, print_summary, summarize
+
+
+Scan = collections.namedtuple('Scan', ['offset', 'uid', 'valid'])
+
+
+def poisson_trace(rate, seconds, valid_share, cards, rng):
+    """Exponential inter-arrival times at rate scans per minute."""
+    valid_cards = [rng.getrandbits(32) + 1 for _ in range(cards)]
+    scans, offset = [], 0.0
+    while True:
+        offset += rng.expovariate(rate / 60)
+        if offset >= seconds:
+            return scans, set(valid_cards)
+        valid = rng.random() < valid_share
+        uid = rng.choice(valid_cards) if valid else rng.getrandbits(39) | (1 << 39)
+        scans.append(Scan(offset, uid, valid))
+
+
+def add_bursts(scans, valid_cards, seconds, every, size, spread, valid_share, rng):
+    """Adds size scans spread evenly over spread seconds at every every seconds."""
+    valid_cards = sorted(valid_cards)
+    start = every
+    while start < seconds:
+        for i in range(size):
+            valid = rng.random() < valid_share
+            uid = rng.choice(valid_cards) if valid else rng.getrandbits(39) | (1 << 39)
+            scans.append(Scan(start + spread * i / size, uid, valid))
+        start += every
+    scans.sort()
+    return scans
+
+
+def rfidlog_trace(db_manager, since, until):
+    def load(cursor):
+        query = 'SELECT "timestamp", "rfidId", "isValid" FROM "RfidLog" WHERE TRUE'
+        params = []
+        if since:
+            query += ' AND "timestamp" >= %s'
+            params.append(since)
+        if until:
+            query += ' AND "timestamp" < %s'
+            params.append(until)
+        cursor.execute(query + ' ORDER BY "timestamp"', params)
+        return cursor.fetchall()
+
+    rows = db_manager.run(load)
+    if not rows:
+        return []
+    first = rows[0][0]
+    return [Scan((timestamp - first).total_seconds(), int(uid), bool(valid)) for timestamp, uid, valid in rows]
+
+
+def read_trace(path):
+    with open(path, newline='') as f:
+        return [Scan(float(row['offset']), int(row['uid']), row['valid'] == '1') for row in csv.DictReader(f)]
+
+
+def save_trace(path, scans):
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['offset', 'uid', 'valid'])
+        for scan in scans:
+            writer.writerow([f"{scan.offset:.6f}", scan.uid, 1 if scan.valid else 0])
+
+
+class Recorder:
+    """Wraps a reader's read_card() and authorize() to time every decision."""
+
+    def __init__(self, reader):
+        self.reader = reader
+        self.read_at = None
+        self.decisions = []  # (read time, decision time, uid, granted)
+        self.read_card, self.authorize = reader.read_card, reader.authorize
+        reader.read_card, reader.authorize = self._read_card, self._authorize
+
+    def _read_card(self):
+        result = self.read_card()
+        self.read_at = time.monotonic()
+        return result
+
+    def _authorize(self, rfid_id):
+        granted = self.authorize(rfid_id)
+        self.decisions.append((self.read_at, time.monotonic(), rfid_id, granted))
+        return granted
+
+
+def depth_summary(samples):
+    return {
+        'p50': percentile(samples, 50),
+        'p95': percentile(samples, 95),
+        'p99': percentile(samples, 99),
+        'max': max(samples) if samples else 0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rate', type=float, default=60.0, help="Poisson arrivals, scans per minute")
+    parser.add_argument('--seconds', type=float, default=60.0)
+    parser.add_argument('--valid-share', type=float, default=0.8)
+    parser.add_argument('--cards', type=int, default=200, help="allowed cards in a synthetic trace")
+    parser.add_argument('--burst-every', type=float, default=0.0, help="seconds between bursts, 0 for none")
+    parser.add_argument('--burst-size', type=int, default=20)
+    parser.add_argument('--burst-spread', type=float, default=5.0, help="seconds one burst is spread over")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--dsn', help="use the real database instead of the fake one")
+    parser.add_argument('--from-rfidlog', action='store_true', help="replay RfidLog history from --dsn")
+    parser.add_argument('--since')
+    parser.add_argument('--until')
+    parser.add_argument('--trace', help="replay a CSV trace")
+    parser.add_argument('--save-trace', help="write the trace as CSV before replaying it")
+    parser.add_argument('--speed', type=float, default=1.0, help="replay this many times faster")
+    parser.add_argument('--doors', type=int, default=1)
+    parser.add_argument('--db-ms', type=float, default=5.0, help="fake database latency")
+    parser.add_argument('--read-ms', type=float, default=5.0, help="simulated MFRC522 read latency")
+    parser.add_argument('--poll-ms', type=float, default=None, help="reader poll interval, READER_POLL_SECONDS if unset")
+    parser.add_argument('--json', help="write the results as JSON to this file, '-' for stdout")
+    args = parser.parse_args()
+    if args.from_rfidlog and not args.dsn:
+        parser.error("--from-rfidlog needs --dsn")
+
+    connector = load_connector('sim')
+    connector.logger.setLevel(logging.ERROR)  # Per-scan log lines would dominate the timing
+    rng = random.Random(args.seed)
+
+    valid_cards = set()
+    if args.dsn:
+        db_manager = connector.DatabaseManager(args.dsn)
+    if args.trace:
+        scans = read_trace(args.trace)
+    elif args.from_rfidlog:
+        scans = rfidlog_trace(db_manager, args.since, args.until)
+    else:
+        scans, valid_cards = poisson_trace(args.rate, args.seconds, args.valid_share, args.cards, rng)
+        if args.burst_every > 0:
+            scans = add_bursts(scans, valid_cards, args.seconds, args.burst_every, args.burst_size,
+                               args.burst_spread, args.valid_share, rng)
+    if not args.dsn:
+        valid_cards |= {scan.uid for scan in scans if scan.valid}
+        db_manager = FakeDatabaseManager(connector, args.db_ms / 1000, valid=valid_cards)
+    if args.save_trace:
+        save_trace(args.save_trace, scans)
+    if not scans:
+        sys.exit("The trace is empty.")
+
+    log_writer = None
+    if args.dsn:
+        db_manager.allowlist = connector.AllowlistCache(db_manager)
+        db_manager.allowlist.start()
+        log_writer = connector.RfidLogWriter(db_manager)
+        log_writer.start()
+
+    readers, recorders = [], []
+    for index in range(args.doors):
+        mfrc522 = connector.hardware.open_reader(device=index)
+        mfrc522.read_latency = args.read_ms / 1000
+        reader = connector.RFIDReader(db_manager, log_writer, reader=mfrc522, name=f"door{index + 1}")
+        reader.card_detector = None
+        if args.poll_ms is not None:
+            reader.poll_interval = args.poll_ms / 1000
+        readers.append(reader)
+        recorders.append(Recorder(reader))
+
+    stop_event = threading.Event()
+    threads = [threading.Thread(target=reader.run, args=(stop_event,), name=f"reader-{reader.name}", daemon=True)
+               for reader in readers]
+    for thread in threads:
+        thread.start()
+
+    card_depths, log_depths = [], []
+
+    def sample_depths():
+        while not stop_event.wait(0.05):
+            card_depths.append(sum(reader.reader.pending() for reader in readers))
+            if log_writer is not None:
+                log_depths.append(log_writer.depth())
+
+    sampler = threading.Thread(target=sample_depths, name="depth-sampler", daemon=True)
+    sampler.start()
+
+    taps = collections.defaultdict(collections.deque)  # (door, uid) -> tap times, in order
+    start = time.monotonic()
+    for scan in scans:
+        delay = start + scan.offset / args.speed - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        door = rng.randrange(args.doors)
+        taps[(door, scan.uid)].append(time.monotonic())
+        readers[door].reader.tap(scan.uid)
+
+    # Wait until every tap has been read and the last decision is in
+    deadline = time.monotonic() + 30
+    while any(reader.reader.pending() for reader in readers) and time.monotonic() < deadline:
+        time.sleep(0.01)
+    time.sleep(max(reader.poll_interval for reader in readers) + args.db_ms / 1000 + 0.2)
+    elapsed = time.monotonic() - start
+    stop_event.set()
+    sampler.join()
+
+    expected = {scan.uid: scan.valid for scan in scans}
+    end_to_end, decision_latency, granted, disagreements = [], [], 0, 0
+    for door, (reader, recorder) in enumerate(zip(readers, recorders)):
+        decided = {}
+        for read_at, decided_at, uid, is_granted in recorder.decisions:
+            decided.setdefault(uid, collections.deque()).append(decided_at)
+            decision_latency.append((decided_at - read_at) * 1000)
+            granted += is_granted
+            disagreements += is_granted != expected[uid]
+        # Each tap is seen by exactly one read; suppressed repeats have no decision
+        for read_at, uid in reader.reader.reads:
+            tapped_at = taps[(door, uid)].popleft()
+            if decided.get(uid) and decided[uid][0] >= read_at:
+                end_to_end.append((decided[uid].popleft() - tapped_at) * 1000)
+
+    db_stats = db_manager.stats()
+    decisions = len(decision_latency)
+    suppressed = sum(reader.debouncer.suppressed for reader in readers)
+    result = {
+        'config': {key: value for key, value in vars(args).items() if key not in ('dsn', 'json')},
+        'database': 'real' if args.dsn else 'fake',
+        'scans': len(scans),
+        'decisions': decisions,
+        'suppressed': suppressed,
+        'unread': sum(reader.reader.pending() for reader in readers),
+        'granted': granted,
+        'disagreements_with_trace': disagreements,
+        'elapsed_seconds': elapsed,
+        'scans_per_minute': 60 * decisions / elapsed,
+        'tap_to_decision_ms': summarize(end_to_end),
+        'read_to_decision_ms': summarize(decision_latency),
+        'card_queue_depth': depth_summary(card_depths),
+        'log_queue_depth': depth_summary(log_depths),
+        'db_queries': db_stats['db_queries'],
+        'db_queries_per_scan': db_stats['db_queries'] / max(decisions, 1),
+        'decisions_by_source': db_stats['decisions'],
+        'log_writer': log_writer.stats() if log_writer is not None else None,
+        'recorded_at': datetime.now().isoformat(timespec='seconds'),
+    }
+
+    print(f"Replayed {len(scans)} scans on {args.doors} door(s) in {elapsed:.1f} s: {decisions} decisions, "
+          f"{suppressed} suppressed as repeats, {result['unread']} never read")
+    print(f"Grants: {granted}, decisions that disagree with the trace: {disagreements}")
+    print_summary("tap to decision", end_to_end)
+    print_summary("read to decision", decision_latency)
+    print(f"Card queue depth p95 {result['card_queue_depth']['p95']}, max {result['card_queue_depth']['max']}; "
+          f"log queue depth p95 {result['log_queue_depth']['p95']}, max {result['log_queue_depth']['max']}")
+    print(f"Database queries per scan: {result['db_queries_per_scan']:.3f}, decisions by source: "
+          f"{result['decisions_by_source']}")
+
+    if args.json == '-':
+        json.dump(result, sys.stdout, indent=2)
+        print()
+    elif args.json:
+        with open(args.json, 'w') as f:
+            json.dump(result, f, indent=2)
+
+    for reader in readers:
+        reader.cleanup()
+    if log_writer is not None:
+        log_writer.close()
+    if args.dsn:
+        db_manager.allowlist.stop()
+    db_manager.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Talks to a running spi-connector.py over its control socket (CONTROL_ENABLED=true).
+
+Commands:
+  ping                         check that the reader process answers
+  state                        print doors, caches, queues and the log level as JSON
+  unlock [--door NAME]         open one door, or all of them
+  reload                       resynchronise the allowlist cache from Postgres now
+  log-level LEVEL              change the log level (DEBUG, INFO, WARNING, ...)
+  enroll [--door NAME] [--timeout 30]
+                               wait for the next card and print its ID and ValidTag tag
+  bench [--count 2000]         round-trip latency of ping and state
+
+Messages are a 4-byte big-endian length followed by UTF-8 JSON, so the web
+server can speak the protocol with a few lines of its own.
+
+Usage: python3 tools/portalctl.py [--socket PATH] COMMAND [options]
+"""
+import argparse
+import json
+import os
+import socket
+import struct
+import sys
+import time
+
+from decouple import config
+
+from benchlib import BASEDIR, print_summary
+
+HEADER = struct.Struct('>I')
+DEFAULT_SOCKET = config('CONTROL_SOCKET_PATH', default='') or os.path.join(BASEDIR, "run", "control.sock")
+
+
+class ControlClient:
+    def __init__(self, path, timeout=None):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(timeout)
+        self.sock.connect(path)
+
+    def call(self, command, **arguments):
+        body = json.dumps({'command': command, **arguments}).encode()
+        self.sock.sendall(HEADER.pack(len(body)) + body)
+        length, = HEADER.unpack(self._recv(HEADER.size))
+        return json.loads(self._recv(length))
+
+    def _recv(self, size):
+        data = b''
+        while len(data) < size:
+            chunk = self.sock.recv(size - len(data))
+            if not chunk:
+                raise ConnectionError("spi-connector.py closed the control connection")
+            data += chunk
+        return data
+
+    def close(self):
+        self.sock.close()
+
+
+def bench(client, count):
+    for command in ('ping', 'state'):
+        samples = []
+        for _ in range(count):
+            start = time.perf_counter()
+            client.call(command)
+            samples.append((time.perf_counter() - start) * 1000)
+        print_summary(f"{command} round trip", samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--socket', default=DEFAULT_SOCKET)
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('ping')
+    commands.add_parser('state')
+    commands.add_parser('unlock').add_argument('--door')
+    commands.add_parser('reload')
+    commands.add_parser('log-level').add_argument('level')
+    enroll = commands.add_parser('enroll')
+    enroll.add_argument('--door')
+    enroll.add_argument('--timeout', type=float, default=30.0)
+    commands.add_parser('bench').add_argument('--count', type=int, default=2000)
+    args = parser.parse_args()
+
+    client = ControlClient(args.socket)
+    try:
+        if args.command == 'bench':
+            bench(client, args.count)
+            return
+        arguments = {key: value for key, value in vars(args).items()
+                     if key not in ('socket', 'command') and value is not None}
+        reply = client.call(args.command.replace('-', '_'), **arguments)
+    finally:
+        client.close()
+    json.dump(reply, sys.stdout, indent=2)
+    print()
+    sys.exit(0 if reply.get('ok') else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Stress test for the RFID log spool.
+
+Streams scan events through RfidLogWriter while Postgres is stopped and
+started again, then checks that every event reached "RfidLog" exactly once
+and in submission order.
+
+Usage:
+    python3 tools/stress-spool.py --stop-cmd "docker stop rpi-rfid-postgres" \
+        --start-cmd "docker start rpi-rfid-postgres" [--events 3000] [--rate 300] [--down-seconds 10]
+Requires DATABASE_URL to point at a migrated PortalWarden database.
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from decouple import config
+
+from benchlib import load_connector
+
+
+def run_command(command):
+    print(f"$ {command}")
+    subprocess.run(command, shell=True, check=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--events', type=int, default=3000)
+    parser.add_argument('--rate', type=float, default=300.0, help="events per second")
+    parser.add_argument('--down-seconds', type=float, default=10.0)
+    parser.add_argument('--stop-cmd', required=True)
+    parser.add_argument('--start-cmd', required=True)
+    parser.add_argument('--drain-timeout', type=float, default=120.0)
+    args = parser.parse_args()
+
+    connector = load_connector()
+    connector.logger.setLevel("WARNING")
+    db_manager = connector.DatabaseManager(config('DATABASE_URL'))
+
+    spool_path = os.path.join(tempfile.mkdtemp(prefix="rfid-spool-"), "spool.db")
+    spool = connector.LogSpool(spool_path)
+    writer = connector.RfidLogWriter(db_manager, max_queue_size=args.events, batch_size=50, flush_interval=0.2,
+                                     full_policy='block', block_timeout=60, spool=spool, replay_interval=1.0)
+    writer.start()
+
+    # Unique RFID IDs for this run so the check can find exactly our rows
+    base = int(time.time() * 1000) * 10000
+    outage_at = args.events // 3
+
+    for i in range(args.events):
+        if i == outage_at:
+            run_command(args.stop_cmd)
+            threading.Timer(args.down_seconds, run_command, (args.start_cmd,)).start()
+        writer.submit(base + i, i % 2 == 0)
+        time.sleep(1 / args.rate)
+
+    deadline = time.monotonic() + args.drain_timeout
+    while (writer.depth() or spool.pending()) and time.monotonic() < deadline:
+        time.sleep(0.5)
+    writer.close()
+    print(f"Writer stats: {writer.stats()}")
+
+    def fetch(cursor):
+        cursor.execute('SELECT "rfidId" FROM "RfidLog" WHERE "rfidId" BETWEEN %s AND %s ORDER BY "id"',
+                       (base, base + args.events - 1))
+        return [row[0] for row in cursor]
+
+    logged = db_manager.run(fetch)
+    db_manager.close()
+
+    lost = args.events - len(set(logged))
+    duplicates = len(logged) - len(set(logged))
+    in_order = logged == sorted(logged)
+    print(f"Submitted {args.events}, logged {len(logged)}, lost {lost}, duplicated {duplicates}, "
+          f"in order: {in_order}")
+    sys.exit(0 if lost == 0 and duplicates == 0 and in_order else 1)
+
+
+if __name__ == "__main__":
+    main()
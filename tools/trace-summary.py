@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Summarises the scan traces written with TRACE_ENABLED=true.
+
+Reads the JSON-lines trace file (and its rotated copies with --rotated)
+and prints the latency of every stage: read (MFRC522), hash, db, log or
+insert_log, authorize (everything from hash to log), led, and unlock
+(servo move after a grant), plus the total per scan and the share of the
+total each stage accounts for. Relocks are summarised separately.
+
+Usage: python3 tools/trace-summary.py [FILE] [--rotated] [--door NAME] [--source SOURCE] [--since ISO]
+                                      [--json]
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+from collections import Counter, defaultdict
+
+from decouple import config
+
+from benchlib import BASEDIR, summarize
+
+DEFAULT_PATH = config('TRACE_PATH', default='') or os.path.join(BASEDIR, "logs", "traces.jsonl")
+
+
+def read_records(path, rotated):
+    paths = [path]
+    if rotated:
+        index = 1
+        while os.path.exists(f"{path}.{index}"):
+            paths.insert(0, f"{path}.{index}")  # Oldest first
+            index += 1
+    for name in paths:
+        with open(name) as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    yield json.loads(line)
+
+
+def stage_table(records):
+    stages, totals = defaultdict(list), []
+    for record in records:
+        totals.append(record['total_ms'])
+        for span in record['spans']:
+            stages[span['name']].append(span['ms'])
+    return stages, totals
+
+
+def print_table(title, stages, totals):
+    total_sum = sum(totals) or 1
+    print(f"{title} ({len(totals)} traces)")
+    print(f"  {'stage':<12} {'n':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9} {'mean ms':>9} {'share':>7}")
+    for name, samples in sorted(stages.items(), key=lambda item: -sum(item[1])):
+        result = summarize(samples)
+        print(f"  {name:<12} {result['n']:>6} {result['p50_ms']:>9.2f} {result['p95_ms']:>9.2f} "
+              f"{result['p99_ms']:>9.2f} {result['max_ms']:>9.2f} {statistics.fmean(samples):>9.2f} "
+              f"{100 * sum(samples) / total_sum:>6.1f}%")
+    result = summarize(totals)
+    print(f"  {'total':<12} {result['n']:>6} {result['p50_ms']:>9.2f} {result['p95_ms']:>9.2f} "
+          f"{result['p99_ms']:>9.2f} {result['max_ms']:>9.2f} {result['mean_ms']:>9.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('path', nargs='?', default=DEFAULT_PATH)
+    parser.add_argument('--rotated', action='store_true', help="include the rotated files")
+    parser.add_argument('--door')
+    parser.add_argument('--source', help="only scans decided by this source (cache, db, snapshot, ...)")
+    parser.add_argument('--since', help="only traces at or after this ISO time")
+    parser.add_argument('--json', action='store_true', help="print the summary as JSON")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.path):
+        sys.exit(f"No trace file at {args.path}; set TRACE_ENABLED=true and scan a card first.")
+
+    scans, relocks = [], []
+    for record in read_records(args.path, args.rotated):
+        if args.door and record.get('door') != args.door:
+            continue
+        if args.since and record['time'] < args.since:
+            continue
+        if record['kind'] == 'relock':
+            relocks.append(record)
+        elif not args.source or record.get('source') == args.source:
+            scans.append(record)
+
+    scan_stages, scan_totals = stage_table(scans)
+    relock_stages, relock_totals = stage_table(relocks)
+    if args.json:
+        json.dump({
+            'scans': {'n': len(scans), 'total_ms': summarize(scan_totals),
+                      'stages': {name: summarize(samples) for name, samples in scan_stages.items()},
+                      'sources': Counter(record.get('source', 'unknown') for record in scans),
+                      'granted': sum(1 for record in scans if record.get('granted')),
+                      'errors': sum(1 for record in scans if 'error' in record)},
+            'relocks': {'n': len(relocks), 'total_ms': summarize(relock_totals)},
+        }, sys.stdout, indent=2)
+        print()
+        return
+
+    print_table("Scans", scan_stages, scan_totals)
+    sources = Counter(record.get('source', 'unknown') for record in scans)
+    granted = sum(1 for record in scans if record.get('granted'))
+    errors = sum(1 for record in scans if 'error' in record)
+    print(f"  granted {granted}, denied {len(scans) - granted - errors}, errors {errors}; "
+          f"decided by {', '.join(f'{source} {count}' for source, count in sources.most_common())}")
+    if relocks:
+        print()
+        print_table("Relocks", relock_stages, relock_totals)
+
+
+if __name__ == "__main__":
+    main()